@@ -1,12 +1,14 @@
 from agents.application.executor import Executor as Agent
 from agents.polymarket.gamma import GammaMarketClient as Gamma
 from agents.polymarket.polymarket import Polymarket
+from agents.polymarket.snapshot import MarketSnapshot
 
 
 class Creator:
     def __init__(self):
         self.polymarket = Polymarket()
         self.gamma = Gamma()
+        self.snapshot = MarketSnapshot(gamma_client=self.gamma)
         self.agent = Agent()
 
     def one_best_market(self):
@@ -21,8 +23,9 @@ class Creator:
         """
         try:
             # Use current markets instead of stale events
-            current_markets = self.gamma.get_current_markets(limit=50)
-            print(f"1. FOUND {len(current_markets)} CURRENT MARKETS")
+            sync_stats = self.snapshot.sync()
+            current_markets = self.snapshot.get_current_markets(limit=50)
+            print(f"1. FOUND {len(current_markets)} CURRENT MARKETS ({sync_stats})")
 
             # Convert to SimpleEvent objects for compatibility with existing RAG system
             from agents.utils.objects import SimpleEvent
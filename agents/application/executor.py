@@ -2,94 +2,240 @@ import os
 import json
 import ast
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 import math
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    FIRST_EXCEPTION,
+    ThreadPoolExecutor,
+    wait,
+)
+from functools import cached_property
 
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 
 from agents.polymarket.gamma import GammaMarketClient as Gamma
-from agents.connectors.chroma import PolymarketRAG as Chroma
-from agents.utils.objects import SimpleEvent, SimpleMarket
+from agents.utils.llm_cache import LLMCache
+from agents.utils.objects import ChunkResult, SimpleEvent, SimpleMarket, TradeCandidate
+from agents.utils.tabular import EVENT_COLUMNS, MARKET_COLUMNS, render_row
+from agents.utils.tokens import TokenCounter, pack
 from agents.application.prompts import Prompter
-from agents.polymarket.polymarket import Polymarket
-
-def retain_keys(data, keys_to_retain):
-    if isinstance(data, dict):
-        return {
-            key: retain_keys(value, keys_to_retain)
-            for key, value in data.items()
-            if key in keys_to_retain
-        }
-    elif isinstance(data, list):
-        return [retain_keys(item, keys_to_retain) for item in data]
-    else:
-        return data
+from agents.polymarket.polymarket import MARKET_ORDER_OUTCOME, Polymarket
 
 class Executor:
     def __init__(self, default_model='gpt-3.5-turbo-16k') -> None:
         load_dotenv()
         max_token_model = {'gpt-3.5-turbo-16k':15000, 'gpt-4-1106-preview':95000}
         self.token_limit = max_token_model.get(default_model)
+        # Chunk prompts sent to the llm at once when data exceeds token_limit
+        self.chunk_concurrency = int(os.getenv("LLM_CHUNK_CONCURRENCY", 4))
+        # Markets retrieved from the index to answer get_polymarket_llm
+        self.retrieval_top_k = int(os.getenv("RETRIEVAL_TOP_K", 20))
+        # Markets evaluated for a trade at once, and seconds allowed for each
+        self.trade_concurrency = int(os.getenv("TRADE_CONCURRENCY", 4))
+        self.trade_timeout = float(os.getenv("TRADE_TIMEOUT", 120))
         self.prompter = Prompter()
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.llm = ChatOpenAI(
             model=default_model, #gpt-3.5-turbo"
             temperature=0,
+            # A request outliving the per-market trade timeout is abandoned anyway
+            timeout=self.trade_timeout,
         )
         self.gamma = Gamma()
-        self.chroma = Chroma()
         self.polymarket = Polymarket()
 
-    def get_llm_response(self, user_input: str) -> str:
+    @cached_property
+    def chroma(self):
+        # chromadb and the langchain vectorstores are only needed by the RAG filters
+        from agents.connectors.chroma import PolymarketRAG as Chroma
+
+        return Chroma()
+
+    @cached_property
+    def llm_cache(self) -> LLMCache:
+        return LLMCache(
+            path=os.getenv("LLM_CACHE_PATH", "./local_db/llm_cache.sqlite"),
+            ttl=float(os.getenv("LLM_CACHE_TTL", 24 * 3600)),
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+        )
+
+    def _invoke(self, messages, use_cache: bool = True) -> str:
+        """
+        self.llm.invoke(messages).content, answered from the response cache
+        when the same model, temperature and messages were seen within the ttl
+        """
+        if not use_cache:
+            return self.llm.invoke(messages).content
+        key = self.llm_cache.key(self.llm.model_name, self.llm.temperature, messages)
+        content = self.llm_cache.get(key)
+        if content is None:
+            content = self.llm.invoke(messages).content
+            self.llm_cache.set(key, self.llm.model_name, content)
+        return content
+
+    def get_llm_response(self, user_input: str, use_cache: bool = True) -> str:
         system_message = SystemMessage(content=str(self.prompter.market_analyst()))
         human_message = HumanMessage(content=user_input)
         messages = [system_message, human_message]
-        result = self.llm.invoke(messages)
-        return result.content
+        return self._invoke(messages, use_cache)
 
     def get_superforecast(
-        self, event_title: str, market_question: str, outcome: str
+        self,
+        event_title: str,
+        market_question: str,
+        outcome: str,
+        use_cache: bool = True,
     ) -> str:
         messages = self.prompter.superforecaster(
             description=event_title, question=market_question, outcome=outcome
         )
-        result = self.llm.invoke(messages)
-        return result.content
+        return self._invoke(messages, use_cache)
 
+    @cached_property
+    def token_counter(self) -> TokenCounter:
+        return TokenCounter(self.llm.model_name)
 
     def estimate_tokens(self, text: str) -> int:
-        # This is a rough estimate. For more accurate results, consider using a tokenizer.
-        return len(text) // 4  # Assuming average of 4 characters per token
+        # Exact with the model's tokenizer, len(text) // 4 if it can't be loaded
+        return self.token_counter.count(text)
 
-    def process_data_chunk(self, data1: List[Dict[Any, Any]], data2: List[Dict[Any, Any]], user_input: str) -> str:
+    def pack_data_chunks(
+        self, data1: list, data2: list, user_input: str
+    ) -> "list[tuple]":
+        """
+        Split events and markets into (data1, data2) chunks that each fill a
+        prompt up to token_limit, instead of equal sized slices
+        """
+        overhead = self.estimate_tokens(
+            str(self.prompter.prompts_polymarket(data1=[], data2=[]))
+        ) + self.estimate_tokens(user_input)
+        records = [(0, record) for record in data1] + [(1, record) for record in data2]
+        # Each record becomes one row of the events or markets table
+        columns = (EVENT_COLUMNS, MARKET_COLUMNS)
+        sizes = [
+            self.token_counter.count_record(
+                record, lambda r: render_row(r, columns[kind])
+            )
+            for kind, record in records
+        ]
+        budget = int((self.token_limit - overhead) * self.token_counter.budget_fraction)
+        chunks = []
+        for group in pack(sizes, budget):
+            if len(group) == 1 and sizes[group[0]] > budget:
+                print(f"record of {sizes[group[0]]} tokens does not fit in one prompt")
+            chunks.append(
+                (
+                    [records[i][1] for i in group if records[i][0] == 0],
+                    [records[i][1] for i in group if records[i][0] == 1],
+                )
+            )
+        return chunks
+
+    def process_data_chunk(
+        self,
+        data1: List[Dict[Any, Any]],
+        data2: List[Dict[Any, Any]],
+        user_input: str,
+        use_cache: bool = True,
+    ) -> str:
         system_message = SystemMessage(
             content=str(self.prompter.prompts_polymarket(data1=data1, data2=data2))
         )
         human_message = HumanMessage(content=user_input)
         messages = [system_message, human_message]
-        result = self.llm.invoke(messages)
-        return result.content
-
-
-    def divide_list(self, original_list, i):
-        # Calculate the size of each sublist
-        sublist_size = math.ceil(len(original_list) / i)
-        
-        # Use list comprehension to create sublists
-        return [original_list[j:j+sublist_size] for j in range(0, len(original_list), sublist_size)]
-    
-    def get_polymarket_llm(self, user_input: str) -> str:
+        return self._invoke(messages, use_cache)
+
+    def process_data_chunks(
+        self, chunks: "list[tuple]", user_input: str, max_workers: int = None
+    ) -> "list[ChunkResult]":
+        """
+        process_data_chunk for every (data1, data2) chunk, at most max_workers
+        at a time. Results come back in chunk order; if one chunk fails the
+        chunks not yet started are cancelled and the error is raised.
+        """
+        max_workers = max_workers or self.chunk_concurrency
+        # Load the tokenizer once here rather than racing to in every worker
+        self.token_counter
+
+        def run(index, data1, data2):
+            tokens = self.estimate_tokens(
+                str(self.prompter.prompts_polymarket(data1=data1, data2=data2))
+                + user_input
+            )
+            start = time.perf_counter()
+            content = self.process_data_chunk(data1, data2, user_input)
+            return ChunkResult(
+                index=index,
+                tokens=tokens,
+                seconds=time.perf_counter() - start,
+                content=content,
+            )
+
+        pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks))))
+        try:
+            futures = [
+                pool.submit(run, i, data1, data2)
+                for i, (data1, data2) in enumerate(chunks)
+            ]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in done:
+                if future.exception() is not None:
+                    raise future.exception()
+            return [future.result() for future in futures]
+        finally:
+            # cancel_futures drops queued chunks after a failure; running ones finish
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def fit_to_token_limit(self, markets: list, user_input: str) -> list:
+        """
+        The longest prefix of `markets` whose prompt stays within token_limit
+        """
+        overhead = self.estimate_tokens(
+            str(self.prompter.prompts_polymarket(data1=[], data2=[]))
+        ) + self.estimate_tokens(user_input)
+        budget = int((self.token_limit - overhead) * self.token_counter.budget_fraction)
+        fitted = []
+        for market in markets:
+            budget -= self.token_counter.count_record(
+                market, lambda r: render_row(r, MARKET_COLUMNS)
+            )
+            if budget < 0:
+                break
+            fitted.append(market)
+        return fitted
+
+    def get_polymarket_llm(self, user_input: str, top_k: int = None) -> str:
+        """
+        Answer over the whole active universe: the top_k markets most relevant
+        to user_input are retrieved from the market index and sent in one call.
+        Without an index, falls back to the current events and markets.
+        """
+        top_k = top_k or self.retrieval_top_k
+        started = time.perf_counter()
+        markets = self.chroma.search_markets(user_input, k=top_k)
+        if markets:
+            markets = self.fit_to_token_limit(markets, user_input)
+            seconds = time.perf_counter() - started
+            print(f"retrieved {len(markets)} of top {top_k} markets in {seconds:.2f}s")
+            return self.process_data_chunk([], markets, user_input)
+        print(
+            "no market index, build one with create-market-index; "
+            "using current events and markets"
+        )
+
         data1 = self.gamma.get_current_events()
         data2 = self.gamma.get_current_markets()
-        
+
         combined_data = str(self.prompter.prompts_polymarket(data1=data1, data2=data2))
-        
+
         # Estimate total tokens
         total_tokens = self.estimate_tokens(combined_data)
-        
+
         # Set a token limit (adjust as needed, leaving room for system and user messages)
         token_limit = self.token_limit
         if total_tokens <= token_limit:
@@ -97,35 +243,25 @@ class Executor:
             return self.process_data_chunk(data1, data2, user_input)
         else:
             # If exceeding limit, process in chunks
-            chunk_size = len(combined_data) // ((total_tokens // token_limit) + 1)
             print(f'total tokens {total_tokens} exceeding llm capacity, now will split and answer')
-            group_size = (total_tokens // token_limit) + 1 # 3 is safe factor
-            keys_no_meaning = ['image','pagerDutyNotificationEnabled','resolvedBy','endDate','clobTokenIds','negRiskMarketID','conditionId','updatedAt','startDate']
-            useful_keys = ['id','questionID','description','liquidity','clobTokenIds','outcomes','outcomePrices','volume','startDate','endDate','question','questionID','events']
-            data1 = retain_keys(data1, useful_keys)
-            cut_1 = self.divide_list(data1, group_size)
-            cut_2 = self.divide_list(data2, group_size)
-            cut_data_12 = zip(cut_1, cut_2)
-
-            results = []
-
-            for cut_data in cut_data_12:
-                sub_data1 = cut_data[0]
-                sub_data2 = cut_data[1]
-                sub_tokens = self.estimate_tokens(str(self.prompter.prompts_polymarket(data1=sub_data1, data2=sub_data2)))
-
-                result = self.process_data_chunk(sub_data1, sub_data2, user_input)
-                results.append(result)
-            
-            combined_result = " ".join(results)
-            
-        
-            
+            cut_data_12 = self.pack_data_chunks(data1, data2, user_input)
+
+            started = time.perf_counter()
+            results = self.process_data_chunks(cut_data_12, user_input)
+            for result in results:
+                seconds = result.seconds
+                print(f"chunk {result.index}: {result.tokens} tokens in {seconds:.2f}s")
+            tokens = sum(result.tokens for result in results)
+            seconds = time.perf_counter() - started
+            print(f"{len(results)} chunks, {tokens} tokens sent in {seconds:.2f}s")
+
+            combined_result = " ".join(result.content for result in results)
+
             return combined_result
-    def filter_events(self, events: "list[SimpleEvent]") -> str:
+
+    def filter_events(self, events: "list[SimpleEvent]", use_cache: bool = True) -> str:
         prompt = self.prompter.filter_events(events)
-        result = self.llm.invoke(prompt)
-        return result.content
+        return self._invoke(prompt, use_cache)
 
     def filter_events_with_rag(self, events: "list[SimpleEvent]") -> str:
         prompt = self.prompter.filter_events()
@@ -138,13 +274,18 @@ class Executor:
         self, filtered_events: "list[SimpleEvent]"
     ) -> "list[SimpleMarket]":
         markets = []
+        market_ids = []
         for e in filtered_events:
             data = json.loads(e[0].json())
-            market_ids = data["metadata"]["markets"].split(",")
-            for market_id in market_ids:
-                market_data = self.gamma.get_market(market_id)
-                formatted_market_data = self.polymarket.map_api_to_market(market_data)
-                markets.append(formatted_market_data)
+            market_ids.extend(data["metadata"]["markets"].split(","))
+        for market_id, market_data in zip(
+            market_ids, self.gamma.get_markets_by_ids(market_ids)
+        ):
+            if market_data is None:
+                print(f"Market {market_id} not found")
+                continue
+            formatted_market_data = self.polymarket.map_api_to_market(market_data)
+            markets.append(formatted_market_data)
         return markets
 
     def filter_markets(self, markets) -> "list[tuple]":
@@ -154,10 +295,10 @@ class Executor:
         print()
         return self.chroma.markets(markets, prompt)
 
-    def source_best_trade(self, market_object) -> str:
-        market_document = market_object[0].dict()
-        market = market_document["metadata"]
-        
+    def market_outcomes(self, market: dict) -> tuple:
+        """
+        (outcomes, outcome_prices) from a filtered market's metadata
+        """
         # Handle missing or malformed outcome_prices and outcomes
         try:
             outcome_prices_str = market.get("outcome_prices", "[]")
@@ -167,7 +308,7 @@ class Executor:
                 outcome_prices = [0.5, 0.5]  # Default binary market prices
         except (ValueError, SyntaxError):
             outcome_prices = [0.5, 0.5]  # Fallback to default prices
-            
+
         try:
             outcomes_str = market.get("outcomes", "[]")
             if outcomes_str and outcomes_str != "[]":
@@ -176,7 +317,19 @@ class Executor:
                 outcomes = ["Yes", "No"]  # Default binary outcomes
         except (ValueError, SyntaxError):
             outcomes = ["Yes", "No"]  # Fallback to default outcomes
-            
+        return outcomes, outcome_prices
+
+    def source_best_trade(
+        self, market_object, use_cache: bool = True, deadline: float = None
+    ) -> str:
+        """
+        Superforecast the market, then ask for a trade on it. Past `deadline`
+        (a time.perf_counter() value) the trade prompt is not sent.
+        """
+        market_document = market_object[0].dict()
+        market = market_document["metadata"]
+        outcomes, outcome_prices = self.market_outcomes(market)
+
         question = market.get("question", "Unknown market")
         description = market_document.get("page_content", question)
 
@@ -184,21 +337,151 @@ class Executor:
         print()
         print("... prompting ... ", prompt)
         print()
-        result = self.llm.invoke(prompt)
-        content = result.content
+        content = self._invoke(prompt, use_cache)
 
         print("result: ", content)
         print()
-        prompt = self.prompter.one_best_trade(content, outcomes, outcome_prices)
+        if deadline is not None and time.perf_counter() > deadline:
+            raise TimeoutError("superforecast took past the deadline")
+        # Price the outcome execute_market_order buys, the edge is measured on it
+        prompt = self.prompter.one_best_trade(
+            content, outcomes, outcome_prices, outcomes[MARKET_ORDER_OUTCOME]
+        )
         print("... prompting ... ", prompt)
         print()
-        result = self.llm.invoke(prompt)
-        content = result.content
+        content = self._invoke(prompt, use_cache)
 
         print("result: ", content)
         print()
         return content
 
+    def parse_trade(self, best_trade: str) -> Optional[tuple]:
+        """
+        (price, size, side) from a one_best_trade response, None if it has no trade
+        """
+        price = re.search(r"price:\W*(\d*\.?\d+)", best_trade)
+        size = re.search(r"size:\W*(\d*\.?\d+)", best_trade)
+        side = re.search(r"side:\W*(BUY|SELL)", best_trade, re.IGNORECASE)
+        if not (price and size and side):
+            return None
+        return float(price.group(1)), float(size.group(1)), side.group(1).upper()
+
+    def evaluate_markets(
+        self, markets: "list[tuple]", max_workers: int = None, timeout: float = None
+    ) -> "list[TradeCandidate]":
+        """
+        source_best_trade for every filtered market, at most max_workers at a
+        time, each allowed `timeout` seconds once started. Markets that fail,
+        time out or return no trade execute_market_order can place (a BUY)
+        are skipped; the rest come back ranked by edge, best first.
+        """
+        max_workers = max(1, min(max_workers or self.trade_concurrency, len(markets)))
+        timeout = timeout or self.trade_timeout
+        started = {}
+
+        def run(index, market):
+            started[index] = time.perf_counter()
+            return self.source_best_trade(market, deadline=started[index] + timeout)
+
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        # A timed out call keeps its worker, so the batch as a whole gets a deadline too
+        deadline = time.perf_counter() + timeout * (
+            math.ceil(len(markets) / max_workers) + 1
+        )
+        candidates = []
+        try:
+            futures = {
+                pool.submit(run, i, market): i for i, market in enumerate(markets)
+            }
+            pending = set(futures)
+            # Timed out but still running; waited on so a freed worker wakes us
+            abandoned = set()
+            while pending:
+                expiries = [
+                    started[futures[future]] + timeout
+                    for future in pending
+                    if futures[future] in started
+                ]
+                wake_at = min(expiries + [deadline])
+                if len(expiries) < len(pending):
+                    # A queued market may start any moment, look again by its expiry
+                    wake_at = min(wake_at, time.perf_counter() + timeout)
+                done, _ = wait(
+                    pending | abandoned,
+                    timeout=max(0.0, wake_at - time.perf_counter()),
+                    return_when=FIRST_COMPLETED,
+                )
+                abandoned -= done
+                for future in done & pending:
+                    index = futures[future]
+                    try:
+                        content = future.result()
+                    except Exception as e:
+                        print(f"Skipping market {index}: {e}")
+                        continue
+                    candidate = self.trade_candidate(
+                        index,
+                        markets[index],
+                        content,
+                        time.perf_counter() - started[index],
+                    )
+                    if candidate is not None:
+                        candidates.append(candidate)
+                pending -= done
+                now = time.perf_counter()
+                expired = {
+                    future
+                    for future in pending
+                    if now >= deadline
+                    or (
+                        futures[future] in started
+                        and now - started[futures[future]] >= timeout
+                    )
+                }
+                for future in expired:
+                    print(
+                        f"Skipping market {futures[future]}: no trade after {timeout}s"
+                    )
+                pending -= expired
+                abandoned |= expired
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return sorted(candidates, key=lambda candidate: -candidate.edge)
+
+    def trade_candidate(
+        self, index: int, market_object, content: str, seconds: float
+    ) -> Optional[TradeCandidate]:
+        trade = self.parse_trade(content)
+        if trade is None:
+            print(f"Skipping market {index}: no trade in {content!r}")
+            return None
+        price, size, side = trade
+        if side != "BUY":
+            print(f"Skipping market {index}: only market BUYs are executed, got {side}")
+            return None
+        market = market_object[0].dict()["metadata"]
+        outcomes, outcome_prices = self.market_outcomes(market)
+        # The prompt priced the token execute_market_order buys; skip answers
+        # that priced another outcome instead
+        outcome = re.search(r"outcome:\W*([^'\",\n`]+)", content)
+        expected = str(outcomes[MARKET_ORDER_OUTCOME])
+        if outcome and outcome.group(1).strip().lower() != expected.lower():
+            print(f"Skipping market {index}: priced {outcome.group(1)}, not {expected}")
+            return None
+        market_price = float(outcome_prices[MARKET_ORDER_OUTCOME])
+        edge = price - market_price
+        return TradeCandidate(
+            index=index,
+            question=market.get("question", "Unknown market"),
+            price=price,
+            size=size,
+            side=side,
+            market_price=market_price,
+            edge=edge,
+            seconds=seconds,
+            content=content,
+        )
+
     def format_trade_prompt_for_execution(self, best_trade: str) -> float:
         data = best_trade.split(",")
         # price = re.findall("\d+\.\d+", data[0])[0]
@@ -206,11 +489,12 @@ class Executor:
         usdc_balance = self.polymarket.get_usdc_balance()
         return float(size) * usdc_balance
 
-    def source_best_market_to_create(self, filtered_markets) -> str:
+    def source_best_market_to_create(
+        self, filtered_markets, use_cache: bool = True
+    ) -> str:
         prompt = self.prompter.create_new_market(filtered_markets)
         print()
         print("... prompting ... ", prompt)
         print()
-        result = self.llm.invoke(prompt)
-        content = result.content
+        content = self._invoke(prompt, use_cache)
         return content
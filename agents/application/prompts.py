@@ -1,6 +1,8 @@
 from typing import List
 from datetime import datetime
 
+from agents.utils.tabular import render_events, render_markets
+
 
 class Prompter:
 
@@ -33,34 +35,20 @@ class Prompter:
         
         """
 
-    def prompts_polymarket(
-        self, data1: str, data2: str, market_question: str, outcome: str
-    ) -> str:
-        current_market_data = str(data1)
-        current_event_data = str(data2)
+    def prompts_polymarket(self, data1: str, data2: str) -> str:
+        # data1 is the events and data2 the markets, as get_polymarket_llm passes them
+        current_event_data = render_events(data1)
+        current_market_data = render_markets(data2)
         return f"""
         You are an AI assistant for users of a prediction market called Polymarket.
         Users want to place bets based on their beliefs of market outcomes such as political or sports events.
-        
-        Here is data for current Polymarket markets {current_market_data} and 
-        current Polymarket events {current_event_data}.
-
-        Help users identify markets to trade based on their interests or queries.
-        Provide specific information for markets including probabilities of outcomes.
-        Give your response in the following format:
 
-        I believe {market_question} has a likelihood {float} for outcome of {outcome}.
-        """
+        Here is data for current Polymarket markets, one per line with "|" separated columns:
+        {current_market_data}
 
-    def prompts_polymarket(self, data1: str, data2: str) -> str:
-        current_market_data = str(data1)
-        current_event_data = str(data2)
-        return f"""
-        You are an AI assistant for users of a prediction market called Polymarket.
-        Users want to place bets based on their beliefs of market outcomes such as political or sports events.
+        and current Polymarket events:
+        {current_event_data}
 
-        Here is data for current Polymarket markets {current_market_data} and 
-        current Polymarket events {current_event_data}.
         Help users identify markets to trade based on their interests or queries.
         Provide specific information for markets including probabilities of outcomes.
         """
@@ -148,7 +136,10 @@ class Prompter:
         prediction: str,
         outcomes: List[str],
         outcome_prices: str,
+        outcome: str = None,
     ) -> str:
+        # The outcome whose token the trade buys; price and side refer to it
+        outcome = outcome or outcomes[-1]
         return (
             self.polymarket_analyst_api()
             + f"""
@@ -167,18 +158,22 @@ class Prompter:
 
         The current outcomes ${outcomes} prices are: ${outcome_prices}
 
+        You can only trade the `{outcome}` outcome, so price and side are for `{outcome}`.
+
         Given your prediction, respond with a genius trade in the format:
         `
-            price:'price_on_the_orderbook',
+            outcome:'{outcome}',
+            price:'price_of_{outcome}_on_the_orderbook',
             size:'percentage_of_total_funds',
             side: BUY or SELL,
         `
 
-        Your trade should approximate price using the likelihood in your prediction.
+        Your trade should approximate price using the likelihood of `{outcome}` in your prediction.
 
         Example response:
 
         RESPONSE```
+            outcome:'{outcome}',
             price:0.5,
             size:0.1,
             side:BUY,
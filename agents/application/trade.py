@@ -1,7 +1,12 @@
 from agents.application.executor import Executor as Agent
+from agents.polymarket.book_analytics import BookDepth
 from agents.polymarket.gamma import GammaMarketClient as Gamma
-from agents.polymarket.polymarket import Polymarket
+from agents.polymarket.polymarket import MARKET_ORDER_OUTCOME, Polymarket
+from agents.polymarket.positions import PositionBook
+from agents.polymarket.snapshot import MarketSnapshot
 
+import ast
+import os
 import shutil
 
 
@@ -9,7 +14,14 @@ class Trader:
     def __init__(self):
         self.polymarket = Polymarket()
         self.gamma = Gamma()
+        self.snapshot = MarketSnapshot(gamma_client=self.gamma)
         self.agent = Agent()
+        self.max_slippage = float(os.getenv("MAX_SLIPPAGE", 0.02))
+        self.min_order_notional = float(os.getenv("MIN_ORDER_NOTIONAL", 1.0))
+        # Filtered markets superforecast concurrently before picking a trade
+        self.trade_candidates = int(os.getenv("TRADE_CANDIDATES", 5))
+        self.positions = PositionBook(os.getenv("FILL_LOG_PATH", "./local_db/fills.bin"))
+        self.positions_loaded = False
 
     def pre_trade_logic(self) -> None:
         self.clear_local_dbs()
@@ -38,8 +50,9 @@ class Trader:
             self.pre_trade_logic()
 
             # Use current markets instead of stale events
-            current_markets = self.gamma.get_current_markets(limit=50)
-            print(f"1. FOUND {len(current_markets)} CURRENT MARKETS")
+            sync_stats = self.snapshot.sync()
+            current_markets = self.snapshot.get_current_markets(limit=50)
+            print(f"1. FOUND {len(current_markets)} CURRENT MARKETS ({sync_stats})")
 
             # Convert to SimpleEvent objects for compatibility with existing RAG system
             from agents.utils.objects import SimpleEvent
@@ -93,11 +106,28 @@ class Trader:
             filtered_markets = self.agent.filter_markets(markets)
             print(f"4. FILTERED {len(filtered_markets)} MARKETS")
 
-            market = filtered_markets[0]
-            best_trade = self.agent.source_best_trade(market)
-            print(f"5. CALCULATED TRADE {best_trade}")
-
-            amount = self.agent.format_trade_prompt_for_execution(best_trade)
+            candidates = self.agent.evaluate_markets(
+                filtered_markets[: self.trade_candidates]
+            )
+            if not candidates:
+                print("5. NO TRADE, none of the markets returned a usable trade")
+                return
+            best = candidates[0]
+            market = filtered_markets[best.index]
+            best_trade = best.content
+            print(
+                f"5. CALCULATED TRADE {best_trade} "
+                f"(edge {best.edge:+.3f}, best of {len(candidates)} markets)"
+            )
+
+            amount = best.size * self.polymarket.get_usdc_balance()
+            amount = self.size_market_order(market, amount)
+            if amount < self.min_order_notional:
+                print(
+                    f"6. SKIPPED, the book can't fill {self.min_order_notional} USDC "
+                    f"within {self.max_slippage:.1%} slippage"
+                )
+                return
             # Please refer to TOS before uncommenting: polymarket.com/tos
             # trade = self.polymarket.execute_market_order(market, amount)
             # print(f"6. TRADED {trade}")
@@ -106,8 +136,42 @@ class Trader:
             print(f"Error {e} \n \n Retrying")
             self.one_best_trade()
 
+    def size_market_order(self, market, amount: float) -> float:
+        """
+        Cap a market BUY at the notional the book can absorb within max_slippage
+        """
+        token_ids = ast.literal_eval(market[0].dict()["metadata"]["clob_token_ids"])
+        token_id = token_ids[MARKET_ORDER_OUTCOME]
+        depth = BookDepth.from_summary(self.polymarket.get_orderbook(token_id))
+        capacity = depth.max_notional(self.max_slippage)
+        if amount > capacity:
+            print(
+                f"Resizing order from {amount:.2f} to {capacity:.2f} USDC, "
+                f"vwap {depth.vwap(amount)} vs best ask {depth.best}"
+            )
+            return capacity
+        return amount
+
     def maintain_positions(self):
-        pass
+        """
+        Apply fills since the last one seen and mark open positions at the midpoint
+        """
+        if not self.positions_loaded:
+            replayed = self.positions.load()
+            self.positions_loaded = True
+            print(f"Replayed {replayed} fills from {self.positions.log_path}")
+        trades = self.polymarket.get_trades(after=self.positions.last_match_time)
+        new_fills = self.positions.apply_trades(
+            trades, self.polymarket.get_address_for_private_key()
+        )
+
+        positions = self.positions.positions()
+        quotes = self.polymarket.get_quotes([p.token_id for p in positions])
+        self.positions.update_marks(
+            {token_id: quote.midpoint for token_id, quote in quotes.items()}
+        )
+        print(f"{new_fills} new fills, {self.positions.totals()}")
+        return self.positions.positions()
 
     def incentive_farm(self):
         pass
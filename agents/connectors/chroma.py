@@ -7,15 +7,139 @@ from langchain_community.document_loaders import JSONLoader
 from langchain_community.vectorstores.chroma import Chroma
 
 from agents.polymarket.gamma import GammaMarketClient
+from agents.polymarket.snapshot import MarketSnapshot
 from agents.utils.objects import SimpleEvent, SimpleMarket
 
+RAG_MARKET_FIELDS = [
+    "id",
+    "question",
+    "description",
+    "outcomes",
+    "outcomePrices",
+    "clobTokenIds",
+    "endDate",
+    "volume",
+    "liquidity",
+]
+
+MARKET_INDEX_DIRECTORY = "./local_db_market_index"
+
+
+def market_document(market: dict) -> str:
+    # What gets embedded: the question carries most of the meaning, the start
+    # of the description disambiguates
+    description = " ".join(str(market.get("description") or "").split())
+    return f"{market.get('question', '')}\n{description[:1000]}"
+
+
+def market_metadata(market: dict) -> dict:
+    # Chroma metadata values must be scalars, and None is not allowed
+    return {
+        field: str(market[field])
+        for field in RAG_MARKET_FIELDS
+        if field != "description" and market.get(field) is not None
+    }
+
 
 class PolymarketRAG:
     def __init__(self, local_db_directory=None, embedding_function=None) -> None:
         self.gamma_client = GammaMarketClient()
+        self.snapshot = MarketSnapshot(gamma_client=self.gamma_client)
         self.local_db_directory = local_db_directory
         self.embedding_function = embedding_function
 
+    def embeddings(self):
+        if self.embedding_function is None:
+            self.embedding_function = OpenAIEmbeddings(model="text-embedding-3-small")
+        return self.embedding_function
+
+    def market_index(self, directory: str = MARKET_INDEX_DIRECTORY) -> Chroma:
+        return Chroma(
+            collection_name="markets",
+            persist_directory=directory,
+            embedding_function=self.embeddings(),
+        )
+
+    def build_market_index(
+        self,
+        directory: str = MARKET_INDEX_DIRECTORY,
+        concurrency: int = 8,
+        batch_size: int = 256,
+    ) -> dict:
+        """
+        Embed every active market of the snapshot into a persistent index.
+        A manifest of each indexed market's updatedAt is kept next to it, so a
+        rebuild only embeds markets that are new or changed and deletes the
+        ones that closed.
+        """
+        self.snapshot.sync(concurrency=concurrency)
+        markets = self.snapshot.markets_by_id
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        manifest_path = os.path.join(directory, "manifest.json")
+        manifest = {}
+        if os.path.isfile(manifest_path):
+            with open(manifest_path, "r") as manifest_file:
+                manifest = json.load(manifest_file)
+
+        index = self.market_index(directory)
+        removed = [market_id for market_id in manifest if market_id not in markets]
+        if removed:
+            index.delete(ids=removed)
+        changed = [
+            market
+            for market_id, market in markets.items()
+            if market_id not in manifest
+            or manifest[market_id] != market.get("updatedAt")
+        ]
+        for start in range(0, len(changed), batch_size):
+            batch = changed[start : start + batch_size]
+            # add_texts upserts, so a changed market replaces its old entry
+            index.add_texts(
+                texts=[market_document(market) for market in batch],
+                metadatas=[market_metadata(market) for market in batch],
+                ids=[str(market["id"]) for market in batch],
+            )
+
+        manifest = {
+            market_id: market.get("updatedAt") for market_id, market in markets.items()
+        }
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w+") as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(tmp_path, manifest_path)
+        return {
+            "embedded": len(changed),
+            "removed": len(removed),
+            "total": len(markets),
+        }
+
+    def search_markets(
+        self,
+        query: str,
+        k: int = 20,
+        directory: str = MARKET_INDEX_DIRECTORY,
+        sync: bool = True,
+    ) -> "list[dict]":
+        """
+        The k markets most relevant to `query`, most relevant first, as full
+        snapshot records. The snapshot is delta synced first so prices are
+        current; markets that closed since the index was built are dropped.
+        Empty when the index has not been built.
+        """
+        if not os.path.isfile(os.path.join(directory, "manifest.json")):
+            return []
+        documents = self.market_index(directory).similarity_search(query, k=k)
+        if sync:
+            self.snapshot.sync()
+        elif not self.snapshot.loaded:
+            self.snapshot.load()
+        markets = [
+            self.snapshot.markets_by_id.get(document.metadata.get("id"))
+            for document in documents
+        ]
+        return [market for market in markets if market is not None]
+
     def load_json_from_local(
         self, json_file_path=None, vector_db_directory="./local_db"
     ) -> None:
@@ -29,8 +153,17 @@ class PolymarketRAG:
             loaded_docs, embedding_function, persist_directory=vector_db_directory
         )
 
-    def create_local_markets_rag(self, local_directory="./local_db") -> None:
-        all_markets = self.gamma_client.get_all_current_markets()
+    def create_local_markets_rag(
+        self, local_directory="./local_db", concurrency: int = 8, stream: bool = False
+    ) -> None:
+        if stream:
+            # Write markets to disk as they arrive instead of holding the universe
+            all_markets = self.gamma_client.iter_current_markets(
+                fields=RAG_MARKET_FIELDS
+            )
+        else:
+            print(self.snapshot.sync(concurrency=concurrency))
+            all_markets = self.snapshot.get_all_markets()
 
         if not os.path.isdir(local_directory):
             os.mkdir(local_directory)
@@ -38,7 +171,12 @@ class PolymarketRAG:
         local_file_path = f"{local_directory}/all-current-markets_{time.time()}.json"
 
         with open(local_file_path, "w+") as output_file:
-            json.dump(all_markets, output_file)
+            output_file.write("[")
+            for i, market in enumerate(all_markets):
+                if i:
+                    output_file.write(",")
+                json.dump(market, output_file)
+            output_file.write("]")
 
         self.load_json_from_local(
             json_file_path=local_file_path, vector_db_directory=local_directory
@@ -3,6 +3,7 @@ import os
 
 from newsapi import NewsApiClient
 
+from agents.utils.http_clients import get_requests_session
 from agents.utils.objects import Article
 
 
@@ -25,7 +26,9 @@ class News:
             "technology",
         }
 
-        self.API = NewsApiClient(os.getenv("NEWSAPI_API_KEY"))
+        self.API = NewsApiClient(
+            os.getenv("NEWSAPI_API_KEY"), session=get_requests_session()
+        )
 
     def get_articles_for_cli_keywords(self, keywords) -> "list[Article]":
         query_words = keywords.split(",")
@@ -0,0 +1,145 @@
+# batched, block scoped reads of the wallet's balances, positions and approvals
+import threading
+from typing import Optional
+
+from eth_abi import decode, encode
+
+from agents.utils.json_rpc import JsonRpcClient
+from agents.utils.objects import AccountState
+
+USDC_ADDRESS = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"
+CTF_ADDRESS = "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045"
+# The contracts _init_approvals approves: CTF exchange, neg risk exchange and
+# neg risk adapter
+SPENDERS = [
+    "0x4bFb41d5B3570DeFd03C39a9A4D8dE6Bd8B8982E",
+    "0xC5d563A36AE78145C45a50134d48A1215220f80a",
+    "0xd91E80cF2E7be2e162c6513ceD06f1dD0dA35296",
+]
+
+BALANCE_OF = bytes.fromhex("70a08231")
+ALLOWANCE = bytes.fromhex("dd62ed3e")
+BALANCE_OF_BATCH = bytes.fromhex("4e1273f4")
+IS_APPROVED_FOR_ALL = bytes.fromhex("e985e9c5")
+
+# USDC and CTF position tokens both use 6 decimals
+DECIMALS = 10**6
+
+
+class AccountStateReader:
+    """
+    Reads USDC balance, USDC allowances, CTF approvals and CTF position balances
+    for one address in a single JSON-RPC batch. Given a block number the batch
+    is pinned to it, and results are cached per block so a repeated read costs
+    nothing. Without one the calls read "latest" and the batch also carries
+    eth_blockNumber, so a read is still one round trip.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        rpc_url: str = "https://polygon-rpc.com",
+        usdc_address: str = USDC_ADDRESS,
+        ctf_address: str = CTF_ADDRESS,
+        spenders: "list[str]" = SPENDERS,
+    ) -> None:
+        self.address = address
+        self.rpc_url = rpc_url
+        self.usdc_address = usdc_address
+        self.ctf_address = ctf_address
+        self.spenders = spenders
+        self.rpc = JsonRpcClient(rpc_url)
+        self.cache: "dict[int, AccountState]" = {}
+        self._lock = threading.Lock()
+
+    def block_number(self) -> int:
+        return int(self.rpc.call("eth_blockNumber", []), 16)
+
+    def _eth_call(self, to: str, data: bytes, block_tag: str) -> tuple:
+        return ("eth_call", [{"to": to, "data": "0x" + data.hex()}, block_tag])
+
+    def read(
+        self, token_ids: "list[str]" = (), block_number: Optional[int] = None
+    ) -> AccountState:
+        """
+        State at `block_number` (the latest block if None), including the
+        balances of `token_ids`. Token ids already read at a given block are not
+        fetched again.
+        """
+        token_ids = [str(token_id) for token_id in token_ids]
+        cached = None
+        if block_number is not None:
+            with self._lock:
+                cached = self.cache.get(block_number)
+            if cached is not None and all(t in cached.positions for t in token_ids):
+                return cached
+
+        block_tag = "latest" if block_number is None else hex(block_number)
+        calls = [
+            self._eth_call(
+                self.usdc_address,
+                BALANCE_OF + encode(["address"], [self.address]),
+                block_tag,
+            )
+        ]
+        for spender in self.spenders:
+            calls.append(
+                self._eth_call(
+                    self.usdc_address,
+                    ALLOWANCE + encode(["address", "address"], [self.address, spender]),
+                    block_tag,
+                )
+            )
+            calls.append(
+                self._eth_call(
+                    self.ctf_address,
+                    IS_APPROVED_FOR_ALL
+                    + encode(["address", "address"], [self.address, spender]),
+                    block_tag,
+                )
+            )
+        if token_ids:
+            calls.append(
+                self._eth_call(
+                    self.ctf_address,
+                    BALANCE_OF_BATCH
+                    + encode(
+                        ["address[]", "uint256[]"],
+                        [[self.address] * len(token_ids), [int(t) for t in token_ids]],
+                    ),
+                    block_tag,
+                )
+            )
+
+        if block_number is None:
+            # The block the "latest" calls read, in the same round trip
+            calls.append(("eth_blockNumber", []))
+        results = self.rpc.batch(calls)
+        if block_number is None:
+            block_number = int(results.pop(), 16)
+            with self._lock:
+                cached = self.cache.get(block_number)
+        results = [bytes.fromhex(result[2:]) for result in results]
+        (balance,) = decode(["uint256"], results[0])
+        allowances, approvals = {}, {}
+        for i, spender in enumerate(self.spenders):
+            (allowances[spender],) = decode(["uint256"], results[1 + 2 * i])
+            (approvals[spender],) = decode(["bool"], results[2 + 2 * i])
+        positions = dict(cached.positions) if cached is not None else {}
+        if token_ids:
+            (balances,) = decode(["uint256[]"], results[-1])
+            positions.update({t: b / DECIMALS for t, b in zip(token_ids, balances)})
+
+        state = AccountState(
+            block_number=block_number,
+            address=self.address,
+            usdc_balance=balance / DECIMALS,
+            usdc_allowances={s: a / DECIMALS for s, a in allowances.items()},
+            ctf_approvals=approvals,
+            positions=positions,
+        )
+        with self._lock:
+            # Older blocks are not read again, keep just the last couple
+            self.cache = {n: s for n, s in self.cache.items() if n > block_number - 2}
+            self.cache[block_number] = state
+        return state
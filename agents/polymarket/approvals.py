@@ -0,0 +1,203 @@
+# pipelined submission of the usdc / ctf approvals a trading wallet needs
+import logging
+import time
+
+from eth_abi import encode
+from eth_account import Account
+
+from agents.polymarket.account_state import (
+    CTF_ADDRESS,
+    SPENDERS,
+    USDC_ADDRESS,
+    AccountStateReader,
+)
+from agents.utils.json_rpc import JsonRpcClient, JsonRpcError
+from agents.utils.objects import ApprovalResult
+
+logger = logging.getLogger(__name__)
+
+APPROVE = bytes.fromhex("095ea7b3")
+SET_APPROVAL_FOR_ALL = bytes.fromhex("a22cb465")
+MAX_UINT256 = 2**256 - 1
+
+
+class ApprovalSubmitter:
+    """
+    Sends the USDC approve and CTF setApprovalForAll transactions for every
+    exchange contract without waiting on each one. Allowances already in place
+    are skipped, nonces are assigned locally from the pending count, all
+    transactions are signed and broadcast in one batch, and their receipts are
+    polled together, so a fresh wallet is set up in about one block time.
+    """
+
+    def __init__(
+        self,
+        private_key: str,
+        rpc_url: str = "https://polygon-rpc.com",
+        chain_id: int = 137,
+        usdc_address: str = USDC_ADDRESS,
+        ctf_address: str = CTF_ADDRESS,
+        spenders: "list[str]" = SPENDERS,
+        min_allowance: float = 1e12,
+        gas_multiplier: float = 1.2,
+        poll_interval: float = 2.0,
+        timeout: float = 600.0,
+    ) -> None:
+        self.private_key = private_key
+        self.address = Account.from_key(private_key).address
+        self.chain_id = chain_id
+        self.usdc_address = usdc_address
+        self.ctf_address = ctf_address
+        self.spenders = spenders
+        self.min_allowance = min_allowance
+        self.gas_multiplier = gas_multiplier
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.rpc = JsonRpcClient(rpc_url)
+        self.reader = AccountStateReader(
+            self.address,
+            rpc_url=rpc_url,
+            usdc_address=usdc_address,
+            ctf_address=ctf_address,
+            spenders=spenders,
+        )
+
+    def missing_approvals(self) -> "list[tuple[str, str, str, bytes]]":
+        """
+        (contract, method, spender, calldata) for each approval not yet in place
+        """
+        state = self.reader.read()
+        missing = []
+        for spender in self.spenders:
+            if state.usdc_allowances.get(spender, 0) < self.min_allowance:
+                data = APPROVE + encode(["address", "uint256"], [spender, MAX_UINT256])
+                missing.append((self.usdc_address, "approve", spender, data))
+            if not state.ctf_approvals.get(spender):
+                data = SET_APPROVAL_FOR_ALL + encode(
+                    ["address", "bool"], [spender, True]
+                )
+                missing.append((self.ctf_address, "setApprovalForAll", spender, data))
+        return missing
+
+    def submit(self) -> "list[ApprovalResult]":
+        missing = self.missing_approvals()
+        if not missing:
+            return []
+
+        # Nonce, gas price and every gas estimate in one round trip
+        nonce_hex, gas_price_hex, *estimates = self.rpc.batch(
+            [
+                ("eth_getTransactionCount", [self.address, "pending"]),
+                ("eth_gasPrice", []),
+            ]
+            + [
+                (
+                    "eth_estimateGas",
+                    [{"from": self.address, "to": to, "data": "0x" + data.hex()}],
+                )
+                for to, _, _, data in missing
+            ]
+        )
+        nonce = int(nonce_hex, 16)
+        gas_price = int(gas_price_hex, 16)
+
+        results, transactions = [], []
+        for (to, method, spender, data), estimate in zip(missing, estimates):
+            transactions.append(
+                {
+                    "gas": int(int(estimate, 16) * self.gas_multiplier),
+                    "to": to,
+                    "value": 0,
+                    "data": "0x" + data.hex(),
+                    "chainId": self.chain_id,
+                }
+            )
+            results.append(
+                ApprovalResult(contract=to, method=method, spender=spender, nonce=0)
+            )
+
+        sent_at = time.monotonic()
+        self.send(transactions, results, nonce, gas_price)
+        self.wait_for_receipts(results, sent_at)
+        return results
+
+    def send(
+        self,
+        transactions: "list[dict]",
+        results: "list[ApprovalResult]",
+        nonce: int,
+        gas_price: int,
+    ) -> None:
+        """
+        Sign and broadcast every transaction in one batch, nonces counting up
+        from `nonce`. A failed send leaves the ones after it stuck behind a
+        nonce gap, so the nonce is resynced from the pending count and the
+        failed transaction and the rest are re-signed and sent again, at a gas
+        price high enough to replace what was already broadcast at those
+        nonces. A transaction that fails twice is given up on; the rest shift
+        down a nonce, which can leave an earlier copy of the last approval
+        queued behind them. Approvals are idempotent, so that only costs gas.
+        """
+        queue = list(range(len(transactions)))
+        attempts = [0] * len(transactions)
+        while queue:
+            raw_transactions = []
+            for offset, i in enumerate(queue):
+                transaction = dict(
+                    transactions[i], nonce=nonce + offset, gasPrice=gas_price
+                )
+                signed = Account.sign_transaction(transaction, self.private_key)
+                raw_transactions.append("0x" + bytes(signed.raw_transaction).hex())
+                results[i].nonce = nonce + offset
+            sent = self.rpc.batch(
+                [("eth_sendRawTransaction", [raw]) for raw in raw_transactions],
+                raise_errors=False,
+            )
+            failed = next(
+                (n for n, reply in enumerate(sent) if isinstance(reply, JsonRpcError)),
+                len(sent),
+            )
+            for i, tx_hash in zip(queue[:failed], sent[:failed]):
+                results[i].tx_hash = tx_hash
+            if failed == len(sent):
+                return
+
+            i = queue[failed]
+            attempts[i] += 1
+            logger.warning(
+                f"{results[i].method} at nonce {nonce + failed}: {sent[failed]}"
+            )
+            if attempts[i] > 1:
+                results[i].error = str(sent[failed])
+                failed += 1
+            queue = queue[failed:]
+            nonce = int(
+                self.rpc.call("eth_getTransactionCount", [self.address, "pending"]), 16
+            )
+            # Replacing a pooled transaction takes a gas price over 10% higher
+            gas_price = gas_price * 9 // 8 + 1
+
+    def wait_for_receipts(self, results: "list[ApprovalResult]", sent_at: float):
+        pending = [result for result in results if result.tx_hash is not None]
+        while pending:
+            receipts = self.rpc.batch(
+                [("eth_getTransactionReceipt", [r.tx_hash]) for r in pending],
+                raise_errors=False,
+            )
+            now = time.monotonic()
+            still_pending = []
+            for result, receipt in zip(pending, receipts):
+                if isinstance(receipt, JsonRpcError) or receipt is None:
+                    still_pending.append(result)
+                    continue
+                result.status = int(receipt["status"], 16)
+                result.block_number = int(receipt["blockNumber"], 16)
+                result.latency = now - sent_at
+            pending = still_pending
+            if pending and now - sent_at > self.timeout:
+                for result in pending:
+                    result.error = f"No receipt after {self.timeout}s"
+                    logger.warning(f"{result.method} {result.tx_hash} timed out")
+                return
+            if pending:
+                time.sleep(self.poll_interval)
@@ -0,0 +1,153 @@
+# depth, vwap and slippage estimates for walking an order book
+from typing import Optional
+
+import numpy as np
+
+
+def _level_arrays(levels, descending: bool) -> "tuple[np.ndarray, np.ndarray]":
+    # Accepts OrderSummary objects, {"price", "size"} dicts or (price, size) pairs
+    if len(levels) == 0:
+        return np.empty(0), np.empty(0)
+    first = levels[0]
+    if isinstance(first, dict):
+        pairs = [(level["price"], level["size"]) for level in levels]
+    elif hasattr(first, "price"):
+        pairs = [(level.price, level.size) for level in levels]
+    else:
+        pairs = levels
+    array = np.asarray(pairs, dtype=np.float64)
+    # The CLOB does not promise an order, so sort best first
+    order = np.argsort(-array[:, 0] if descending else array[:, 0], kind="stable")
+    return array[order, 0], array[order, 1]
+
+
+class BookDepth:
+    """
+    One side of a book as NumPy arrays, best level first. Quantities are in
+    USDC notional, the unit market orders are sized in: for a BUY the asks are
+    walked spending `notional`, for a SELL the bids are walked until the
+    proceeds reach it.
+    """
+
+    def __init__(self, prices: np.ndarray, sizes: np.ndarray, side: str = "BUY"):
+        self.side = side
+        self.prices = prices
+        self.sizes = sizes
+        self.cum_size = np.cumsum(sizes)
+        self.cum_notional = np.cumsum(prices * sizes)
+
+    @classmethod
+    def from_levels(cls, levels, side: str = "BUY") -> "BookDepth":
+        """
+        levels are the asks for a BUY and the bids for a SELL
+        """
+        prices, sizes = _level_arrays(levels, descending=side == "SELL")
+        return cls(prices, sizes, side)
+
+    @classmethod
+    def from_summary(cls, summary, side: str = "BUY") -> "BookDepth":
+        return cls.from_levels(summary.asks if side == "BUY" else summary.bids, side)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    @property
+    def best(self) -> Optional[float]:
+        return float(self.prices[0]) if len(self) else None
+
+    @property
+    def total_notional(self) -> float:
+        return float(self.cum_notional[-1]) if len(self) else 0.0
+
+    def fill(self, notional: float) -> "tuple[float, float]":
+        """
+        (shares, notional) filled by an order for `notional`; less than asked
+        when the book is too thin.
+        """
+        if not len(self) or notional <= 0:
+            return 0.0, 0.0
+        level = int(np.searchsorted(self.cum_notional, notional))
+        if level >= len(self):
+            return float(self.cum_size[-1]), self.total_notional
+        size_before = self.cum_size[level - 1] if level else 0.0
+        notional_before = self.cum_notional[level - 1] if level else 0.0
+        shares = size_before + (notional - notional_before) / self.prices[level]
+        return float(shares), float(notional)
+
+    def vwap(self, notional: float) -> Optional[float]:
+        shares, filled = self.fill(notional)
+        return filled / shares if shares else None
+
+    def slippage(self, notional: float) -> Optional[float]:
+        """
+        How far the vwap is from the best price, as a fraction of it
+        """
+        vwap = self.vwap(notional)
+        if vwap is None:
+            return None
+        return abs(vwap - self.best) / self.best
+
+    def max_notional(self, max_slippage: float) -> float:
+        """
+        Largest notional whose vwap stays within `max_slippage` of the best price
+        """
+        if not len(self):
+            return 0.0
+        sign = 1.0 if self.side == "BUY" else -1.0
+        limit = self.best * (1 + sign * max_slippage)
+        vwaps = self.cum_notional / self.cum_size
+        # vwap only gets worse level by level, so the levels within the cap are
+        # a prefix
+        within = int(np.count_nonzero(sign * (vwaps - limit) <= 1e-12))
+        if within == len(self):
+            return self.total_notional
+        size_before = self.cum_size[within - 1] if within else 0.0
+        notional_before = self.cum_notional[within - 1] if within else 0.0
+        price = self.prices[within]
+        # Part of the next level, up to where the running vwap reaches the limit
+        shares = (limit * size_before - notional_before) / (price - limit)
+        return float(notional_before + max(shares, 0.0) * price)
+
+
+def estimate_fills(
+    depths: "list[BookDepth]", notional: float
+) -> "tuple[np.ndarray, np.ndarray]":
+    """
+    vwap and slippage of an order for `notional` against every book at once.
+    Books are padded into one matrix so the walk is a handful of array ops
+    instead of a Python loop; entries are NaN where a book is empty or too thin
+    to fill the order.
+    """
+    count = len(depths)
+    width = max((len(depth) for depth in depths), default=0)
+    vwap = np.full(count, np.nan)
+    if not width:
+        return vwap, np.full(count, np.nan)
+
+    prices = np.ones((count, width))
+    cum_size = np.zeros((count, width))
+    cum_notional = np.zeros((count, width))
+    best = np.full(count, np.nan)
+    for row, depth in enumerate(depths):
+        n = len(depth)
+        if not n:
+            continue
+        prices[row, :n] = depth.prices
+        cum_size[row, :n] = depth.cum_size
+        cum_notional[row, :n] = depth.cum_notional
+        # Padding repeats the last level with no size, so it adds no notional
+        prices[row, n:] = depth.prices[-1]
+        cum_size[row, n:] = depth.cum_size[-1]
+        cum_notional[row, n:] = depth.cum_notional[-1]
+        best[row] = depth.prices[0]
+
+    rows = np.arange(count)
+    level = np.count_nonzero(cum_notional < notional, axis=1)
+    filled = level < width
+    level = np.minimum(level, width - 1)
+    previous = np.maximum(level - 1, 0)
+    size_before = np.where(level > 0, cum_size[rows, previous], 0.0)
+    notional_before = np.where(level > 0, cum_notional[rows, previous], 0.0)
+    shares = size_before + (notional - notional_before) / prices[rows, level]
+    vwap = np.where(filled & ~np.isnan(best), notional / shares, np.nan)
+    return vwap, np.abs(vwap - best) / best
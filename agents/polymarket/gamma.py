@@ -1,15 +1,112 @@
+import asyncio
+import logging
+import time
+from typing import Iterator, Optional
+
 import httpx
 import json
+from pydantic import TypeAdapter, ValidationError
+
+from agents.utils.http_cache import HttpCache, get_default_cache
+from agents.utils.http_clients import get_async_client, get_client, run_sync
+from agents.utils.json_stream import iter_json_array, project
+from agents.utils.objects import (
+    Market,
+    PolymarketEvent,
+    ClobReward,
+    Tag,
+    PaginationStats,
+)
+
+logger = logging.getLogger(__name__)
+
+_markets_adapter = TypeAdapter(list[Market])
+_events_adapter = TypeAdapter(list[PolymarketEvent])
+
+
+def _decode_stringified_lists(market_object: dict) -> dict:
+    # These two fields are returned as stringified lists from the api
+    for key in ("outcomePrices", "clobTokenIds"):
+        if isinstance(market_object.get(key), str):
+            market_object[key] = json.loads(market_object[key])
+    return market_object
+
+
+def raise_for_status(response: httpx.Response) -> None:
+    # 429s and 5xx have already been retried by the rate limited transport
+    if response.status_code != 200:
+        print(f"Error response returned from api: HTTP {response.status_code}")
+        raise httpx.HTTPStatusError(
+            f"HTTP {response.status_code} from {response.request.url}",
+            request=response.request,
+            response=response,
+        )
+
+
+_construct_defaults: dict = {}
+
+
+def _construct(model, values: dict):
+    """
+    Build a model instance straight from trusted api data, like model_construct
+    but with the per-model defaults worked out once instead of on every call.
+    """
+    if model not in _construct_defaults:
+        _construct_defaults[model] = (
+            {name: field.default for name, field in model.model_fields.items()},
+            {name: attr.default for name, attr in model.__private_attributes__.items()},
+        )
+    defaults, private_defaults = _construct_defaults[model]
+    fields_set = values.keys() & defaults.keys()
+    data = dict(defaults)
+    for key in fields_set:
+        data[key] = values[key]
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", data)
+    object.__setattr__(instance, "__pydantic_fields_set__", fields_set)
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", dict(private_defaults))
+    return instance
+
+
+def _construct_event(event_object: dict) -> PolymarketEvent:
+    if event_object.get("tags"):
+        event_object["tags"] = [_construct(Tag, tag) for tag in event_object["tags"]]
+    return _construct(PolymarketEvent, event_object)
+
+
+def _construct_market(market_object: dict) -> Market:
+    if market_object.get("clobRewards"):
+        market_object["clobRewards"] = [
+            _construct(ClobReward, reward) for reward in market_object["clobRewards"]
+        ]
+    if market_object.get("events"):
+        market_object["events"] = [
+            _construct_event(event) for event in market_object["events"]
+        ]
+    return _construct(Market, market_object)
 
-from agents.polymarket.polymarket import Polymarket
-from agents.utils.objects import Market, PolymarketEvent, ClobReward, Tag
+
+def _validate_page(adapter: TypeAdapter, objects: "list[dict]", kind: str) -> list:
+    try:
+        return adapter.validate_python(objects)
+    except ValidationError as err:
+        bad_indexes = {error["loc"][0] for error in err.errors()}
+        for index in sorted(bad_indexes):
+            logger.debug(
+                "[decode_%s] dropping %s: %s", kind, objects[index].get("id"), err
+            )
+        good_objects = [o for i, o in enumerate(objects) if i not in bad_indexes]
+        return adapter.validate_python(good_objects)
 
 
 class GammaMarketClient:
-    def __init__(self):
+    def __init__(self, cache: HttpCache = None):
+        self.cache = cache or get_default_cache()
         self.gamma_url = "https://gamma-api.polymarket.com"
         self.gamma_markets_endpoint = self.gamma_url + "/markets"
         self.gamma_events_endpoint = self.gamma_url + "/events"
+        self.last_pagination_stats: PaginationStats = None
 
     def parse_pydantic_market(self, market_object: dict) -> Market:
         try:
@@ -37,15 +134,15 @@ class GammaMarketClient:
 
             return Market(**market_object)
         except Exception as err:
-            print(f"[parse_market] Caught exception: {err}")
-            print("exception while handling object:", market_object)
+            logger.debug("[parse_market] Caught exception: %s", err)
+            logger.debug("exception while handling object: %s", market_object)
 
     # Event parser for events nested under a markets api response
     def parse_nested_event(self, event_object: dict()) -> PolymarketEvent:
-        print("[parse_nested_event] called with:", event_object)
+        logger.debug("[parse_nested_event] called with: %s", event_object)
         try:
             if "tags" in event_object:
-                print("tags here", event_object["tags"])
+                logger.debug("tags here %s", event_object["tags"])
                 tags: list[Tag] = []
                 for tag in event_object["tags"]:
                     tags.append(Tag(**tag))
@@ -53,69 +150,90 @@ class GammaMarketClient:
 
             return PolymarketEvent(**event_object)
         except Exception as err:
-            print(f"[parse_event] Caught exception: {err}")
-            print("\n", event_object)
+            logger.debug("[parse_event] Caught exception: %s", err)
+            logger.debug("%s", event_object)
 
     def parse_pydantic_event(self, event_object: dict) -> PolymarketEvent:
         try:
             if "tags" in event_object:
-                print("tags here", event_object["tags"])
+                logger.debug("tags here %s", event_object["tags"])
                 tags: list[Tag] = []
                 for tag in event_object["tags"]:
                     tags.append(Tag(**tag))
                 event_object["tags"] = tags
             return PolymarketEvent(**event_object)
         except Exception as err:
-            print(f"[parse_event] Caught exception: {err}")
+            logger.debug("[parse_event] Caught exception: %s", err)
+
+    def decode_markets(
+        self, market_objects: "list[dict]", trusted=False
+    ) -> "list[Market]":
+        """
+        Decode a whole page at once. The default validates the page in a single
+        pydantic pass and drops (and debug-logs) markets that fail; trusted=True
+        builds the models without validation or type coercion.
+        """
+        market_objects = [_decode_stringified_lists(m) for m in market_objects]
+        if trusted:
+            return [_construct_market(m) for m in market_objects]
+        return _validate_page(_markets_adapter, market_objects, "markets")
+
+    def decode_events(
+        self, event_objects: "list[dict]", trusted=False
+    ) -> "list[PolymarketEvent]":
+        if trusted:
+            return [_construct_event(e) for e in event_objects]
+        return _validate_page(_events_adapter, event_objects, "events")
 
     def get_markets(
-        self, querystring_params={}, parse_pydantic=False, local_file_path=None
+        self,
+        querystring_params={},
+        parse_pydantic=False,
+        local_file_path=None,
+        fresh=False,
     ) -> "list[Market]":
         if parse_pydantic and local_file_path is not None:
             raise Exception(
                 'Cannot use "parse_pydantic" and "local_file" params simultaneously.'
             )
 
-        response = httpx.get(self.gamma_markets_endpoint, params=querystring_params)
-        if response.status_code == 200:
-            data = response.json()
-            if local_file_path is not None:
-                with open(local_file_path, "w+") as out_file:
-                    json.dump(data, out_file)
-            elif not parse_pydantic:
-                return data
-            else:
-                markets: list[Market] = []
-                for market_object in data:
-                    markets.append(self.parse_pydantic_market(market_object))
-                return markets
+        response = self.cache.get(
+            self.gamma_markets_endpoint, params=querystring_params, fresh=fresh
+        )
+        raise_for_status(response)
+        data = response.json()
+        if local_file_path is not None:
+            with open(local_file_path, "w+") as out_file:
+                json.dump(data, out_file)
+        elif not parse_pydantic:
+            return data
         else:
-            print(f"Error response returned from api: HTTP {response.status_code}")
-            raise Exception()
+            return self.decode_markets(data)
 
     def get_events(
-        self, querystring_params={}, parse_pydantic=False, local_file_path=None
+        self,
+        querystring_params={},
+        parse_pydantic=False,
+        local_file_path=None,
+        fresh=False,
     ) -> "list[PolymarketEvent]":
         if parse_pydantic and local_file_path is not None:
             raise Exception(
                 'Cannot use "parse_pydantic" and "local_file" params simultaneously.'
             )
 
-        response = httpx.get(self.gamma_events_endpoint, params=querystring_params)
-        if response.status_code == 200:
-            data = response.json()
-            if local_file_path is not None:
-                with open(local_file_path, "w+") as out_file:
-                    json.dump(data, out_file)
-            elif not parse_pydantic:
-                return data
-            else:
-                events: list[PolymarketEvent] = []
-                for market_event_obj in data:
-                    events.append(self.parse_event(market_event_obj))
-                return events
+        response = self.cache.get(
+            self.gamma_events_endpoint, params=querystring_params, fresh=fresh
+        )
+        raise_for_status(response)
+        data = response.json()
+        if local_file_path is not None:
+            with open(local_file_path, "w+") as out_file:
+                json.dump(data, out_file)
+        elif not parse_pydantic:
+            return data
         else:
-            raise Exception()
+            return self.decode_events(data)
 
     def get_all_markets(self, limit=2) -> "list[Market]":
         return self.get_markets(querystring_params={"limit": limit})
@@ -135,27 +253,222 @@ class GammaMarketClient:
             }
         )
 
-    def get_all_current_markets(self, limit=100) -> "list[Market]":
-        offset = 0
+    def _current_markets_params(self, limit: int, offset: int = 0) -> dict:
+        return {
+            "active": True,
+            "closed": False,
+            "archived": False,
+            "limit": limit,
+            "offset": offset,
+            "order": "createdAt",
+            "ascending": False,
+        }
+
+    async def _get_markets_async(
+        self, client: httpx.AsyncClient, querystring_params: dict
+    ) -> httpx.Response:
+        response = await client.get(
+            self.gamma_markets_endpoint, params=querystring_params
+        )
+        raise_for_status(response)
+        return response
+
+    async def get_all_current_markets_async(
+        self, limit=100, concurrency=8
+    ) -> "list[Market]":
+        """
+        Fetch every active market, requesting up to `concurrency` offset pages at
+        a time. The first page shorter than `limit` marks the end of the listing;
+        pages are merged back in offset order so the createdAt ordering holds.
+        """
+        start = time.perf_counter()
+        pages: dict = {}
+        next_offset = 0
+        last_offset = None
+        bytes_fetched = 0
+
+        async def worker(client: httpx.AsyncClient) -> None:
+            nonlocal next_offset, last_offset, bytes_fetched
+            while last_offset is None or next_offset <= last_offset:
+                offset = next_offset
+                next_offset += limit
+                response = await self._get_markets_async(
+                    client, self._current_markets_params(limit, offset)
+                )
+                bytes_fetched += len(response.content)
+                batch = response.json()
+                pages[offset] = batch
+                if len(batch) < limit and (last_offset is None or offset < last_offset):
+                    last_offset = offset
+
+        client = get_async_client()
+        workers = [asyncio.ensure_future(worker(client)) for _ in range(concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            raise
+
+        # Markets created while paging shift the offsets, so a market can show up
+        # at the end of one page and the start of the next
         all_markets = []
+        seen_ids = set()
+        for offset in sorted(pages):
+            if offset > last_offset:
+                break
+            for market in pages[offset]:
+                if market.get("id") in seen_ids:
+                    continue
+                seen_ids.add(market.get("id"))
+                all_markets.append(market)
+
+        self.last_pagination_stats = PaginationStats(
+            pages=len(pages),
+            markets=len(all_markets),
+            seconds=time.perf_counter() - start,
+            bytes=bytes_fetched,
+        )
+        return all_markets
+
+    def get_all_current_markets(self, limit=100, concurrency=8) -> "list[Market]":
+        return run_sync(
+            self.get_all_current_markets_async(limit=limit, concurrency=concurrency)
+        )
+
+    def get_markets_updated_since(self, watermark: str, limit=100) -> "list[Market]":
+        """
+        Page through markets newest-updatedAt first until the listing drops below
+        `watermark`. No active/closed filters are applied, so markets that closed
+        or were archived since the watermark are returned too.
+        """
+        start = time.perf_counter()
+        offset = 0
+        pages = 0
+        bytes_fetched = 0
+        updated_markets = []
         while True:
-            params = {
-                "active": True,
-                "closed": False,
-                "archived": False,
-                "limit": limit,
-                "offset": offset,
-                "order": "createdAt",
-                "ascending": False,
-            }
-            market_batch = self.get_markets(querystring_params=params)
-            all_markets.extend(market_batch)
+            response = get_client().get(
+                self.gamma_markets_endpoint,
+                params={
+                    "limit": limit,
+                    "offset": offset,
+                    "order": "updatedAt",
+                    "ascending": False,
+                },
+            )
+            raise_for_status(response)
+            pages += 1
+            bytes_fetched += len(response.content)
+            market_batch = response.json()
+
+            reached_watermark = False
+            for market in market_batch:
+                if (market.get("updatedAt") or "") < watermark:
+                    reached_watermark = True
+                    break
+                updated_markets.append(market)
 
-            if len(market_batch) < limit:
+            if reached_watermark or len(market_batch) < limit:
                 break
             offset += limit
 
-        return all_markets
+        self.last_pagination_stats = PaginationStats(
+            pages=pages,
+            markets=len(updated_markets),
+            seconds=time.perf_counter() - start,
+            bytes=bytes_fetched,
+        )
+        return updated_markets
+
+    async def _get_markets_by_async(
+        self, param: str, values: "list[str]", batch_size: int, concurrency: int
+    ) -> "list[dict]":
+        client = get_async_client()
+        semaphore = asyncio.Semaphore(concurrency)
+        unique_values = list(dict.fromkeys(values))
+        batches = [
+            unique_values[i : i + batch_size]
+            for i in range(0, len(unique_values), batch_size)
+        ]
+
+        async def fetch(batch: "list[str]") -> "list[dict]":
+            async with semaphore:
+                response = await self._get_markets_async(
+                    client, {param: batch, "limit": len(batch)}
+                )
+                return response.json()
+
+        pages = await asyncio.gather(*[fetch(batch) for batch in batches])
+        return [market for page in pages for market in page]
+
+    def get_markets_by_ids(
+        self, market_ids: "list[str]", batch_size=50, concurrency=8
+    ) -> "list[Optional[dict]]":
+        """
+        Resolve many market ids with one multi-value `id` request per batch,
+        running the batches concurrently. The result lines up with `market_ids`;
+        ids Gamma did not return come back as None.
+        """
+        market_ids = [str(market_id) for market_id in market_ids]
+        markets = run_sync(
+            self._get_markets_by_async("id", market_ids, batch_size, concurrency)
+        )
+        markets_by_id = {str(market["id"]): market for market in markets}
+        return [markets_by_id.get(market_id) for market_id in market_ids]
+
+    def get_markets_by_token_ids(
+        self, token_ids: "list[str]", batch_size=50, concurrency=8
+    ) -> "list[Optional[dict]]":
+        """
+        Same as get_markets_by_ids but keyed on CLOB token ids; either token of a
+        market resolves to that market.
+        """
+        token_ids = [str(token_id) for token_id in token_ids]
+        markets = run_sync(
+            self._get_markets_by_async(
+                "clob_token_ids", token_ids, batch_size, concurrency
+            )
+        )
+        markets_by_token_id = {}
+        for market in markets:
+            market_token_ids = market.get("clobTokenIds") or "[]"
+            if isinstance(market_token_ids, str):
+                market_token_ids = json.loads(market_token_ids)
+            for token_id in market_token_ids:
+                markets_by_token_id[str(token_id)] = market
+        return [markets_by_token_id.get(token_id) for token_id in token_ids]
+
+    def iter_markets(
+        self, querystring_params: dict = None, fields: "list[str]" = None, limit=100
+    ) -> Iterator[dict]:
+        """
+        Yield markets one at a time, paging by offset and decoding each page as it
+        streams in. `fields` keeps only those keys of every market, so nested
+        events, rewards and descriptions are dropped as soon as they are parsed.
+        """
+        params = dict(querystring_params or {})
+        offset = params.pop("offset", 0)
+        while True:
+            page_params = {**params, "limit": limit, "offset": offset}
+            count = 0
+            with get_client().stream(
+                "GET", self.gamma_markets_endpoint, params=page_params
+            ) as response:
+                raise_for_status(response)
+                for market in iter_json_array(response.iter_bytes()):
+                    count += 1
+                    yield project(market, fields)
+
+            if count < limit:
+                break
+            offset += limit
+
+    def iter_current_markets(
+        self, fields: "list[str]" = None, limit=100
+    ) -> Iterator[dict]:
+        params = self._current_markets_params(limit)
+        return self.iter_markets(querystring_params=params, fields=fields, limit=limit)
 
     def get_current_events(self, limit=4) -> "list[PolymarketEvent]":
         return self.get_events(
@@ -178,14 +491,17 @@ class GammaMarketClient:
             }
         )
 
-    def get_market(self, market_id: int) -> dict():
+    def get_market(self, market_id: int, fresh=False) -> dict():
         url = self.gamma_markets_endpoint + "/" + str(market_id)
         print(url)
-        response = httpx.get(url)
+        response = self.cache.get(url, fresh=fresh)
+        raise_for_status(response)
         return response.json()
 
 
 if __name__ == "__main__":
+    from agents.polymarket.polymarket import Polymarket
+
     gamma = GammaMarketClient()
     market = gamma.get_market("253123")
     poly = Polymarket()
@@ -0,0 +1,225 @@
+# bulk order book and price reads from the CLOB batch endpoints
+import asyncio
+from typing import Callable
+
+import httpx
+
+from agents.utils.http_clients import get_async_client, run_sync
+from agents.utils.objects import TokenBook, TokenQuote
+
+# Responses that blame the request body, i.e. a token id the CLOB rejects
+BAD_TOKEN_STATUSES = {400, 404, 422}
+
+
+def _levels(levels: "list[dict]", descending: bool) -> "list[tuple[float, float]]":
+    parsed = [(float(level["price"]), float(level["size"])) for level in levels or []]
+    return sorted(parsed, reverse=descending)
+
+
+class ClobMarketData:
+    """
+    Books and prices for many token ids at once. Token ids are split into
+    batches that are posted to the CLOB's multi-token endpoints concurrently,
+    so scanning the top N markets costs about one round trip instead of N. A
+    batch the CLOB rejects as a bad request is bisected until the failing ids
+    are isolated, which keeps one bad token id from failing the rest. Other
+    failures (transport errors, 5xx) are retried `retries` times and then
+    reported for the whole batch, so an outage costs a few requests rather
+    than one per token.
+    """
+
+    def __init__(
+        self,
+        clob_url: str = "https://clob.polymarket.com",
+        batch_size: int = 100,
+        concurrency: int = 8,
+        retries: int = 2,
+        retry_delay: float = 0.5,
+    ) -> None:
+        self.clob_url = clob_url
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+    async def _post_batch(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        path: str,
+        token_ids: "list[str]",
+        make_body: Callable,
+        payloads: list,
+        errors: "dict[str, str]",
+    ) -> None:
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+            async with semaphore:
+                try:
+                    response = await client.post(
+                        self.clob_url + path, json=make_body(token_ids)
+                    )
+                    response.raise_for_status()
+                    payloads.append(response.json())
+                    return
+                except (httpx.HTTPError, ValueError) as e:
+                    error = e
+            if (
+                isinstance(error, httpx.HTTPStatusError)
+                and error.response.status_code in BAD_TOKEN_STATUSES
+            ):
+                break
+        else:
+            for token_id in token_ids:
+                errors[token_id] = str(error) or type(error).__name__
+            return
+
+        if len(token_ids) == 1:
+            errors[token_ids[0]] = str(error) or type(error).__name__
+            return
+        middle = len(token_ids) // 2
+        await asyncio.gather(
+            *[
+                self._post_batch(
+                    client, semaphore, path, half, make_body, payloads, errors
+                )
+                for half in (token_ids[:middle], token_ids[middle:])
+            ]
+        )
+
+    async def _post_batches(
+        self,
+        semaphore: asyncio.Semaphore,
+        path: str,
+        token_ids: "list[str]",
+        make_body: Callable,
+    ) -> "tuple[list, dict[str, str]]":
+        client = get_async_client()
+        payloads, errors = [], {}
+        await asyncio.gather(
+            *[
+                self._post_batch(
+                    client,
+                    semaphore,
+                    path,
+                    token_ids[i : i + self.batch_size],
+                    make_body,
+                    payloads,
+                    errors,
+                )
+                for i in range(0, len(token_ids), self.batch_size)
+            ]
+        )
+        return payloads, errors
+
+    async def get_order_books_async(
+        self, token_ids: "list[str]"
+    ) -> "dict[str, TokenBook]":
+        token_ids = list(dict.fromkeys(str(token_id) for token_id in token_ids))
+        payloads, errors = await self._post_batches(
+            asyncio.Semaphore(self.concurrency),
+            "/books",
+            token_ids,
+            lambda batch: [{"token_id": token_id} for token_id in batch],
+        )
+
+        books = {}
+        for payload in payloads:
+            for raw in payload:
+                books[raw["asset_id"]] = TokenBook(
+                    token_id=raw["asset_id"],
+                    market=raw.get("market"),
+                    bids=_levels(raw.get("bids"), descending=True),
+                    asks=_levels(raw.get("asks"), descending=False),
+                    hash=raw.get("hash"),
+                )
+        return {
+            token_id: books.get(token_id)
+            or TokenBook(
+                token_id=token_id, error=errors.get(token_id, "No order book returned")
+            )
+            for token_id in token_ids
+        }
+
+    def get_order_books(self, token_ids: "list[str]") -> "dict[str, TokenBook]":
+        """
+        Order books keyed by token id. Tokens that could not be fetched carry an
+        error instead of levels.
+        """
+        return run_sync(self.get_order_books_async(token_ids))
+
+    async def get_quotes_async(self, token_ids: "list[str]") -> "dict[str, TokenQuote]":
+        token_ids = list(dict.fromkeys(str(token_id) for token_id in token_ids))
+        # The three endpoints share one concurrency budget and run side by side
+        semaphore = asyncio.Semaphore(self.concurrency)
+        (prices, price_errors), (mids, mid_errors), (lasts, last_errors) = (
+            await asyncio.gather(
+                self._post_batches(
+                    semaphore,
+                    "/prices",
+                    token_ids,
+                    lambda batch: [
+                        {"token_id": token_id, "side": side}
+                        for token_id in batch
+                        for side in ("BUY", "SELL")
+                    ],
+                ),
+                self._post_batches(
+                    semaphore,
+                    "/midpoints",
+                    token_ids,
+                    lambda batch: [{"token_id": token_id} for token_id in batch],
+                ),
+                self._post_batches(
+                    semaphore,
+                    "/last-trades-prices",
+                    token_ids,
+                    lambda batch: [{"token_id": token_id} for token_id in batch],
+                ),
+            )
+        )
+
+        quotes = {token_id: TokenQuote(token_id=token_id) for token_id in token_ids}
+        for payload in prices:
+            for token_id, sides in payload.items():
+                if token_id in quotes:
+                    # As with /price, BUY is the best bid and SELL the best ask
+                    quotes[token_id].bid = _float(sides.get("BUY"))
+                    quotes[token_id].ask = _float(sides.get("SELL"))
+        for payload in mids:
+            for token_id, midpoint in payload.items():
+                if token_id in quotes:
+                    quotes[token_id].midpoint = _float(midpoint)
+        for payload in lasts:
+            for trade in payload:
+                if trade.get("token_id") in quotes:
+                    quotes[trade["token_id"]].last_trade_price = _float(
+                        trade.get("price")
+                    )
+
+        for name, errors in (
+            ("prices", price_errors),
+            ("midpoints", mid_errors),
+            ("last trades", last_errors),
+        ):
+            for token_id, error in errors.items():
+                quote = quotes[token_id]
+                message = f"{name}: {error}"
+                quote.error = f"{quote.error}; {message}" if quote.error else message
+        return quotes
+
+    def get_quotes(self, token_ids: "list[str]") -> "dict[str, TokenQuote]":
+        """
+        Best bid/ask, midpoint and last trade price keyed by token id, from one
+        concurrent round of batch requests. Parts that failed for a token are
+        left as None and described in its error.
+        """
+        return run_sync(self.get_quotes_async(token_ids))
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,157 @@
+import ast
+import json
+from typing import Union
+
+import numpy as np
+
+from agents.utils.objects import SimpleMarket
+
+# The 1-D numeric columns; ids, flags and the 2-D outcome_prices have no ranking
+SORT_COLUMNS = ("spread", "liquidity", "volume", "volume24hr", "end")
+
+
+def _field(market, *names):
+    # Rows come either as raw gamma dicts (camelCase) or SimpleMarket objects
+    for name in names:
+        value = (
+            market.get(name)
+            if isinstance(market, dict)
+            else getattr(market, name, None)
+        )
+        if value is not None:
+            return value
+    return None
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _outcome_prices(value) -> "list[float]":
+    if value is None:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            # SimpleMarket stores str(list), i.e. a python repr
+            value = ast.literal_eval(value)
+    return [_float(price) for price in value]
+
+
+class MarketTable:
+    """
+    Column-oriented view over a list of markets. Each column is a NumPy array
+    indexed by row, so filters are boolean masks and rankings are argsorts
+    instead of Python loops over SimpleMarket objects. `markets` keeps the
+    source objects so results can be mapped back to rows.
+    """
+
+    def __init__(self, markets: list, columns: "dict[str, np.ndarray]") -> None:
+        self.markets = markets
+        self.columns = columns
+
+    @classmethod
+    def from_markets(cls, markets: "list[Union[dict, SimpleMarket]]") -> "MarketTable":
+        markets = list(markets)
+        ends = []
+        for market in markets:
+            end = _field(market, "endDate", "end")
+            # Drop the timezone suffix, numpy only parses naive datetimes
+            ends.append(end[:19] if end else "NaT")
+        prices = [
+            _outcome_prices(_field(market, "outcomePrices", "outcome_prices"))
+            for market in markets
+        ]
+        end_dates = np.array(ends, dtype="datetime64[s]")
+        end = end_dates.astype(np.int64).astype(np.float64)
+        end[np.isnat(end_dates)] = np.nan
+
+        width = max((len(p) for p in prices), default=0)
+        outcome_prices = np.full((len(markets), width), np.nan)
+        for row, row_prices in enumerate(prices):
+            outcome_prices[row, : len(row_prices)] = row_prices
+
+        columns = {
+            "id": np.array([int(_field(m, "id")) for m in markets], dtype=np.int64),
+            "spread": np.array([_float(_field(m, "spread")) for m in markets]),
+            "liquidity": np.array(
+                [_float(_field(m, "liquidityNum", "liquidity")) for m in markets]
+            ),
+            "volume": np.array(
+                [_float(_field(m, "volumeNum", "volume")) for m in markets]
+            ),
+            "volume24hr": np.array([_float(_field(m, "volume24hr")) for m in markets]),
+            "end": end,
+            "active": np.array(
+                [bool(_field(m, "active")) for m in markets], dtype=bool
+            ),
+            "closed": np.array(
+                [bool(_field(m, "closed")) for m in markets], dtype=bool
+            ),
+            "outcome_prices": outcome_prices,
+        }
+        return cls(markets, columns)
+
+    def __len__(self) -> int:
+        return len(self.markets)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def take(self, indices: np.ndarray) -> "MarketTable":
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        return MarketTable(
+            [self.markets[i] for i in indices],
+            {name: column[indices] for name, column in self.columns.items()},
+        )
+
+    def head(self, n: int) -> "MarketTable":
+        return self.take(np.arange(min(n, len(self))))
+
+    def filter(self, mask: np.ndarray) -> "MarketTable":
+        return self.take(mask)
+
+    def tradeable_mask(self) -> np.ndarray:
+        return self.columns["active"] & ~self.columns["closed"]
+
+    def _sort_key(self, column: str, descending: bool) -> np.ndarray:
+        if column not in SORT_COLUMNS:
+            raise ValueError(
+                f"Can't sort by {column!r}, expected one of {', '.join(SORT_COLUMNS)}"
+            )
+        values = self.columns[column]
+        # Rows without a value sort last in either direction
+        if descending:
+            return np.where(np.isnan(values), np.inf, -values)
+        return np.where(np.isnan(values), np.inf, values)
+
+    def argsort(
+        self, by: "Union[str, list[str]]", descending: "Union[bool, list[bool]]" = True
+    ) -> np.ndarray:
+        by = [by] if isinstance(by, str) else list(by)
+        if isinstance(descending, bool):
+            descending = [descending] * len(by)
+        # lexsort treats the last key as the primary one
+        keys = [self._sort_key(c, d) for c, d in zip(by, descending)]
+        return np.lexsort(keys[::-1])
+
+    def sort(
+        self, by: "Union[str, list[str]]", descending: "Union[bool, list[bool]]" = True
+    ) -> "MarketTable":
+        return self.take(self.argsort(by, descending))
+
+    def top_k(self, column: str, k: int, descending: bool = True) -> "MarketTable":
+        if k >= len(self):
+            return self.sort(column, descending)
+        key = self._sort_key(column, descending)
+        candidates = np.argpartition(key, k)[:k]
+        return self.take(candidates[np.argsort(key[candidates], kind="stable")])
+
+    def rows(self) -> list:
+        return list(self.markets)
@@ -0,0 +1,211 @@
+# asyncio order submission: queue -> sign off the loop -> post with bounded in-flight
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from agents.utils.objects import OrderResult, OrderTimings
+
+logger = logging.getLogger(__name__)
+
+
+class _Submission:
+    def __init__(self, key: str, order_args, order_type: str, future, callback):
+        self.key = key
+        self.order_args = order_args
+        self.order_type = order_type
+        self.future = future
+        self.callback = callback
+        self.signed_order = None
+        self.enqueued_at = time.monotonic()
+        self.dequeued_at = None
+        self.signed_at = None
+        self.sent_at = None
+
+
+def default_order_key(order_args) -> str:
+    """
+    Token, side, price and size, used to label orders submitted without an
+    idempotency key
+    """
+    if hasattr(order_args, "amount"):
+        return f"{order_args.token_id}:BUY:market:{order_args.amount}"
+    return (
+        f"{order_args.token_id}:{order_args.side}:{order_args.price}:{order_args.size}"
+    )
+
+
+class OrderEngine:
+    """
+    Orders are queued with submit(), signed on a thread pool so the event loop
+    stays free, and posted one per request with at most `max_in_flight`
+    requests outstanding. Every submit() places an order unless the caller
+    passes an idempotency_key: submitting the same key again while the first
+    attempt is pending or succeeded returns the first attempt's future instead
+    of placing a second order.
+    """
+
+    def __init__(
+        self,
+        client,
+        max_in_flight: int = 4,
+        sign_workers: int = 2,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ) -> None:
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.sign_workers = sign_workers
+        # Only shut down a pool this engine created
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=sign_workers + max_in_flight
+        )
+        self.results: "list[OrderResult]" = []
+        self._submissions: "dict[str, _Submission]" = {}
+        self._unkeyed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._signed: Optional[asyncio.Queue] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._tasks: "list[asyncio.Task]" = []
+        self._posts: "set[asyncio.Task]" = set()
+
+    async def start(self) -> "OrderEngine":
+        self._queue = asyncio.Queue()
+        self._signed = asyncio.Queue()
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._tasks = [
+            asyncio.create_task(self._sign_worker()) for _ in range(self.sign_workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._post_worker()))
+        return self
+
+    async def stop(self) -> None:
+        """
+        Wait for every queued order to be acked, then shut the workers down
+        """
+        await self._queue.join()
+        await self._signed.join()
+        if self._posts:
+            await asyncio.gather(*self._posts)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> "OrderEngine":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def submit(
+        self,
+        order_args,
+        order_type: str = "GTC",
+        idempotency_key: Optional[str] = None,
+        callback: Optional[Callable[[OrderResult], None]] = None,
+    ) -> "asyncio.Future[OrderResult]":
+        if idempotency_key is None:
+            # Unkeyed orders are never deduped, a repeat is a second order
+            self._unkeyed += 1
+            key = f"{default_order_key(order_args)}#{self._unkeyed}"
+        else:
+            key = idempotency_key
+        previous = self._submissions.get(key)
+        if previous is not None and not (
+            previous.future.done() and previous.future.result().error
+        ):
+            return previous.future
+
+        submission = _Submission(
+            key,
+            order_args,
+            order_type,
+            asyncio.get_running_loop().create_future(),
+            callback,
+        )
+        self._submissions[key] = submission
+        self._queue.put_nowait(submission)
+        return submission.future
+
+    async def _sign_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            submission = await self._queue.get()
+            submission.dequeued_at = time.monotonic()
+            try:
+                submission.signed_order = await loop.run_in_executor(
+                    self.executor, self._sign, submission.order_args
+                )
+                submission.signed_at = time.monotonic()
+                self._signed.put_nowait(submission)
+            except Exception as e:
+                submission.signed_at = time.monotonic()
+                self._finish(submission, None, e)
+            finally:
+                self._queue.task_done()
+
+    def _sign(self, order_args):
+        # MarketOrderArgs carry a USDC amount instead of a price and size
+        if hasattr(order_args, "amount"):
+            return self.client.create_market_order(order_args)
+        return self.client.create_order(order_args)
+
+    async def _post_worker(self) -> None:
+        while True:
+            submission = await self._signed.get()
+            await self._in_flight.acquire()
+            task = asyncio.create_task(self._post(submission))
+            self._posts.add(task)
+            task.add_done_callback(self._posts.discard)
+
+    async def _post(self, submission: _Submission) -> None:
+        # py_clob_client 0.17.5 has no batch post, so each order is its own request
+        loop = asyncio.get_running_loop()
+        submission.sent_at = time.monotonic()
+        try:
+            response = await loop.run_in_executor(
+                self.executor,
+                self.client.post_order,
+                submission.signed_order,
+                submission.order_type,
+            )
+            self._finish(submission, response, None)
+        except Exception as e:
+            self._finish(submission, None, e)
+        finally:
+            self._in_flight.release()
+            self._signed.task_done()
+
+    def _finish(self, submission: _Submission, response, error) -> None:
+        acked_at = time.monotonic()
+        if error is None and isinstance(response, dict) and response.get("errorMsg"):
+            error = response["errorMsg"]
+        dequeued_at = submission.dequeued_at or acked_at
+        signed_at = submission.signed_at or dequeued_at
+        sent_at = submission.sent_at or signed_at
+        result = OrderResult(
+            key=submission.key,
+            order_id=(
+                (response or {}).get("orderID") if isinstance(response, dict) else None
+            ),
+            response=response if isinstance(response, dict) else None,
+            error=str(error) if error is not None else None,
+            timings=OrderTimings(
+                queue_wait=dequeued_at - submission.enqueued_at,
+                sign=signed_at - dequeued_at,
+                post=sent_at - signed_at,
+                ack=acked_at - sent_at,
+                total=acked_at - submission.enqueued_at,
+            ),
+        )
+        if result.error:
+            logger.warning(f"Order {submission.key} failed: {result.error}")
+        self.results.append(result)
+        if not submission.future.done():
+            submission.future.set_result(result)
+        if submission.callback is not None:
+            submission.callback(result)
@@ -0,0 +1,368 @@
+# in-process replica of CLOB order books, kept current from a market data feed
+import bisect
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOB_MARKET_WS = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+
+
+class BookSide:
+    """
+    Price levels for one side of a book. Keys are kept sorted best first (bids
+    are stored negated), so the best level is keys[0] and the top n levels are
+    a slice.
+    """
+
+    def __init__(self, bids: bool) -> None:
+        self.sign = -1.0 if bids else 1.0
+        self.keys: "list[float]" = []
+        self.sizes: "dict[float, float]" = {}
+
+    def clear(self) -> None:
+        self.keys = []
+        self.sizes = {}
+
+    def set(self, price: float, size: float) -> None:
+        key = self.sign * price
+        if size <= 0:
+            if self.sizes.pop(price, None) is not None:
+                del self.keys[bisect.bisect_left(self.keys, key)]
+            return
+        if price not in self.sizes:
+            bisect.insort(self.keys, key)
+        self.sizes[price] = size
+
+    def best(self) -> "Optional[tuple[float, float]]":
+        if not self.keys:
+            return None
+        price = self.sign * self.keys[0]
+        return price, self.sizes[price]
+
+    def levels(self, n: Optional[int] = None) -> "list[tuple[float, float]]":
+        keys = self.keys if n is None else self.keys[:n]
+        return [(self.sign * key, self.sizes[self.sign * key]) for key in keys]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class OrderBook:
+    def __init__(self, token_id: str) -> None:
+        self.token_id = token_id
+        self.market: Optional[str] = None
+        self.bids = BookSide(bids=True)
+        self.asks = BookSide(bids=False)
+        self.hash: Optional[str] = None
+        self.sequence: Optional[int] = None
+        self.timestamp: Optional[int] = None
+        self.updated_at: Optional[float] = None
+        self.synced = False
+
+    def apply_snapshot(self, message: dict) -> None:
+        self.bids.clear()
+        self.asks.clear()
+        for level in message.get("bids") or []:
+            self.bids.set(float(level["price"]), float(level["size"]))
+        for level in message.get("asks") or []:
+            self.asks.set(float(level["price"]), float(level["size"]))
+        self.market = message.get("market", self.market)
+        self.hash = message.get("hash")
+        self.sequence = message.get("seq")
+        self.timestamp = _timestamp(message)
+        self.updated_at = time.monotonic()
+        self.synced = True
+
+    def apply_changes(self, message: dict) -> None:
+        for change in message.get("changes") or []:
+            side = self.bids if change["side"].upper() == "BUY" else self.asks
+            side.set(float(change["price"]), float(change["size"]))
+        self.hash = message.get("hash", self.hash)
+        self.sequence = message.get("seq", self.sequence)
+        self.timestamp = _timestamp(message) or self.timestamp
+        self.updated_at = time.monotonic()
+
+    def is_gap(self, message: dict) -> bool:
+        """
+        A delta that doesn't directly follow the last applied message. Feeds with
+        sequence numbers are checked exactly, the CLOB websocket only carries
+        timestamps so there a message arriving out of order counts as a gap.
+        """
+        sequence = message.get("seq")
+        if sequence is not None and self.sequence is not None:
+            return sequence != self.sequence + 1
+        timestamp = _timestamp(message)
+        return (
+            timestamp is not None
+            and self.timestamp is not None
+            and timestamp < self.timestamp
+        )
+
+    def best_bid(self) -> Optional[float]:
+        best = self.bids.best()
+        return best[0] if best else None
+
+    def best_ask(self) -> Optional[float]:
+        best = self.asks.best()
+        return best[0] if best else None
+
+    def midpoint(self) -> Optional[float]:
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    def spread(self) -> Optional[float]:
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return ask - bid
+
+    def depth(self, side: str, levels: Optional[int] = None):
+        """
+        Top `levels` (price, size) pairs, best first. side is "BUY" for bids and
+        "SELL" for asks, as in the CLOB api.
+        """
+        book_side = self.bids if side.upper() == "BUY" else self.asks
+        return book_side.levels(levels)
+
+
+def _timestamp(message: dict) -> Optional[int]:
+    timestamp = message.get("timestamp")
+    return int(timestamp) if timestamp is not None else None
+
+
+class LocalFeed:
+    """
+    Feed driven by hand, for tests and replays: push CLOB shaped messages and
+    the replica applies them in order.
+    """
+
+    def __init__(self, messages: Iterable[dict] = ()) -> None:
+        self.token_ids: "set[str]" = set()
+        self._queue: queue.Queue = queue.Queue()
+        for message in messages:
+            self.push(message)
+
+    def subscribe(self, token_ids: "list[str]") -> None:
+        self.token_ids.update(token_ids)
+
+    def push(self, message: dict) -> None:
+        self._queue.put(message)
+
+    def messages(self) -> Iterator[dict]:
+        while True:
+            message = self._queue.get()
+            if message is None:
+                return
+            yield message
+
+    def close(self) -> None:
+        self._queue.put(None)
+
+
+class ClobWebSocketFeed:
+    """
+    Polymarket's public market channel. Sends a `book` snapshot per token on
+    subscribe and `price_change` deltas after that. A dropped connection is
+    reported as a `disconnected` message and the feed reconnects.
+    """
+
+    def __init__(self, url: str = CLOB_MARKET_WS, reconnect_delay: float = 1.0):
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+        self.token_ids: "set[str]" = set()
+        self._connection = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _subscription(self) -> str:
+        return json.dumps({"assets_ids": sorted(self.token_ids), "type": "market"})
+
+    def subscribe(self, token_ids: "list[str]") -> None:
+        with self._lock:
+            self.token_ids.update(token_ids)
+            connection = self._connection
+        if connection is not None:
+            connection.send(self._subscription())
+
+    def messages(self) -> Iterator[dict]:
+        from websockets.exceptions import ConnectionClosed
+        from websockets.sync.client import connect
+
+        while not self._closed:
+            try:
+                with connect(self.url) as connection:
+                    with self._lock:
+                        self._connection = connection
+                    connection.send(self._subscription())
+                    for raw in connection:
+                        payload = json.loads(raw)
+                        for message in (
+                            payload if isinstance(payload, list) else [payload]
+                        ):
+                            yield message
+            except (ConnectionClosed, OSError) as e:
+                logger.warning(f"Order book feed dropped: {e}")
+            finally:
+                with self._lock:
+                    self._connection = None
+            if not self._closed:
+                yield {"event_type": "disconnected"}
+                time.sleep(self.reconnect_delay)
+
+    def close(self) -> None:
+        self._closed = True
+        with self._lock:
+            connection = self._connection
+        if connection is not None:
+            connection.close()
+
+
+class OrderBookReplica:
+    """
+    Order books for a set of token ids, applied from a feed on a background
+    thread. A book is warm once it has a snapshot and hasn't lost sync; on a
+    sequence gap or a dropped feed it is rebuilt from `snapshot_source`
+    (usually ClobClient.get_order_book) and stays cold until that succeeds.
+    """
+
+    def __init__(
+        self,
+        feed,
+        snapshot_source: Optional[Callable] = None,
+        max_age: Optional[float] = None,
+    ) -> None:
+        self.feed = feed
+        self.snapshot_source = snapshot_source
+        self.max_age = max_age
+        self.books: "dict[str, OrderBook]" = {}
+        self.resyncs = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, token_ids: "list[str]") -> None:
+        with self._lock:
+            for token_id in token_ids:
+                self.books.setdefault(token_id, OrderBook(token_id))
+        self.feed.subscribe(token_ids)
+
+    def start(self) -> "OrderBookReplica":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, daemon=True)
+            self._thread.start()
+        return self
+
+    def run(self) -> None:
+        for message in self.feed.messages():
+            try:
+                self.apply(message)
+            except Exception as e:
+                logger.exception(f"Could not apply order book message: {e}")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self.feed.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def apply(self, message: dict) -> None:
+        event_type = message.get("event_type")
+        if event_type == "disconnected":
+            with self._lock:
+                books = list(self.books.values())
+                for book in books:
+                    book.synced = False
+            for book in books:
+                self.resync(book.token_id)
+            return
+
+        book = self.books.get(message.get("asset_id"))
+        if book is None:
+            return
+        if event_type == "book":
+            with self._lock:
+                book.apply_snapshot(message)
+        elif event_type == "price_change":
+            with self._lock:
+                gap = not book.synced or book.is_gap(message)
+                if not gap:
+                    book.apply_changes(message)
+                else:
+                    book.synced = False
+            if gap:
+                self.resync(book.token_id)
+
+    def resync(self, token_id: str) -> None:
+        if self.snapshot_source is None:
+            return
+        try:
+            summary = self.snapshot_source(token_id)
+        except Exception as e:
+            logger.warning(f"Order book resync failed for {token_id}: {e}")
+            return
+        self.resyncs += 1
+        with self._lock:
+            # The REST snapshot carries no sequence; the next delta re-anchors it
+            self.books[token_id].apply_snapshot(_snapshot_message(summary))
+
+    def _warm(self, token_id: str) -> Optional[OrderBook]:
+        book = self.books.get(token_id)
+        if book is None or not book.synced:
+            return None
+        if (
+            self.max_age is not None
+            and time.monotonic() - book.updated_at > self.max_age
+        ):
+            return None
+        return book
+
+    def get(self, token_id: str) -> Optional[OrderBook]:
+        """
+        The replica's live book for token_id if it is warm, otherwise None.
+        The feed thread keeps mutating it; readers on other threads should use
+        depth() and best_bid_ask(), which copy under the lock.
+        """
+        with self._lock:
+            return self._warm(token_id)
+
+    def depth(self, token_id: str, levels: Optional[int] = None) -> Optional[dict]:
+        """
+        A copy of a warm book: market, hash and the top `levels` bids and asks
+        as (price, size) pairs, best first. None if the book is cold.
+        """
+        with self._lock:
+            book = self._warm(token_id)
+            if book is None:
+                return None
+            return {
+                "market": book.market,
+                "hash": book.hash,
+                "bids": book.depth("BUY", levels),
+                "asks": book.depth("SELL", levels),
+            }
+
+    def best_bid_ask(self, token_id: str):
+        with self._lock:
+            book = self._warm(token_id)
+            if book is None:
+                return None
+            return book.best_bid(), book.best_ask()
+
+
+def _snapshot_message(summary) -> dict:
+    # Accepts py_clob_client's OrderBookSummary as well as the raw /book json
+    if isinstance(summary, dict):
+        return summary
+    return {
+        "market": summary.market,
+        "asset_id": summary.asset_id,
+        "bids": [{"price": o.price, "size": o.size} for o in summary.bids or []],
+        "asks": [{"price": o.price, "size": o.size} for o in summary.asks or []],
+        "hash": summary.hash,
+    }
@@ -1,37 +1,54 @@
 # core polymarket api
 # https://github.com/Polymarket/py-clob-client/tree/main/examples
 
+import asyncio
 import os
 import pdb
 import time
 import ast
 import requests
+from functools import cached_property
+from typing import TYPE_CHECKING, Optional
 
 from dotenv import load_dotenv
 
-from web3 import Web3
-from web3.constants import MAX_INT
-from web3.middleware import geth_poa_middleware
-
 import httpx
-from py_clob_client.client import ClobClient
-from py_clob_client.clob_types import ApiCreds
-from py_clob_client.constants import AMOY, POLYGON
-from py_order_utils.builders import OrderBuilder
-from py_order_utils.model import OrderData
-from py_order_utils.signer import Signer
-from py_clob_client.clob_types import (
-    OrderArgs,
-    MarketOrderArgs,
-    OrderType,
-    OrderBookSummary,
+
+from agents.polymarket.gamma import GammaMarketClient
+from agents.polymarket.market_table import MarketTable
+from agents.polymarket.market_data import ClobMarketData
+from agents.polymarket.orderbook import ClobWebSocketFeed, OrderBookReplica
+from agents.utils.http_clients import get_client, route_clob_requests, run_sync
+from agents.utils.objects import (
+    AccountState,
+    ApprovalResult,
+    OrderResult,
+    SimpleEvent,
+    SimpleMarket,
+    TokenBook,
+    TokenQuote,
+    Trade,
 )
-from py_clob_client.order_builder.constants import BUY
 
-from agents.utils.objects import SimpleMarket, SimpleEvent
+# web3, eth_account, py_clob_client and py_order_utils take over a second to
+# import, so they are imported where they are used; read-only Gamma commands
+# never load them
+if TYPE_CHECKING:
+    from eth_account.signers.local import LocalAccount
+    from py_clob_client.client import ClobClient
+    from py_clob_client.clob_types import ApiCreds, OrderBookSummary
+    from py_order_utils.model import OrderData
+
+    from agents.polymarket.account_state import AccountStateReader
+    from agents.polymarket.order_engine import OrderEngine
+    from agents.polymarket.signing import SigningContext
+    from web3 import Web3
 
 load_dotenv()
 
+# execute_market_order buys this outcome's token, index 1 of clob_token_ids
+MARKET_ORDER_OUTCOME = 1
+
 
 class Polymarket:
     def __init__(self) -> None:
@@ -39,13 +56,16 @@ class Polymarket:
         self.gamma_markets_endpoint = self.gamma_url + "/markets"
         self.gamma_events_endpoint = self.gamma_url + "/events"
 
+        self.gamma = GammaMarketClient()
+        self.orderbooks: Optional[OrderBookReplica] = None
+
         self.clob_url = "https://clob.polymarket.com"
         self.clob_auth_endpoint = self.clob_url + "/auth/api-key"
+        self.market_data = ClobMarketData(self.clob_url)
 
         self.chain_id = 137  # POLYGON
         self.private_key = os.getenv("POLYGON_WALLET_PRIVATE_KEY")
         self.polygon_rpc = "https://polygon-rpc.com"
-        self.w3 = Web3(Web3.HTTPProvider(self.polygon_rpc))
 
         self.exchange_address = "0x4bfb41d5b3570defd03c39a9a4d8de6bd8b8982e"
         self.neg_risk_exchange_address = "0xC5d563A36AE78145C45a50134d48A1215220f80a"
@@ -56,135 +76,92 @@ class Polymarket:
         self.usdc_address = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"
         self.ctf_address = "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045"
 
-        self.web3 = Web3(Web3.HTTPProvider(self.polygon_rpc))
-        self.web3.middleware_onion.inject(geth_poa_middleware, layer=0)
+    # web3, the contracts and the CLOB client are built on first use, so commands
+    # that only read Gamma never open an rpc provider or derive api keys
 
-        self.usdc = self.web3.eth.contract(
-            address=self.usdc_address, abi=self.erc20_approve
-        )
-        self.ctf = self.web3.eth.contract(
-            address=self.ctf_address, abi=self.erc1155_set_approval
-        )
+    @cached_property
+    def web3(self) -> "Web3":
+        from web3 import Web3
+        from web3.middleware import geth_poa_middleware
 
-        self._init_api_keys()
-        self._init_approvals(False)
+        web3 = Web3(Web3.HTTPProvider(self.polygon_rpc))
+        web3.middleware_onion.inject(geth_poa_middleware, layer=0)
+        return web3
 
-    def _init_api_keys(self) -> None:
-        self.client = ClobClient(
-            self.clob_url, key=self.private_key, chain_id=self.chain_id
-        )
-        self.credentials = self.client.create_or_derive_api_creds()
-        self.client.set_api_creds(self.credentials)
-        # print(self.credentials)
+    @property
+    def w3(self) -> "Web3":
+        return self.web3
 
-    def _init_approvals(self, run: bool = False) -> None:
-        if not run:
-            return
-
-        priv_key = self.private_key
-        pub_key = self.get_address_for_private_key()
-        chain_id = self.chain_id
-        web3 = self.web3
-        nonce = web3.eth.get_transaction_count(pub_key)
-        usdc = self.usdc
-        ctf = self.ctf
-
-        # CTF Exchange
-        raw_usdc_approve_txn = usdc.functions.approve(
-            "0x4bFb41d5B3570DeFd03C39a9A4D8dE6Bd8B8982E", int(MAX_INT, 0)
-        ).build_transaction({"chainId": chain_id, "from": pub_key, "nonce": nonce})
-        signed_usdc_approve_tx = web3.eth.account.sign_transaction(
-            raw_usdc_approve_txn, private_key=priv_key
-        )
-        send_usdc_approve_tx = web3.eth.send_raw_transaction(
-            signed_usdc_approve_tx.raw_transaction
-        )
-        usdc_approve_tx_receipt = web3.eth.wait_for_transaction_receipt(
-            send_usdc_approve_tx, 600
+    @cached_property
+    def usdc(self):
+        return self.web3.eth.contract(address=self.usdc_address, abi=self.erc20_approve)
+
+    @cached_property
+    def ctf(self):
+        return self.web3.eth.contract(
+            address=self.ctf_address, abi=self.erc1155_set_approval
         )
-        print(usdc_approve_tx_receipt)
 
-        nonce = web3.eth.get_transaction_count(pub_key)
+    @cached_property
+    def account(self) -> "LocalAccount":
+        from eth_account import Account
 
-        raw_ctf_approval_txn = ctf.functions.setApprovalForAll(
-            "0x4bFb41d5B3570DeFd03C39a9A4D8dE6Bd8B8982E", True
-        ).build_transaction({"chainId": chain_id, "from": pub_key, "nonce": nonce})
-        signed_ctf_approval_tx = web3.eth.account.sign_transaction(
-            raw_ctf_approval_txn, private_key=priv_key
-        )
-        send_ctf_approval_tx = web3.eth.send_raw_transaction(
-            signed_ctf_approval_tx.raw_transaction
-        )
-        ctf_approval_tx_receipt = web3.eth.wait_for_transaction_receipt(
-            send_ctf_approval_tx, 600
-        )
-        print(ctf_approval_tx_receipt)
+        return Account.from_key(str(self.private_key))
 
-        nonce = web3.eth.get_transaction_count(pub_key)
+    @cached_property
+    def signing(self) -> "SigningContext":
+        from agents.polymarket.signing import SigningContext
 
-        # Neg Risk CTF Exchange
-        raw_usdc_approve_txn = usdc.functions.approve(
-            "0xC5d563A36AE78145C45a50134d48A1215220f80a", int(MAX_INT, 0)
-        ).build_transaction({"chainId": chain_id, "from": pub_key, "nonce": nonce})
-        signed_usdc_approve_tx = web3.eth.account.sign_transaction(
-            raw_usdc_approve_txn, private_key=priv_key
-        )
-        send_usdc_approve_tx = web3.eth.send_raw_transaction(
-            signed_usdc_approve_tx.raw_transaction
-        )
-        usdc_approve_tx_receipt = web3.eth.wait_for_transaction_receipt(
-            send_usdc_approve_tx, 600
-        )
-        print(usdc_approve_tx_receipt)
+        return SigningContext(self.private_key, self.exchange_address, self.chain_id)
 
-        nonce = web3.eth.get_transaction_count(pub_key)
+    @cached_property
+    def account_state_reader(self) -> "AccountStateReader":
+        from agents.polymarket.account_state import AccountStateReader
 
-        raw_ctf_approval_txn = ctf.functions.setApprovalForAll(
-            "0xC5d563A36AE78145C45a50134d48A1215220f80a", True
-        ).build_transaction({"chainId": chain_id, "from": pub_key, "nonce": nonce})
-        signed_ctf_approval_tx = web3.eth.account.sign_transaction(
-            raw_ctf_approval_txn, private_key=priv_key
-        )
-        send_ctf_approval_tx = web3.eth.send_raw_transaction(
-            signed_ctf_approval_tx.raw_transaction
+        return AccountStateReader(
+            self.get_address_for_private_key(),
+            rpc_url=self.polygon_rpc,
+            usdc_address=self.usdc_address,
+            ctf_address=self.ctf_address,
         )
-        ctf_approval_tx_receipt = web3.eth.wait_for_transaction_receipt(
-            send_ctf_approval_tx, 600
-        )
-        print(ctf_approval_tx_receipt)
 
-        nonce = web3.eth.get_transaction_count(pub_key)
+    @cached_property
+    def client(self) -> "ClobClient":
+        return self._init_api_keys()
 
-        # Neg Risk Adapter
-        raw_usdc_approve_txn = usdc.functions.approve(
-            "0xd91E80cF2E7be2e162c6513ceD06f1dD0dA35296", int(MAX_INT, 0)
-        ).build_transaction({"chainId": chain_id, "from": pub_key, "nonce": nonce})
-        signed_usdc_approve_tx = web3.eth.account.sign_transaction(
-            raw_usdc_approve_txn, private_key=priv_key
-        )
-        send_usdc_approve_tx = web3.eth.send_raw_transaction(
-            signed_usdc_approve_tx.raw_transaction
-        )
-        usdc_approve_tx_receipt = web3.eth.wait_for_transaction_receipt(
-            send_usdc_approve_tx, 600
-        )
-        print(usdc_approve_tx_receipt)
+    @property
+    def credentials(self) -> "ApiCreds":
+        return self.client.creds
 
-        nonce = web3.eth.get_transaction_count(pub_key)
+    def _init_api_keys(self) -> "ClobClient":
+        from py_clob_client.client import ClobClient
 
-        raw_ctf_approval_txn = ctf.functions.setApprovalForAll(
-            "0xd91E80cF2E7be2e162c6513ceD06f1dD0dA35296", True
-        ).build_transaction({"chainId": chain_id, "from": pub_key, "nonce": nonce})
-        signed_ctf_approval_tx = web3.eth.account.sign_transaction(
-            raw_ctf_approval_txn, private_key=priv_key
-        )
-        send_ctf_approval_tx = web3.eth.send_raw_transaction(
-            signed_ctf_approval_tx.raw_transaction
-        )
-        ctf_approval_tx_receipt = web3.eth.wait_for_transaction_receipt(
-            send_ctf_approval_tx, 600
+        route_clob_requests()
+        client = ClobClient(self.clob_url, key=self.private_key, chain_id=self.chain_id)
+        client.set_api_creds(client.create_or_derive_api_creds())
+        return client
+
+    def _init_approvals(self, run: bool = False) -> "list[ApprovalResult]":
+        if not run:
+            return []
+
+        from agents.polymarket.approvals import ApprovalSubmitter
+
+        submitter = ApprovalSubmitter(
+            self.private_key,
+            rpc_url=self.polygon_rpc,
+            chain_id=self.chain_id,
+            usdc_address=self.usdc_address,
+            ctf_address=self.ctf_address,
         )
-        print(ctf_approval_tx_receipt)
+        results = submitter.submit()
+        for result in results:
+            print(
+                f"{result.method} {result.spender} nonce={result.nonce} "
+                f"tx={result.tx_hash} status={result.status} "
+                f"latency={result.latency} error={result.error}"
+            )
+        return results
 
     def get_all_markets(self) -> "list[SimpleMarket]":
         markets = []
@@ -197,7 +174,7 @@ class Polymarket:
             "ascending": False,
             "limit": 50  # Reasonable limit for current markets
         }
-        res = httpx.get(self.gamma_markets_endpoint, params=params)
+        res = get_client().get(self.gamma_markets_endpoint, params=params)
         if res.status_code == 200:
             for market in res.json():
                 try:
@@ -209,15 +186,12 @@ class Polymarket:
         return markets
 
     def filter_markets_for_trading(self, markets: "list[SimpleMarket]"):
-        tradeable_markets = []
-        for market in markets:
-            if market.active:
-                tradeable_markets.append(market)
-        return tradeable_markets
+        table = MarketTable.from_markets(markets)
+        return table.filter(table["active"]).rows()
 
     def get_market(self, token_id: str) -> SimpleMarket:
         params = {"clob_token_ids": token_id}
-        res = httpx.get(self.gamma_markets_endpoint, params=params)
+        res = get_client().get(self.gamma_markets_endpoint, params=params)
         if res.status_code == 200:
             data = res.json()
             market = data[0]
@@ -234,7 +208,7 @@ class Polymarket:
             "funded": market["funded"],
             "rewardsMinSize": float(market["rewardsMinSize"]),
             "rewardsMaxSpread": float(market["rewardsMaxSpread"]),
-            # "volume": float(market["volume"]),
+            "volume": float(market.get("volume") or 0),
             "spread": float(market["spread"]),
             "outcomes": str(market["outcomes"]),
             "outcome_prices": str(market["outcomePrices"]),
@@ -246,7 +220,7 @@ class Polymarket:
 
     def get_all_events(self) -> "list[SimpleEvent]":
         events = []
-        res = httpx.get(self.gamma_events_endpoint)
+        res = get_client().get(self.gamma_events_endpoint)
         if res.status_code == 200:
             print(len(res.json()))
             for event in res.json():
@@ -298,57 +272,107 @@ class Polymarket:
     def get_sampling_simplified_markets(self) -> "list[SimpleEvent]":
         markets = []
         raw_sampling_simplified_markets = self.client.get_sampling_simplified_markets()
-        for raw_market in raw_sampling_simplified_markets["data"]:
-            token_one_id = raw_market["tokens"][0]["token_id"]
-            market = self.get_market(token_one_id)
-            markets.append(market)
+        token_one_ids = [
+            raw_market["tokens"][0]["token_id"]
+            for raw_market in raw_sampling_simplified_markets["data"]
+        ]
+        gamma_markets = self.gamma.get_markets_by_token_ids(token_one_ids)
+        for token_one_id, market in zip(token_one_ids, gamma_markets):
+            if market is None:
+                print(f"No gamma market found for token {token_one_id}")
+                continue
+            markets.append(self.map_api_to_market(market, token_one_id))
         return markets
 
-    def get_orderbook(self, token_id: str) -> OrderBookSummary:
-        return self.client.get_order_book(token_id)
+    def watch_orderbooks(self, token_ids: "list[str]", feed=None) -> OrderBookReplica:
+        """
+        Keep a local replica of these tokens' books so get_orderbook and
+        get_orderbook_price stop polling the CLOB. feed defaults to the CLOB
+        market websocket.
+        """
+        if self.orderbooks is not None:
+            self.orderbooks.subscribe(token_ids)
+            return self.orderbooks
+        self.orderbooks = OrderBookReplica(
+            feed or ClobWebSocketFeed(),
+            snapshot_source=lambda token_id: self.client.get_order_book(token_id),
+        )
+        self.orderbooks.subscribe(token_ids)
+        return self.orderbooks.start()
+
+    def get_orderbook(self, token_id: str) -> "OrderBookSummary":
+        depth = self.orderbooks.depth(token_id) if self.orderbooks else None
+        if depth is None:
+            return self.client.get_order_book(token_id)
+
+        from py_clob_client.clob_types import OrderBookSummary, OrderSummary
+
+        return OrderBookSummary(
+            market=depth["market"],
+            asset_id=token_id,
+            bids=[OrderSummary(price=str(p), size=str(s)) for p, s in depth["bids"]],
+            asks=[OrderSummary(price=str(p), size=str(s)) for p, s in depth["asks"]],
+            hash=depth["hash"],
+        )
+
+    def get_orderbook_price(self, token_id: str, side: str = "BUY") -> float:
+        best = self.orderbooks.best_bid_ask(token_id) if self.orderbooks else None
+        if best is not None:
+            price = best[0] if side == "BUY" else best[1]
+            if price is not None:
+                return price
+        return float(self.client.get_price(token_id, side)["price"])
 
-    def get_orderbook_price(self, token_id: str) -> float:
-        return float(self.client.get_price(token_id))
+    def get_orderbooks(self, token_ids: "list[str]") -> "dict[str, TokenBook]":
+        return self.market_data.get_order_books(token_ids)
+
+    def get_quotes(self, token_ids: "list[str]") -> "dict[str, TokenQuote]":
+        return self.market_data.get_quotes(token_ids)
 
     def get_address_for_private_key(self):
-        account = self.w3.eth.account.from_key(str(self.private_key))
-        return account.address
+        return self.account.address
 
     def build_order(
         self,
         market_token: str,
         amount: float,
-        nonce: str = str(round(time.time())),  # for cancellations
+        nonce: Optional[str] = None,  # for cancellations, defaults to now
         side: str = "BUY",
         expiration: str = "0",  # timestamp after which order expires
     ):
-        signer = Signer(self.private_key)
-        builder = OrderBuilder(self.exchange_address, self.chain_id, signer)
-
-        buy = side == "BUY"
-        side = 0 if buy else 1
-        maker_amount = amount if buy else 0
-        taker_amount = amount if not buy else 0
-        order_data = OrderData(
-            maker=self.get_address_for_private_key(),
-            tokenId=market_token,
-            makerAmount=maker_amount,
-            takerAmount=taker_amount,
-            feeRateBps="1",
-            nonce=nonce,
-            side=side,
-            expiration=expiration,
+        order_data = self.signing.order_data(
+            market_token, amount, side=side, nonce=nonce, expiration=expiration
         )
-        order = builder.build_signed_order(order_data)
-        return order
+        return self.signing.sign(order_data)
+
+    def build_orders(self, orders: "list[OrderData]", processes: int = 0):
+        """
+        Sign many OrderData at once, see SigningContext.sign_many
+        """
+        return self.signing.sign_many(orders, processes=processes)
+
+    def close(self) -> None:
+        """
+        Stop the signing workers and the order book feed, if they were started
+        """
+        if "signing" in self.__dict__:
+            self.signing.close()
+        if self.orderbooks is not None:
+            self.orderbooks.stop(timeout=5)
+            self.orderbooks = None
 
     def execute_order(self, price, size, side, token_id) -> str:
+        from py_clob_client.clob_types import OrderArgs
+
         return self.client.create_and_post_order(
             OrderArgs(price=price, size=size, side=side, token_id=token_id)
         )
 
     def execute_market_order(self, market, amount) -> str:
-        token_id = ast.literal_eval(market[0].dict()["metadata"]["clob_token_ids"])[1]
+        from py_clob_client.clob_types import MarketOrderArgs, OrderType
+
+        token_ids = ast.literal_eval(market[0].dict()["metadata"]["clob_token_ids"])
+        token_id = token_ids[MARKET_ORDER_OUTCOME]
         order_args = MarketOrderArgs(
             token_id=token_id,
             amount=amount,
@@ -360,14 +384,67 @@ class Polymarket:
         print("Done!")
         return resp
 
+    def order_engine(self, max_in_flight: int = 4) -> "OrderEngine":
+        """
+        Async engine for placing many orders at once, start it inside a loop
+        """
+        from agents.polymarket.order_engine import OrderEngine
+
+        return OrderEngine(self.client, max_in_flight=max_in_flight)
+
+    def execute_orders(
+        self,
+        orders: list,
+        order_type: Optional[str] = None,
+        max_in_flight: int = 4,
+    ) -> "list[OrderResult]":
+        """
+        Sign and post OrderArgs / MarketOrderArgs concurrently, results in order.
+        Without an order_type, market orders are FOK like execute_market_order
+        and limit orders GTC.
+        """
+
+        def type_of(order) -> str:
+            if order_type is not None:
+                return order_type
+            return "FOK" if hasattr(order, "amount") else "GTC"
+
+        async def run():
+            async with self.order_engine(max_in_flight) as engine:
+                futures = [engine.submit(order, type_of(order)) for order in orders]
+                return list(await asyncio.gather(*futures))
+
+        return run_sync(run())
+
+    def get_trades(self, after: int = 0) -> "list[Trade]":
+        """
+        Trades this wallet took part in, as taker or maker, matched after the
+        `after` unix timestamp. See PositionBook.apply_trade for which fields
+        describe the wallet's own fill.
+        """
+        from py_clob_client.clob_types import TradeParams
+
+        params = TradeParams(
+            maker_address=self.get_address_for_private_key(), after=after or None
+        )
+        return [Trade(**trade) for trade in self.client.get_trades(params)]
+
+    def get_account_state(self, token_ids: "list[str]" = ()) -> AccountState:
+        """
+        USDC balance and allowances, CTF approvals and the balances of
+        `token_ids`, in one rpc batch and cached for the current block
+        """
+        return self.account_state_reader.read(token_ids)
+
     def get_usdc_balance(self) -> float:
-        balance_res = self.usdc.functions.balanceOf(
-            self.get_address_for_private_key()
-        ).call()
-        return float(balance_res / 10e5)
+        return self.get_account_state().usdc_balance
 
 
 def test():
+    from py_clob_client.client import ClobClient
+    from py_clob_client.clob_types import ApiCreds
+    from py_clob_client.constants import AMOY, POLYGON
+
     host = "https://clob.polymarket.com"
     key = os.getenv("POLYGON_WALLET_PRIVATE_KEY")
     print(key)
@@ -440,6 +517,8 @@ def main():
 
 
 if __name__ == "__main__":
+    from py_clob_client.order_builder.constants import BUY
+
     load_dotenv()
 
     p = Polymarket()
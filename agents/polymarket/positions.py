@@ -0,0 +1,268 @@
+# per token positions, average cost and pnl maintained incrementally from fills
+import hashlib
+import math
+import os
+from typing import Optional, Union
+
+import numpy as np
+
+from agents.utils.objects import Position, Trade
+
+# One fixed size record per fill. Token ids are 77 digit integers, so records
+# carry an index into the token list stored next to the log instead.
+FILL_DTYPE = np.dtype(
+    [
+        ("trade_key", "<i8"),
+        ("token", "<u4"),
+        ("side", "u1"),
+        ("price", "<f8"),
+        ("size", "<f8"),
+        ("fee_rate_bps", "<f4"),
+        ("match_time", "<i8"),
+    ]
+)
+
+
+def trade_key(trade_id: Union[int, str]) -> int:
+    """
+    Signed 64 bit key for a trade id; CLOB ids are uuids, older ones ints
+    """
+    if isinstance(trade_id, int):
+        return trade_id
+    digest = hashlib.blake2b(str(trade_id).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class PositionBook:
+    """
+    Signed position, average cost and realized PnL per token, stored in
+    parallel lists indexed by a token slot. Applying a fill touches one slot,
+    so ingesting is O(1) per fill however long the history is; marking to
+    market turns the slots into arrays once and is a single expression over
+    every token.
+
+    With a `log_path`, every new fill is appended to a binary log of
+    FILL_DTYPE records; load() replays it on startup without refetching the
+    trade history from the CLOB.
+    """
+
+    def __init__(self, log_path: Optional[str] = None):
+        self.log_path = log_path
+        if log_path and os.path.dirname(log_path):
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        self.tokens: "list[str]" = []
+        self.slots: "dict[str, int]" = {}
+        self.seen: "set[int]" = set()
+        self.last_match_time = 0
+        self.fill_count = 0
+        # Lists rather than arrays: indexing NumPy from Python per fill costs
+        # several times more than a list
+        self.size: "list[float]" = []
+        self.avg_price: "list[float]" = []
+        self.realized: "list[float]" = []
+        self.marks: "list[float]" = []
+
+    def _slot(self, token_id: str) -> int:
+        slot = self.slots.get(token_id)
+        if slot is not None:
+            return slot
+        slot = len(self.tokens)
+        self.size.append(0.0)
+        self.avg_price.append(0.0)
+        self.realized.append(0.0)
+        self.marks.append(math.nan)
+        self.tokens.append(token_id)
+        self.slots[token_id] = slot
+        if self.log_path:
+            with open(self.log_path + ".tokens", "a") as tokens_file:
+                tokens_file.write(token_id + "\n")
+        return slot
+
+    def _apply(
+        self, key: int, slot: int, buy: bool, price: float, size: float, fee: float
+    ) -> None:
+        self.seen.add(key)
+        self.fill_count += 1
+        position = self.size[slot]
+        # Outcome tokens have 6 decimals, rounding keeps float error from
+        # leaving dust positions behind
+        new_position = round(position + (size if buy else -size), 6)
+        # Fees are charged on notional and always reduce realized PnL
+        realized = -price * size * fee / 10000
+        if position == 0 or (position > 0) == buy:
+            total = abs(position) + size
+            self.avg_price[slot] = (
+                self.avg_price[slot] * abs(position) + price * size
+            ) / total
+        else:
+            closed = min(size, abs(position))
+            direction = 1.0 if position > 0 else -1.0
+            realized += closed * (price - self.avg_price[slot]) * direction
+            if new_position == 0:
+                self.avg_price[slot] = 0.0
+            elif (new_position > 0) != (position > 0):
+                # Flipped through flat, the remainder opens at this price
+                self.avg_price[slot] = price
+        self.size[slot] = new_position
+        self.realized[slot] += realized
+
+    def apply_fill(
+        self,
+        trade_id: Union[int, str],
+        token_id: str,
+        side: str,
+        price: float,
+        size: float,
+        fee_rate_bps: float = 0.0,
+        match_time: int = 0,
+    ) -> bool:
+        """
+        Apply one fill; False when the trade was already applied
+        """
+        key = trade_key(trade_id)
+        if key in self.seen:
+            return False
+        slot = self._slot(str(token_id))
+        buy = side.upper() == "BUY"
+        self._apply(key, slot, buy, price, size, fee_rate_bps)
+        self.last_match_time = max(self.last_match_time, match_time)
+        if self.log_path:
+            record = np.array(
+                [(key, slot, buy, price, size, fee_rate_bps, match_time)],
+                dtype=FILL_DTYPE,
+            )
+            with open(self.log_path, "ab") as log_file:
+                log_file.write(record.tobytes())
+        return True
+
+    def apply_trade(self, trade: Trade, address: Optional[str] = None) -> int:
+        """
+        Apply this wallet's side of a trade, returns the number of new fills.
+        As taker that is the trade itself. As maker the top level fields are
+        the counterparty's order, so each of the wallet's own maker_orders
+        (matched by `address`, else by the trade owner's api key) is a fill.
+        """
+        if trade.trader_side != "MAKER":
+            return int(
+                self.apply_fill(
+                    trade.id,
+                    trade.asset_id,
+                    trade.side,
+                    float(trade.price),
+                    float(trade.size),
+                    float(trade.fee_rate_bps or 0),
+                    int(trade.match_time or 0),
+                )
+            )
+        applied = 0
+        for order in trade.maker_orders:
+            if address:
+                own = order.maker_address.lower() == address.lower()
+            else:
+                own = order.owner == trade.owner
+            if not own:
+                continue
+            applied += self.apply_fill(
+                f"{trade.id}:{order.order_id}",
+                order.asset_id,
+                order.side,
+                float(order.price),
+                float(order.matched_amount),
+                float(order.fee_rate_bps or 0),
+                int(trade.match_time or 0),
+            )
+        return applied
+
+    def apply_trades(self, trades: "list[Trade]", address: Optional[str] = None) -> int:
+        return sum(self.apply_trade(trade, address) for trade in trades)
+
+    def load(self) -> int:
+        """
+        Replay the fill log, returns the number of fills applied
+        """
+        if not self.log_path or not os.path.isfile(self.log_path):
+            return 0
+        tokens_path = self.log_path + ".tokens"
+        if os.path.isfile(tokens_path):
+            with open(tokens_path) as tokens_file:
+                tokens = tokens_file.read().split()
+        else:
+            tokens = []
+        with open(self.log_path, "rb") as log_file:
+            data = log_file.read()
+        # A crash mid-append can leave a partial last record, ignore it
+        usable = len(data) - len(data) % FILL_DTYPE.itemsize
+        records = np.frombuffer(data[:usable], dtype=FILL_DTYPE)
+
+        log_path, self.log_path = self.log_path, None
+        try:
+            slots = [self._slot(token) for token in tokens]
+            # Plain Python scalars are several times faster to loop over than
+            # NumPy ones
+            applied = 0
+            for key, token, side, price, size, fee in zip(
+                records["trade_key"].tolist(),
+                records["token"].tolist(),
+                records["side"].tolist(),
+                records["price"].tolist(),
+                records["size"].tolist(),
+                records["fee_rate_bps"].tolist(),
+            ):
+                if key in self.seen:
+                    continue
+                self._apply(key, slots[token], side, price, size, fee)
+                applied += 1
+            if len(records):
+                self.last_match_time = max(
+                    self.last_match_time, int(records["match_time"].max())
+                )
+        finally:
+            self.log_path = log_path
+        return applied
+
+    def update_marks(self, prices: "dict[str, float]") -> None:
+        for token_id, price in prices.items():
+            slot = self.slots.get(str(token_id))
+            if slot is not None and price is not None:
+                self.marks[slot] = price
+
+    def unrealized(self) -> np.ndarray:
+        """
+        Unrealized PnL per token slot at the cached marks, NaN where unmarked
+        """
+        return np.asarray(self.size) * (
+            np.asarray(self.marks) - np.asarray(self.avg_price)
+        )
+
+    def totals(self) -> "dict[str, float]":
+        size = np.asarray(self.size)
+        marks = np.asarray(self.marks)
+        unrealized = self.unrealized()
+        marked = ~np.isnan(marks)
+        return {
+            "realized_pnl": float(np.sum(self.realized)),
+            "unrealized_pnl": float(unrealized[marked].sum()),
+            "market_value": float((size * marks)[marked].sum()),
+            "unmarked_positions": int(np.count_nonzero(~marked & (size != 0))),
+        }
+
+    def positions(self, open_only: bool = True) -> "list[Position]":
+        unrealized = self.unrealized()
+        positions = []
+        for slot, token_id in enumerate(self.tokens):
+            if open_only and self.size[slot] == 0:
+                continue
+            mark = self.marks[slot]
+            positions.append(
+                Position(
+                    token_id=token_id,
+                    size=self.size[slot],
+                    avg_price=self.avg_price[slot],
+                    realized_pnl=self.realized[slot],
+                    mark=None if math.isnan(mark) else mark,
+                    unrealized_pnl=(
+                        None if np.isnan(unrealized[slot]) else float(unrealized[slot])
+                    ),
+                )
+            )
+        return positions
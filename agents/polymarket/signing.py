@@ -0,0 +1,100 @@
+# order signing with the key material derived once per process
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from py_order_utils.builders import OrderBuilder
+from py_order_utils.model import OrderData, SignedOrder
+from py_order_utils.signer import Signer
+
+
+class SigningContext:
+    """
+    Signer, OrderBuilder and maker address for one private key. Deriving the
+    account from the key is most of the cost of building a Signer, so a context
+    is built once and reused for every order signed with that key.
+
+    sign_many keeps its process pool between batches; close() it, or use the
+    context in a with block, to stop the workers.
+    """
+
+    def __init__(self, private_key: str, exchange_address: str, chain_id: int):
+        self.private_key = private_key
+        self.exchange_address = exchange_address
+        self.chain_id = chain_id
+        self.signer = Signer(private_key)
+        self.address = self.signer.address()
+        self.builder = OrderBuilder(exchange_address, chain_id, self.signer)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_size = 0
+
+    def order_data(
+        self,
+        token_id: str,
+        amount: float,
+        side: str = "BUY",
+        nonce: Optional[str] = None,
+        expiration: str = "0",
+    ) -> OrderData:
+        buy = side == "BUY"
+        return OrderData(
+            maker=self.address,
+            tokenId=token_id,
+            makerAmount=amount if buy else 0,
+            takerAmount=amount if not buy else 0,
+            feeRateBps="1",
+            # Taken per order; nonces are used for onchain cancellations
+            nonce=nonce if nonce is not None else str(round(time.time())),
+            side=0 if buy else 1,
+            expiration=expiration,
+        )
+
+    def sign(self, order_data: OrderData) -> SignedOrder:
+        return self.builder.build_signed_order(order_data)
+
+    def sign_many(
+        self, orders: "list[OrderData]", processes: int = 0
+    ) -> "list[SignedOrder]":
+        """
+        Sign a batch of orders, in order. With processes > 1 the batch is spread
+        over a process pool whose workers each build their own context once;
+        signing is CPU bound so threads would not help.
+        """
+        processes = min(processes, len(orders), os.cpu_count() or 1)
+        if processes <= 1:
+            return [self.sign(order) for order in orders]
+        if self._pool is None or self._pool_size != processes:
+            self.close()
+            self._pool = ProcessPoolExecutor(
+                max_workers=processes,
+                initializer=_init_worker,
+                initargs=(self.private_key, self.exchange_address, self.chain_id),
+            )
+            self._pool_size = processes
+        chunksize = max(1, len(orders) // (processes * 4))
+        return list(self._pool.map(_sign_in_worker, orders, chunksize=chunksize))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+            self._pool_size = 0
+
+    def __enter__(self) -> "SigningContext":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_worker_context: Optional[SigningContext] = None
+
+
+def _init_worker(private_key: str, exchange_address: str, chain_id: int) -> None:
+    global _worker_context
+    _worker_context = SigningContext(private_key, exchange_address, chain_id)
+
+
+def _sign_in_worker(order_data: OrderData) -> SignedOrder:
+    return _worker_context.sign(order_data)
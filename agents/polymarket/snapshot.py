@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import time
+
+from agents.polymarket.gamma import GammaMarketClient
+from agents.utils.objects import SyncStats
+
+logger = logging.getLogger(__name__)
+
+
+class MarketSnapshot:
+    """
+    Local copy of the active market universe kept current by updatedAt deltas.
+    The first sync pulls every active market; later syncs only fetch markets
+    updated since the stored watermark and drop the ones that closed.
+    """
+
+    def __init__(self, snapshot_path=None, gamma_client=None) -> None:
+        # Its own directory, ./local_db holds the chroma store and the llm cache
+        self.snapshot_path = snapshot_path or os.getenv(
+            "MARKET_SNAPSHOT_PATH", "./local_db_snapshot/markets_snapshot.json"
+        )
+        self.gamma_client = gamma_client or GammaMarketClient()
+        self.watermark: str = None
+        self.markets_by_id: dict = {}
+        self.last_sync_stats: SyncStats = None
+        self.loaded = False
+
+    def load(self) -> None:
+        self.loaded = True
+        if not os.path.isfile(self.snapshot_path):
+            return
+        with open(self.snapshot_path, "r") as snapshot_file:
+            snapshot = json.load(snapshot_file)
+        self.watermark = snapshot["watermark"]
+        self.markets_by_id = snapshot["markets"]
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.snapshot_path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        # Write then rename so a crash mid-dump never leaves a truncated snapshot
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w+") as snapshot_file:
+            json.dump(
+                {"watermark": self.watermark, "markets": self.markets_by_id},
+                snapshot_file,
+            )
+        os.replace(tmp_path, self.snapshot_path)
+
+    def is_tradeable(self, market: dict) -> bool:
+        return (
+            market.get("active", False)
+            and not market.get("closed", False)
+            and not market.get("archived", False)
+        )
+
+    def sync(self, limit=100, concurrency=8) -> SyncStats:
+        if not self.loaded:
+            self.load()
+        start = time.perf_counter()
+        # Gamma's updatedAt format, the watermark if no market carries one
+        started_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        full_sync = self.watermark is None
+        new = updated = removed = 0
+
+        if full_sync:
+            changed_markets = self.gamma_client.get_all_current_markets(
+                limit=limit, concurrency=concurrency
+            )
+            self.markets_by_id = {}
+        else:
+            changed_markets = self.gamma_client.get_markets_updated_since(
+                self.watermark, limit=limit
+            )
+        pagination_stats = self.gamma_client.last_pagination_stats
+
+        for market in changed_markets:
+            market_id = str(market["id"])
+            previous = self.markets_by_id.get(market_id)
+            if not self.is_tradeable(market):
+                if previous is not None:
+                    del self.markets_by_id[market_id]
+                    removed += 1
+            elif previous is None:
+                self.markets_by_id[market_id] = market
+                new += 1
+            elif previous != market:
+                self.markets_by_id[market_id] = market
+                updated += 1
+
+            updated_at = market.get("updatedAt")
+            if updated_at and (self.watermark is None or updated_at > self.watermark):
+                self.watermark = updated_at
+
+        if self.watermark is None:
+            logger.warning(
+                f"No market had updatedAt, using the sync start {started_at} "
+                "as the watermark"
+            )
+            self.watermark = started_at
+        self.save()
+        self.last_sync_stats = SyncStats(
+            full_sync=full_sync,
+            new=new,
+            updated=updated,
+            removed=removed,
+            total=len(self.markets_by_id),
+            pages=pagination_stats.pages,
+            bytes=pagination_stats.bytes,
+            seconds=time.perf_counter() - start,
+            watermark=self.watermark,
+        )
+        return self.last_sync_stats
+
+    def get_all_markets(self) -> "list[dict]":
+        if not self.loaded:
+            self.load()
+        return sorted(
+            self.markets_by_id.values(),
+            key=lambda market: market.get("createdAt") or "",
+            reverse=True,
+        )
+
+    def get_current_markets(self, limit=4) -> "list[dict]":
+        return self.get_all_markets()[:limit]
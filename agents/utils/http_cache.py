@@ -0,0 +1,221 @@
+# ttl + conditional-request cache for idempotent GET endpoints (gamma)
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlencode, urlsplit
+
+import httpx
+
+from agents.utils.http_clients import get_client
+from agents.utils.objects import CacheStats
+
+DEFAULT_TTLS = {
+    "/markets": 30.0,
+    "/events": 60.0,
+}
+
+
+class CacheEntry:
+    def __init__(self, body: bytes, headers: dict, ttl: float, stored_at: float = None):
+        self.body = body
+        self.headers = headers
+        self.etag = headers.get("etag")
+        self.last_modified = headers.get("last-modified")
+        self.ttl = ttl
+        self.stored_at = stored_at if stored_at is not None else time.time()
+
+    def is_fresh(self) -> bool:
+        return time.time() - self.stored_at < self.ttl
+
+
+class HttpCache:
+    """
+    GET responses keyed on url + sorted query params. Entries live for the ttl of
+    the longest matching path prefix; once stale they are revalidated with
+    If-None-Match / If-Modified-Since so an unchanged resource costs a 304.
+    The least recently used bodies are evicted once `max_bytes` is exceeded.
+    """
+
+    def __init__(
+        self,
+        ttls: dict = None,
+        default_ttl: float = 30.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        persist_path: Optional[str] = None,
+    ) -> None:
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.persist_path = persist_path
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if persist_path is not None:
+            self.load()
+            atexit.register(self.save)
+
+    def key(self, url: str, params: dict = None) -> str:
+        if not params:
+            return url
+        items = []
+        for name, value in sorted(params.items()):
+            values = value if isinstance(value, (list, tuple)) else [value]
+            items.extend((name, str(v)) for v in values)
+        return url + "?" + urlencode(items)
+
+    def ttl_for(self, url: str) -> float:
+        path = urlsplit(url).path
+        matches = [prefix for prefix in self.ttls if path.startswith(prefix)]
+        if not matches:
+            return self.default_ttl
+        return self.ttls[max(matches, key=len)]
+
+    def get(
+        self,
+        url: str,
+        params: dict = None,
+        fresh: bool = False,
+        client: httpx.Client = None,
+    ) -> httpx.Response:
+        """
+        `fresh=True` skips the cached copy (and its revalidation) but still
+        stores the new response.
+        """
+        client = client or get_client()
+        key = self.key(url, params)
+        with self._lock:
+            entry = None if fresh else self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                if entry.is_fresh():
+                    self.hits += 1
+                    return self._to_response(entry, url)
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        response = client.get(url, params=params, headers=headers)
+
+        with self._lock:
+            if response.status_code == 304 and entry is not None:
+                self.revalidated += 1
+                entry.stored_at = time.time()
+                return self._to_response(entry, url)
+            self.misses += 1
+            if response.status_code == 200:
+                self._store(key, response, self.ttl_for(url))
+        return response
+
+    def _store(self, key: str, response: httpx.Response, ttl: float) -> None:
+        body = response.content
+        if len(body) > self.max_bytes:
+            return
+        headers = {
+            name: response.headers[name]
+            for name in ("content-type", "etag", "last-modified")
+            if name in response.headers
+        }
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.total_bytes -= len(previous.body)
+        self.entries[key] = CacheEntry(body, headers, ttl)
+        self.total_bytes += len(body)
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= len(evicted.body)
+            self.evictions += 1
+
+    def _to_response(self, entry: CacheEntry, url: str) -> httpx.Response:
+        return httpx.Response(
+            200,
+            content=entry.body,
+            headers=entry.headers,
+            request=httpx.Request("GET", url),
+        )
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                revalidated=self.revalidated,
+                evictions=self.evictions,
+                entries=len(self.entries),
+                bytes=self.total_bytes,
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def save(self) -> None:
+        if self.persist_path is None:
+            return
+        with self._lock:
+            data = {
+                key: {
+                    "body": entry.body.decode("utf-8"),
+                    "headers": entry.headers,
+                    "ttl": entry.ttl,
+                    "stored_at": entry.stored_at,
+                }
+                for key, entry in self.entries.items()
+            }
+        directory = os.path.dirname(self.persist_path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        tmp_path = self.persist_path + ".tmp"
+        with open(tmp_path, "w+") as cache_file:
+            json.dump(data, cache_file)
+        os.replace(tmp_path, self.persist_path)
+
+    def load(self) -> None:
+        if not os.path.isfile(self.persist_path):
+            return
+        with open(self.persist_path, "r") as cache_file:
+            data = json.load(cache_file)
+        with self._lock:
+            for key, item in data.items():
+                body = item["body"].encode("utf-8")
+                self.entries[key] = CacheEntry(
+                    body, item["headers"], item["ttl"], item["stored_at"]
+                )
+                self.total_bytes += len(body)
+            # The file may have been written under a larger max_bytes
+            self._evict()
+
+
+_default_cache: Optional[HttpCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> HttpCache:
+    """
+    The cache shared by every GammaMarketClient in the process. Set
+    GAMMA_CACHE_PATH to keep it on disk between runs.
+    """
+    global _default_cache
+    # Reached from the http clients' loop thread as well as the caller's
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache(
+                max_bytes=int(os.getenv("GAMMA_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+                persist_path=os.getenv("GAMMA_CACHE_PATH"),
+            )
+        return _default_cache
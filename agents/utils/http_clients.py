@@ -0,0 +1,246 @@
+# process-wide pooled http clients shared by the gamma, clob and connector code
+import asyncio
+import atexit
+import importlib.util
+import os
+import threading
+import weakref
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from agents.utils.objects import RateLimitStats
+from agents.utils.rate_limit import (
+    AsyncRateLimitedTransport,
+    RateLimitedTransport,
+    RateLimiter,
+)
+
+
+class ClientRegistry:
+    """
+    Hands out one keep-alive httpx.Client per process and one httpx.AsyncClient
+    per event loop, so repeated Gamma/CLOB requests reuse open TCP+TLS
+    connections instead of handshaking on every call. Both clients send through
+    the same per-host RateLimiter.
+
+    Sync wrappers around async code should use run() rather than asyncio.run:
+    it runs the coroutine on one long-lived loop, so its AsyncClient and
+    connections carry over from call to call.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._client: Optional[httpx.Client] = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._requests_session: Optional[requests.Session] = None
+        self.transport: Optional[httpx.BaseTransport] = None
+        self.async_transport: Optional[httpx.AsyncBaseTransport] = None
+        self.rate_limiter = RateLimiter()
+        self.configure()
+
+    def configure(
+        self,
+        http2: Optional[bool] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout: Optional[float] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        """
+        Settings left as None fall back to the HTTP_* environment variables.
+        Clients that already exist are closed so the next call picks up the
+        new settings.
+        """
+        if http2 is None:
+            http2 = os.getenv("HTTP_HTTP2", "false").lower() in ("1", "true", "yes")
+        if http2 and importlib.util.find_spec("h2") is None:
+            print("HTTP/2 requested but the h2 package is missing, using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections
+            or int(os.getenv("HTTP_MAX_CONNECTIONS", 100)),
+            max_keepalive_connections=max_keepalive_connections
+            or int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)),
+            keepalive_expiry=keepalive_expiry
+            or float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30.0)),
+        )
+        self.timeout = httpx.Timeout(timeout or float(os.getenv("HTTP_TIMEOUT", 30.0)))
+        self.transport = transport
+        self.async_transport = async_transport
+        self.close()
+
+    def get_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None or self._client.is_closed:
+                transport = self.transport or httpx.HTTPTransport(
+                    http2=self.http2, limits=self.limits
+                )
+                self._client = httpx.Client(
+                    timeout=self.timeout,
+                    transport=RateLimitedTransport(transport, self.rate_limiter),
+                )
+            return self._client
+
+    def get_async_client(self) -> httpx.AsyncClient:
+        # An AsyncClient's connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None or client.is_closed:
+                transport = self.async_transport or httpx.AsyncHTTPTransport(
+                    http2=self.http2, limits=self.limits
+                )
+                client = httpx.AsyncClient(
+                    timeout=self.timeout,
+                    transport=AsyncRateLimitedTransport(transport, self.rate_limiter),
+                )
+                self._async_clients[loop] = client
+            return client
+
+    def run(self, coroutine):
+        """
+        Run `coroutine` on the registry's event loop thread and return its
+        result, blocking the caller until it is done
+        """
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="http-clients", daemon=True
+                )
+                self._loop_thread.start()
+            loop = self._loop
+        if threading.current_thread() is self._loop_thread:
+            coroutine.close()
+            raise RuntimeError("run() called from its own loop, await instead")
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    def get_requests_session(self) -> requests.Session:
+        # For third party sdks (newsapi) that only accept a requests session
+        with self._lock:
+            if self._requests_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=self.limits.max_keepalive_connections,
+                    pool_maxsize=self.limits.max_connections,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._requests_session = session
+            return self._requests_session
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+            if self._requests_session is not None:
+                self._requests_session.close()
+                self._requests_session = None
+            async_clients = list(self._async_clients.items())
+            self._async_clients = weakref.WeakKeyDictionary()
+        for loop, client in async_clients:
+            self._close_async_client(loop, client)
+
+    def _close_async_client(
+        self, loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient
+    ) -> None:
+        # An AsyncClient can only be closed on the loop that opened it; a loop
+        # that is already closed took its connections with it
+        if client.is_closed or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            loop.create_task(client.aclose())
+        elif loop.is_running():
+            future = asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            try:
+                future.result(timeout=5.0)
+            except Exception as e:
+                print(f"Could not close an async http client: {e}")
+        else:
+            loop.run_until_complete(client.aclose())
+
+
+_registry = ClientRegistry()
+
+
+def configure_clients(**kwargs) -> None:
+    _registry.configure(**kwargs)
+
+
+def get_client() -> httpx.Client:
+    return _registry.get_client()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    return _registry.get_async_client()
+
+
+def run_sync(coroutine):
+    return _registry.run(coroutine)
+
+
+def get_requests_session() -> requests.Session:
+    return _registry.get_requests_session()
+
+
+def get_rate_limiter() -> RateLimiter:
+    return _registry.rate_limiter
+
+
+def get_rate_limit_stats() -> "list[RateLimitStats]":
+    return _registry.rate_limiter.stats()
+
+
+def close_clients() -> None:
+    _registry.close()
+
+
+atexit.register(close_clients)
+
+
+def route_clob_requests() -> None:
+    """
+    py_clob_client sends every REST call through http_helpers.helpers.request with
+    a bare requests.request; swap that for the pooled client.
+    """
+    from py_clob_client.exceptions import PolyApiException
+    from py_clob_client.http_helpers import helpers
+
+    if getattr(helpers.request, "_pooled", False):
+        return
+
+    def request(endpoint: str, method: str, headers=None, data=None):
+        try:
+            headers = helpers.overloadHeaders(method, headers)
+            resp = get_client().request(
+                method=method,
+                url=endpoint,
+                headers=headers,
+                json=data if data else None,
+            )
+            if resp.status_code != 200:
+                raise PolyApiException(resp)
+
+            try:
+                return resp.json()
+            except ValueError:
+                return resp.text
+
+        except httpx.HTTPError:
+            raise PolyApiException(error_msg="Request exception!")
+
+    request._pooled = True
+    helpers.request = request
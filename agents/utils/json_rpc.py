@@ -0,0 +1,62 @@
+# minimal JSON-RPC client that sends calls as one batch over the pooled client
+import itertools
+
+from agents.utils.http_clients import get_client
+
+
+class JsonRpcError(Exception):
+    pass
+
+
+class JsonRpcClient:
+    """
+    web3 6 has no batch requests, so batches are posted as raw JSON-RPC. Each
+    batch is one round trip however many calls it holds.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.batches = 0
+        self._ids = itertools.count()
+
+    def batch(self, calls: "list[tuple[str, list]]", raise_errors: bool = True) -> list:
+        """
+        Results in the order of `calls`. With raise_errors=False a failed call
+        yields a JsonRpcError in its slot instead of failing the whole batch.
+        """
+        if not calls:
+            return []
+        requests = [
+            {
+                "jsonrpc": "2.0",
+                "id": next(self._ids),
+                "method": method,
+                "params": params,
+            }
+            for method, params in calls
+        ]
+        response = get_client().post(self.url, json=requests)
+        response.raise_for_status()
+        self.batches += 1
+        replies = response.json()
+        if isinstance(replies, dict):
+            # Some nodes answer a rejected batch with a single error object
+            raise JsonRpcError(f"JSON-RPC batch failed: {replies.get('error')}")
+
+        by_id = {reply.get("id"): reply for reply in replies}
+        results = []
+        for request in requests:
+            reply = by_id.get(request["id"], {})
+            if "error" in reply or "result" not in reply:
+                error = JsonRpcError(
+                    f"{request['method']} failed: {reply.get('error', 'no reply')}"
+                )
+                if raise_errors:
+                    raise error
+                results.append(error)
+            else:
+                results.append(reply["result"])
+        return results
+
+    def call(self, method: str, params: list):
+        return self.batch([(method, params)])[0]
@@ -0,0 +1,65 @@
+# incremental decoding of top level json arrays from a byte stream
+import codecs
+import json
+from typing import Iterable, Iterator
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator:
+    """
+    Yield the elements of a JSON array as soon as each one has fully arrived, so
+    only the element being parsed is buffered instead of the whole document.
+    """
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    started = False
+    chunks = iter(chunks)
+    exhausted = False
+
+    while True:
+        # Skip separators; anything else is (the start of) the next element
+        while position < len(buffer) and buffer[position] in _whitespace + ",":
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != "[":
+                raise ValueError("Expected a JSON array")
+            started = True
+            position += 1
+            continue
+        if started and position < len(buffer) and buffer[position] == "]":
+            return
+
+        if position < len(buffer):
+            try:
+                element, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                end = None
+            # A number or literal is only complete once a delimiter follows it
+            if end is not None and (
+                isinstance(element, (dict, list, str))
+                or exhausted
+                or (end < len(buffer) and buffer[end] in _whitespace + ",]")
+            ):
+                yield element
+                buffer = buffer[end:]
+                position = 0
+                continue
+
+        if exhausted:
+            raise ValueError("Truncated JSON array")
+        try:
+            buffer = buffer[position:] + text_decoder.decode(next(chunks))
+            position = 0
+        except StopIteration:
+            buffer = buffer[position:] + text_decoder.decode(b"", final=True)
+            position = 0
+            exhausted = True
+
+
+def project(record: dict, fields: "list[str]" = None) -> dict:
+    if fields is None:
+        return record
+    return {field: record[field] for field in fields if field in record}
@@ -0,0 +1,170 @@
+# content addressed, sqlite backed cache of llm responses
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from agents.utils.objects import LLMCacheStats
+
+
+def normalize_messages(messages) -> "list[tuple[str, str]]":
+    """
+    (role, content) pairs with trailing whitespace stripped from each line and
+    runs of blank lines collapsed, so prompts that only differ there share an
+    entry. Newlines and indentation are kept: table rows and line structure
+    change the prompt. Accepts a prompt string, langchain messages or
+    (role, content) tuples.
+    """
+    if isinstance(messages, str):
+        messages = [("human", messages)]
+    normalized = []
+    for message in messages:
+        if isinstance(message, (tuple, list)):
+            role, content = message
+        else:
+            role, content = message.type, message.content
+        text = "\n".join(line.rstrip() for line in str(content).splitlines())
+        normalized.append((role, re.sub(r"\n{3,}", "\n\n", text.strip("\n"))))
+    return normalized
+
+
+class LLMCache:
+    """
+    LLM responses keyed on a hash of the model, temperature and normalized
+    messages, stored in sqlite so they survive restarts. Entries expire after
+    `ttl` seconds and the least recently used are evicted once the responses
+    add up to more than `max_bytes` (utf-8), like HttpCache.
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        ttl: float = 24 * 3600.0,
+        max_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._last_access = 0.0
+        directory = os.path.dirname(path) if path != ":memory:" else ""
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        # One connection shared across threads, serialized by the lock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            if path != ":memory:":
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, "
+                "created_at REAL, accessed_at REAL, size INTEGER)"
+            )
+            columns = [
+                row[1] for row in self._db.execute("PRAGMA table_info(responses)")
+            ]
+            if "size" not in columns:
+                # Caches written before responses were sized
+                self._db.execute("ALTER TABLE responses ADD COLUMN size INTEGER")
+                self._db.execute(
+                    "UPDATE responses SET size = length(CAST(response AS BLOB))"
+                )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+                "ON responses (accessed_at)"
+            )
+
+    def key(self, model: str, temperature: float, messages) -> str:
+        payload = json.dumps(
+            [model, temperature, normalize_messages(messages)], separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _now(self) -> float:
+        # Strictly increasing, so LRU order holds even within one clock tick
+        self._last_access = max(time.time(), self._last_access + 1e-6)
+        return self._last_access
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock, self._db:
+            now = self._now()
+            row = self._db.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            response, created_at = row
+            if now - created_at >= self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            return response
+
+    def set(self, key: str, model: str, response: str) -> None:
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock, self._db:
+            now = self._now()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, response, created_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, now, now, size),
+            )
+            total = self._total_bytes()
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            for old_key, old_size in self._db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                evicted.append((old_key,))
+                total -= old_size
+            self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+            self.evictions += len(evicted)
+
+    def _total_bytes(self) -> int:
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        return total
+
+    def stats(self) -> LLMCacheStats:
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+            total_bytes = self._total_bytes()
+            lookups = self.hits + self.misses
+            return LLMCacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                expired=self.expired,
+                evictions=self.evictions,
+                entries=entries,
+                bytes=total_bytes,
+                hit_rate=self.hits / lookups if lookups else 0.0,
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -3,8 +3,22 @@ from typing import Optional, Union
 from pydantic import BaseModel
 
 
+class MakerOrder(BaseModel):
+    # a resting order a trade matched against, from Trade.maker_orders
+    order_id: str
+    owner: str
+    maker_address: str
+    matched_amount: str
+    price: str
+    fee_rate_bps: str
+    asset_id: str
+    outcome: str
+    side: str
+
+
 class Trade(BaseModel):
-    id: int
+    # uuid from the CLOB /data/trades endpoint
+    id: Union[int, str]
     taker_order_id: str
     market: str
     asset_id: str
@@ -19,9 +33,11 @@ class Trade(BaseModel):
     maker_address: str
     owner: str
     transaction_hash: str
-    bucket_index: str
-    maker_orders: list[str]
+    bucket_index: Union[int, str]
+    maker_orders: "list[MakerOrder]"
     type: str
+    # TAKER or MAKER; the top level side, asset, price and size are the taker's
+    trader_side: Optional[str] = None
 
 
 class SimpleMarket(BaseModel):
@@ -37,7 +53,7 @@ class SimpleMarket(BaseModel):
     # orderPriceMinTickSize: float
     rewardsMinSize: float
     rewardsMaxSpread: float
-    # volume: Optional[float]
+    volume: Optional[float] = None
     spread: float
     outcomes: str
     outcome_prices: str
@@ -212,6 +228,146 @@ class SimpleEvent(BaseModel):
     markets: str
 
 
+class PaginationStats(BaseModel):
+    pages: int
+    markets: int
+    seconds: float
+    bytes: int = 0
+
+
+class SyncStats(BaseModel):
+    full_sync: bool
+    new: int
+    updated: int
+    removed: int
+    total: int
+    pages: int
+    bytes: int
+    seconds: float
+    watermark: Optional[str] = None
+
+
+class CacheStats(BaseModel):
+    hits: int
+    misses: int
+    revalidated: int
+    evictions: int
+    entries: int
+    bytes: int
+
+
+class LLMCacheStats(BaseModel):
+    hits: int
+    misses: int
+    expired: int
+    evictions: int
+    entries: int
+    bytes: int
+    hit_rate: float
+
+
+class ChunkResult(BaseModel):
+    index: int
+    # estimated tokens sent for the chunk
+    tokens: int
+    seconds: float
+    content: str
+
+
+class TradeCandidate(BaseModel):
+    # index into the markets handed to Executor.evaluate_markets
+    index: int
+    question: str
+    price: float
+    size: float
+    side: str
+    market_price: float
+    # price - market_price, market_price being the bought token's
+    edge: float
+    seconds: float
+    content: str
+
+
+class RateLimitStats(BaseModel):
+    host: str
+    requests: int
+    throttled: int
+    retried: int
+    wait_seconds: float
+    concurrency: int
+
+
+class TokenBook(BaseModel):
+    token_id: str
+    market: Optional[str] = None
+    # (price, size) levels, best first
+    bids: "list[tuple[float, float]]" = []
+    asks: "list[tuple[float, float]]" = []
+    hash: Optional[str] = None
+    error: Optional[str] = None
+
+
+class TokenQuote(BaseModel):
+    token_id: str
+    bid: Optional[float] = None
+    ask: Optional[float] = None
+    midpoint: Optional[float] = None
+    last_trade_price: Optional[float] = None
+    error: Optional[str] = None
+
+
+class AccountState(BaseModel):
+    block_number: int
+    address: str
+    usdc_balance: float
+    # keyed by spender / operator contract
+    usdc_allowances: "dict[str, float]"
+    ctf_approvals: "dict[str, bool]"
+    # CTF position balances keyed by token id
+    positions: "dict[str, float]" = {}
+
+
+class ApprovalResult(BaseModel):
+    contract: str
+    method: str
+    spender: str
+    nonce: int
+    tx_hash: Optional[str] = None
+    status: Optional[int] = None
+    block_number: Optional[int] = None
+    # seconds from broadcast to receipt
+    latency: Optional[float] = None
+    error: Optional[str] = None
+
+
+class Position(BaseModel):
+    token_id: str
+    # negative when short
+    size: float
+    avg_price: float
+    realized_pnl: float
+    mark: Optional[float] = None
+    unrealized_pnl: Optional[float] = None
+
+
+class OrderTimings(BaseModel):
+    # seconds spent in each stage of OrderEngine
+    queue_wait: float
+    sign: float
+    # signed until sent, i.e. waiting for an in-flight slot
+    post: float
+    ack: float
+    total: float
+
+
+class OrderResult(BaseModel):
+    key: str
+    order_id: Optional[str] = None
+    response: Optional[dict] = None
+    error: Optional[str] = None
+    timings: OrderTimings
+
+
 class Source(BaseModel):
     id: Optional[str]
     name: Optional[str]
@@ -0,0 +1,256 @@
+# client side, per host rate limiting with adaptive concurrency and retries
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+from agents.utils.objects import RateLimitStats
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostLimiter:
+    """
+    Token bucket plus an in-flight cap for one host. The cap follows AIMD: every
+    429 halves it (and honours Retry-After by pausing the host), every success
+    grows it back towards `max_concurrency` by one slot per window.
+    """
+
+    def __init__(self, rate: float, burst: int, max_concurrency: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.retried = 0
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """
+        Take a slot and a token, or return how long to wait before trying again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            if self.in_flight >= int(self.concurrency):
+                return 0.01
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+            self.in_flight += 1
+            self.requests += 1
+            return 0.0
+
+    def release(self, status_code: Optional[int], retry_after: Optional[float]) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if status_code == 429:
+                self.throttled += 1
+                self.concurrency = max(1.0, self.concurrency / 2)
+                if retry_after:
+                    self.paused_until = max(
+                        self.paused_until, time.monotonic() + retry_after
+                    )
+            elif status_code is not None and status_code < 500:
+                self.concurrency = min(
+                    float(self.max_concurrency),
+                    self.concurrency + 1 / max(self.concurrency, 1.0),
+                )
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_seconds += seconds
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retried += 1
+
+    def stats(self, host: str) -> RateLimitStats:
+        with self._lock:
+            return RateLimitStats(
+                host=host,
+                requests=self.requests,
+                throttled=self.throttled,
+                retried=self.retried,
+                wait_seconds=self.wait_seconds,
+                concurrency=int(self.concurrency),
+            )
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        rate: float = None,
+        burst: int = None,
+        max_concurrency: int = None,
+        max_retries: int = None,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+    ) -> None:
+        self.rate = rate or float(os.getenv("RATE_LIMIT_RPS", 10.0))
+        self.burst = burst or int(os.getenv("RATE_LIMIT_BURST", 20))
+        self.max_concurrency = max_concurrency or int(
+            os.getenv("RATE_LIMIT_MAX_CONCURRENCY", 16)
+        )
+        self.max_retries = (
+            max_retries
+            if max_retries is not None
+            else int(os.getenv("RATE_LIMIT_MAX_RETRIES", 5))
+        )
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.host_settings: dict = {}
+        self.hosts: "dict[str, HostLimiter]" = {}
+        self._lock = threading.Lock()
+
+    def configure_host(
+        self, host: str, rate: float = None, burst: int = None, max_concurrency=None
+    ) -> None:
+        with self._lock:
+            self.host_settings[host] = (
+                rate or self.rate,
+                burst or self.burst,
+                max_concurrency or self.max_concurrency,
+            )
+            self.hosts.pop(host, None)
+
+    def for_host(self, host: str) -> HostLimiter:
+        with self._lock:
+            if host not in self.hosts:
+                rate, burst, max_concurrency = self.host_settings.get(
+                    host, (self.rate, self.burst, self.max_concurrency)
+                )
+                self.hosts[host] = HostLimiter(rate, burst, max_concurrency)
+            return self.hosts[host]
+
+    def backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        # Full jitter keeps a burst of throttled clients from retrying in lockstep
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+        return max(delay, retry_after or 0.0)
+
+    def should_retry(
+        self, request: httpx.Request, status_code: Optional[int], attempt: int
+    ) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if status_code == 429:
+            return True
+        # Anything else could have been acted on, so only replay safe methods
+        if request.method not in IDEMPOTENT_METHODS:
+            return False
+        return status_code is None or status_code in RETRY_STATUSES
+
+    def stats(self) -> "list[RateLimitStats]":
+        with self._lock:
+            hosts = dict(self.hosts)
+        return [limiter.stats(host) for host, limiter in hosts.items()]
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    def __init__(self, transport: httpx.BaseTransport, limiter: RateLimiter) -> None:
+        self.transport = transport
+        self.limiter = limiter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        host = self.limiter.for_host(request.url.host)
+        attempt = 0
+        while True:
+            wait = host.try_acquire()
+            while wait > 0:
+                host.record_wait(wait)
+                time.sleep(wait)
+                wait = host.try_acquire()
+
+            retry_after = None
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError:
+                host.release(None, None)
+                if not self.limiter.should_retry(request, None, attempt):
+                    raise
+            else:
+                retry_after = parse_retry_after(response.headers.get("retry-after"))
+                host.release(response.status_code, retry_after)
+                if not self.limiter.should_retry(
+                    request, response.status_code, attempt
+                ):
+                    return response
+                response.close()
+
+            host.record_retry()
+            time.sleep(self.limiter.backoff(attempt, retry_after))
+            attempt += 1
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    def __init__(
+        self, transport: httpx.AsyncBaseTransport, limiter: RateLimiter
+    ) -> None:
+        self.transport = transport
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = self.limiter.for_host(request.url.host)
+        attempt = 0
+        while True:
+            wait = host.try_acquire()
+            while wait > 0:
+                host.record_wait(wait)
+                await asyncio.sleep(wait)
+                wait = host.try_acquire()
+
+            retry_after = None
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError:
+                host.release(None, None)
+                if not self.limiter.should_retry(request, None, attempt):
+                    raise
+            else:
+                retry_after = parse_retry_after(response.headers.get("retry-after"))
+                host.release(response.status_code, retry_after)
+                if not self.limiter.should_retry(
+                    request, response.status_code, attempt
+                ):
+                    return response
+                await response.aclose()
+
+            host.record_retry()
+            await asyncio.sleep(self.limiter.backoff(attempt, retry_after))
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,124 @@
+# compact header + rows rendering of gamma records for llm prompts
+import json
+from typing import Optional
+
+
+class Column:
+    """
+    One column of a prompt table: `key` is read from each record, `kind` picks
+    the formatting. "text" is truncated to `width` characters, "number" is
+    rounded to `precision` places, "list" joins a list (or a JSON encoded list,
+    as Gamma returns outcomes and prices) with "/", "date" keeps YYYY-MM-DD
+    and "count" is the length of a list.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        key: str,
+        kind: str = "text",
+        width: Optional[int] = None,
+        precision: int = 2,
+    ) -> None:
+        self.name = name
+        self.key = key
+        self.kind = kind
+        self.width = width
+        self.precision = precision
+
+    def render(self, record: dict) -> str:
+        value = record.get(self.key)
+        if value is None or value == "":
+            return ""
+        if self.kind == "number":
+            return format_number(value, self.precision)
+        if self.kind == "list":
+            items = _as_list(value)
+            if self.precision is not None and all(_is_number(i) for i in items):
+                items = [format_number(i, self.precision) for i in items]
+            return "/".join(str(item) for item in items)
+        if self.kind == "date":
+            return str(value)[:10]
+        if self.kind == "count":
+            return str(len(_as_list(value)))
+        return truncate(str(value), self.width)
+
+
+def _as_list(value) -> list:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return [value]
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _is_number(value) -> bool:
+    try:
+        float(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def format_number(value, precision: int) -> str:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    text = f"{number:.{precision}f}"
+    # 0.350 -> 0.35 and 12.00 -> 12, the trailing zeros are tokens too
+    return text.rstrip("0").rstrip(".") if "." in text else text
+
+
+def truncate(text: str, width: Optional[int]) -> str:
+    text = " ".join(text.split())
+    if width is not None and len(text) > width:
+        return text[: width - 1].rstrip() + "…"
+    return text
+
+
+MARKET_COLUMNS = [
+    Column("id", "id"),
+    Column("question", "question"),
+    Column("outcomes", "outcomes", "list"),
+    Column("prices", "outcomePrices", "list", precision=3),
+    Column("volume", "volume", "number", precision=0),
+    Column("liquidity", "liquidity", "number", precision=0),
+    Column("end", "endDate", "date"),
+    Column("description", "description", width=200),
+]
+
+EVENT_COLUMNS = [
+    Column("id", "id"),
+    Column("title", "title"),
+    Column("markets", "markets", "count"),
+    Column("volume", "volume", "number", precision=0),
+    Column("liquidity", "liquidity", "number", precision=0),
+    Column("end", "endDate", "date"),
+    Column("description", "description", width=200),
+]
+
+
+def render_table(records, columns: "list[Column]") -> str:
+    """
+    A "|" separated header line then one line per record. Anything that is
+    not a list of dicts is rendered with str() as before.
+    """
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        return str(records)
+    lines = ["|".join(column.name for column in columns)]
+    lines.extend(render_row(record, columns) for record in records)
+    return "\n".join(lines)
+
+
+def render_row(record: dict, columns: "list[Column]") -> str:
+    return "|".join(column.render(record).replace("|", "/") for column in columns)
+
+
+def render_markets(markets) -> str:
+    return render_table(markets, MARKET_COLUMNS)
+
+
+def render_events(events) -> str:
+    return render_table(events, EVENT_COLUMNS)
@@ -0,0 +1,148 @@
+# exact prompt token counts and packing records into context sized requests
+import base64
+import hashlib
+import os
+from functools import lru_cache
+from typing import Optional
+
+# .tiktoken rank files shipped with the repo, so counting works offline
+ENCODINGS_DIR = os.path.join(os.path.dirname(__file__), "encodings")
+# sha256 tiktoken expects for openaipublic's cl100k_base.tiktoken
+CL100K_SHA256 = "223921b76ee99bde995b7ff738513eef100fb51d18c93597a113bcffe865b2a7"
+
+# Split pattern and special tokens of tiktoken's cl100k_base, which the
+# gpt-3.5 and gpt-4 models use
+CL100K_PATTERN = r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]++[\r\n]*|\s*[\r\n]|\s+(?!\S)|\s+"""
+CL100K_SPECIAL_TOKENS = {
+    "<|endoftext|>": 100257,
+    "<|fim_prefix|>": 100258,
+    "<|fim_middle|>": 100259,
+    "<|fim_suffix|>": 100260,
+    "<|endofprompt|>": 100276,
+}
+
+
+def encoding_name_for_model(model: str) -> str:
+    import tiktoken.model
+
+    try:
+        return tiktoken.model.encoding_name_for_model(model)
+    except KeyError:
+        return "cl100k_base"
+
+
+def read_ranks(path: str, sha256: Optional[str] = None) -> "dict[bytes, int]":
+    # Same format tiktoken.load.load_tiktoken_bpe reads; that needs blobfile for
+    # local paths, which is not a dependency
+    with open(path, "rb") as ranks_file:
+        data = ranks_file.read()
+    if sha256 is not None and hashlib.sha256(data).hexdigest() != sha256:
+        raise ValueError(f"{path} does not match sha256 {sha256}")
+    return {
+        base64.b64decode(token): int(rank)
+        for token, rank in (line.split() for line in data.splitlines() if line)
+    }
+
+
+@lru_cache(maxsize=None)
+def bundled_encoding(name: str, path: str, sha256: Optional[str] = None):
+    """
+    Encoding built from the rank file at `path`, parsed once per process:
+    the 1.6 MB cl100k_base file takes a few hundred ms to read and decode
+    """
+    import tiktoken
+
+    return tiktoken.Encoding(
+        name=name,
+        pat_str=CL100K_PATTERN,
+        mergeable_ranks=read_ranks(path, sha256),
+        special_tokens=CL100K_SPECIAL_TOKENS,
+    )
+
+
+def load_encoding(
+    name: str,
+    encodings_dir: str = ENCODINGS_DIR,
+    download: bool = True,
+    sha256: Optional[str] = None,
+):
+    """
+    The tiktoken Encoding called `name`: from the bundled rank file when there
+    is one, else, if `download`, whatever tiktoken can load (its cache or a
+    download). None if neither works.
+    """
+    import tiktoken
+
+    path = os.path.join(encodings_dir, name + ".tiktoken")
+    if name == "cl100k_base" and os.path.isfile(path):
+        return bundled_encoding(name, os.path.abspath(path), sha256)
+    if not download:
+        return None
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        print(f"Could not load the {name} encoding ({e}), estimating tokens")
+        return None
+
+
+class TokenCounter:
+    """
+    Token counts from the model's tokenizer, falling back to the 4 characters
+    per token estimate when no encoding can be loaded. Counts are memoized by
+    text, so a record that appears in many prompts is only encoded once.
+
+    `budget_fraction` is how much of a context window to fill on these
+    counts: nearly all of it when exact, half when estimating, since numbers
+    and ids run to more than twice the estimate.
+    """
+
+    def __init__(
+        self,
+        model: str = "gpt-3.5-turbo-16k",
+        encodings_dir: str = ENCODINGS_DIR,
+        cache_size: int = 65536,
+        download: bool = True,
+    ) -> None:
+        self.model = model
+        sha256 = CL100K_SHA256 if encodings_dir == ENCODINGS_DIR else None
+        self.encoding = load_encoding(
+            encoding_name_for_model(model), encodings_dir, download, sha256
+        )
+        self.exact = self.encoding is not None
+        # Records are counted one at a time, merges across their boundaries
+        # can move an exact total by a token or two
+        self.budget_fraction = 0.98 if self.exact else 0.5
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    def _count(self, text: str) -> int:
+        if self.encoding is None:
+            return len(text) // 4
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def count_record(self, record, render=str) -> int:
+        """
+        Tokens a record adds to a prompt that embeds it as render(record),
+        counting one for the separator before the next record
+        """
+        return self.count(render(record)) + 1
+
+
+def pack(sizes: "list[int]", budget: int) -> "list[list[int]]":
+    """
+    Greedy first-fit decreasing: indices of `sizes` grouped so each group sums
+    to at most `budget`, using few groups. Items larger than the budget get a
+    group of their own. Indices within a group keep their original order.
+    """
+    bins: "list[list[int]]" = []
+    remaining: "list[int]" = []
+    for index in sorted(range(len(sizes)), key=lambda i: -sizes[i]):
+        size = sizes[index]
+        for b, space in enumerate(remaining):
+            if size <= space:
+                bins[b].append(index)
+                remaining[b] -= size
+                break
+        else:
+            bins.append([index])
+            remaining.append(budget - size)
+    return [sorted(group) for group in bins]
@@ -0,0 +1,356 @@
+import copy
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import typer
+
+app = typer.Typer()
+
+
+@app.callback()
+def main() -> None:
+    """
+    Micro-benchmarks for the agent's hot paths
+    """
+
+
+def sample_market(i: int) -> dict:
+    # Shaped like a /markets record from the Gamma api
+    return {
+        "id": str(250000 + i),
+        "question": f"Will sample event {i} happen by the end of the year?",
+        "conditionId": f"0x{i:064x}",
+        "slug": f"will-sample-event-{i}-happen",
+        "resolutionSource": "",
+        "endDate": "2025-12-31T12:00:00Z",
+        "liquidity": str(1000.5 + i),
+        "startDate": "2024-07-01T12:00:00Z",
+        "image": f"https://polymarket-upload.s3.us-east-2.amazonaws.com/{i}.png",
+        "icon": f"https://polymarket-upload.s3.us-east-2.amazonaws.com/{i}.png",
+        "description": "This market will resolve to Yes if the event happens. " * 8,
+        "outcomes": '["Yes", "No"]',
+        "outcomePrices": '["0.35", "0.65"]',
+        "volume": str(50000.25 + i),
+        "active": True,
+        "closed": False,
+        "marketMakerAddress": "",
+        "createdAt": "2024-07-01T12:00:00.000000Z",
+        "updatedAt": "2024-07-15T17:12:48.601056Z",
+        "new": False,
+        "featured": False,
+        "submitted_by": "0x91430CaD2d3975766499717fA0D66A78D814E5c5",
+        "archived": False,
+        "resolvedBy": "0x6A9D222616C90FcA5754cd1333cFD9b7fb6a4F74",
+        "restricted": True,
+        "groupItemTitle": "",
+        "groupItemThreshold": 0,
+        "questionID": f"0x{i:064x}",
+        "enableOrderBook": True,
+        "orderPriceMinTickSize": 0.01,
+        "orderMinSize": 5,
+        "volumeNum": 50000.25 + i,
+        "liquidityNum": 1000.5 + i,
+        "volume24hr": 1200.0,
+        "clobTokenIds": f'["{i}1111111111", "{i}2222222222"]',
+        "acceptingOrders": True,
+        "negRisk": False,
+        "events": [
+            {
+                "id": str(11000 + i),
+                "ticker": f"sample-{i}",
+                "slug": f"sample-{i}",
+                "title": f"Sample event {i}",
+                "startDate": "2024-07-01T12:00:00Z",
+                "endDate": "2025-12-31T12:00:00Z",
+                "active": True,
+                "closed": False,
+                "archived": False,
+                "liquidity": 1000.5,
+                "volume": 50000.25,
+                "createdAt": "2024-07-01T12:00:00.000000Z",
+                "updatedAt": "2024-07-15T17:12:48.601056Z",
+                "tags": [
+                    {"id": "2", "label": "Politics", "slug": "politics"},
+                    {"id": "100", "label": "Elections", "slug": "elections"},
+                ],
+            }
+        ],
+        "clobRewards": [
+            {
+                "id": str(i),
+                "conditionId": f"0x{i:064x}",
+                "assetAddress": "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174",
+                "rewardsAmount": 0,
+                "rewardsDailyRate": 5,
+                "startDate": "2024-07-01",
+                "endDate": "2500-12-31",
+            }
+        ],
+        "rewardsMinSize": 100,
+        "rewardsMaxSpread": 3.5,
+        "spread": 0.01,
+    }
+
+
+def load_markets(markets_file: str, count: int) -> "list[dict]":
+    if markets_file:
+        with open(markets_file, "r") as open_file:
+            return json.load(open_file)
+    return [sample_market(i) for i in range(count)]
+
+
+def timed(label: str, fn, copies: "list[list[dict]]") -> float:
+    # Every run mutates its input, so each one gets a fresh copy built up front
+    start = time.perf_counter()
+    for markets in copies:
+        fn(markets)
+    seconds = (time.perf_counter() - start) / len(copies)
+    print(f"{label:<28} {seconds * 1000:9.2f} ms/page")
+    return seconds
+
+
+@app.command()
+def decode(count: int = 2000, runs: int = 5, markets_file: str = "") -> None:
+    """
+    Compare per-object market parsing with the bulk and trusted decoders
+    """
+    from agents.polymarket.gamma import GammaMarketClient
+
+    gamma = GammaMarketClient()
+    markets = load_markets(markets_file, count)
+    print(f"{len(markets)} markets, {runs} runs")
+
+    def per_object(page):
+        return [gamma.parse_pydantic_market(m) for m in page]
+
+    baseline = timed(
+        "parse_pydantic_market",
+        per_object,
+        [copy.deepcopy(markets) for _ in range(runs)],
+    )
+    bulk = timed(
+        "decode_markets",
+        gamma.decode_markets,
+        [copy.deepcopy(markets) for _ in range(runs)],
+    )
+    trusted = timed(
+        "decode_markets(trusted)",
+        lambda page: gamma.decode_markets(page, trusted=True),
+        [copy.deepcopy(markets) for _ in range(runs)],
+    )
+    print(f"bulk speedup    {baseline / bulk:5.1f}x")
+    print(f"trusted speedup {baseline / trusted:5.1f}x")
+
+
+@app.command()
+def prompt_size(count: int = 50, markets_file: str = "") -> None:
+    """
+    Tokens of the events + markets payload in prompts_polymarket, as dict
+    reprs and as the tables from agents.utils.tabular
+    """
+    from agents.utils.tabular import render_events, render_markets
+    from agents.utils.tokens import TokenCounter
+
+    counter = TokenCounter()
+    markets = load_markets(markets_file, count)
+    events = [
+        dict(market["events"][0], description=market["description"], markets=[market])
+        for market in markets
+        if market.get("events")
+    ]
+    print(f"{len(events)} events, {len(markets)} markets")
+    if not counter.exact:
+        print("no tokenizer available, counts are len(text) // 4 estimates")
+
+    reprs = counter.count(str(events)) + counter.count(str(markets))
+    tables = counter.count(render_events(events)) + counter.count(
+        render_markets(markets)
+    )
+    print(f"{'dict reprs':<16} {reprs:9d} tokens")
+    print(f"{'tables':<16} {tables:9d} tokens")
+    print(f"reduction {1 - tables / reprs:6.1%}")
+
+
+# Commands that finish against the stubbed network
+STARTUP_COMMANDS = [
+    ["--help"],
+    ["get-all-markets", "--limit", "1"],
+    ["get-current-markets", "--limit", "1"],
+]
+
+
+# Runs in the fresh interpreter: every http request is answered locally after
+# `latency` seconds, so the measured time includes the round trips a command
+# makes (api key derivation, rpc, gamma) without depending on the network
+STUB_NETWORK = """
+import json, os, runpy, sys, time
+
+import httpx
+import requests
+
+latency = float(os.environ["BENCH_LATENCY"])
+
+
+def reply(url, body):
+    time.sleep(latency)
+    if "auth" in url:
+        return {"apiKey": "key", "secret": "c2VjcmV0", "passphrase": "pass"}
+    if body and b"jsonrpc" in body:
+        return {"jsonrpc": "2.0", "id": json.loads(body).get("id"), "result": "0x0"}
+    return []
+
+
+def send(self, request, **kwargs):
+    return httpx.Response(
+        200, json=reply(str(request.url), request.content), request=request
+    )
+
+
+async def async_send(self, request, **kwargs):
+    return send(self, request)
+
+
+def requests_send(self, request, **kwargs):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(reply(request.url, request.body)).encode()
+    response.url = request.url
+    response.request = request
+    return response
+
+
+httpx.Client.send = send
+httpx.AsyncClient.send = async_send
+requests.Session.send = requests_send
+
+if sys.argv[1] == "polymarket":
+    start = time.perf_counter()
+    from agents.polymarket.polymarket import Polymarket
+
+    imported = time.perf_counter()
+    Polymarket()
+    print(json.dumps([imported - start, time.perf_counter() - imported]))
+else:
+    sys.argv = ["cli.py", *sys.argv[1:]]
+    runpy.run_path("scripts/python/cli.py", run_name="__main__")
+"""
+
+
+def stubbed_env(repo: str, latency: float) -> dict:
+    # A throwaway key so the clob client can sign its auth headers
+    from eth_account import Account
+
+    return dict(
+        os.environ,
+        PYTHONPATH=repo,
+        BENCH_LATENCY=str(latency),
+        POLYGON_WALLET_PRIVATE_KEY=Account.create().key.hex(),
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "sk-benchmark"),
+        NEWSAPI_API_KEY=os.environ.get("NEWSAPI_API_KEY", "benchmark"),
+    )
+
+
+def cold_start(repo: str, args: "list[str]", env: dict, timeout: float) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", STUB_NETWORK, *args],
+        cwd=repo,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        timeout=timeout,
+    )
+    return time.perf_counter() - start
+
+
+def construct_polymarket(repo: str, env: dict, timeout: float) -> "list[float]":
+    result = subprocess.run(
+        [sys.executable, "-c", STUB_NETWORK, "polymarket"],
+        cwd=repo,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@app.command()
+def startup(
+    repo: str = ".", runs: int = 5, latency: float = 0.1, timeout: float = 120.0
+) -> None:
+    """
+    Cold start of cli commands in a fresh interpreter, with every http request
+    stubbed to answer after `latency` seconds, plus the import and construction
+    time of Polymarket(). Point --repo at a worktree of an older revision to
+    compare before and after.
+    """
+    repo = os.path.abspath(repo)
+    env = stubbed_env(repo, latency)
+    print(f"{repo}, median of {runs} runs, {latency * 1000:.0f} ms per request")
+
+    imports, constructions = [], []
+    for _ in range(runs):
+        imported, constructed = construct_polymarket(repo, env, timeout)
+        imports.append(imported)
+        constructions.append(constructed)
+    print(f"{'import polymarket':<40} {statistics.median(imports) * 1000:9.1f} ms")
+    print(f"{'Polymarket()':<40} {statistics.median(constructions) * 1000:9.1f} ms")
+
+    for args in STARTUP_COMMANDS:
+        samples = []
+        for _ in range(runs):
+            try:
+                samples.append(cold_start(repo, args, env, timeout))
+            except subprocess.TimeoutExpired:
+                samples.append(timeout)
+        label = " ".join(args)
+        print(f"{label:<40} {statistics.median(samples) * 1000:9.1f} ms")
+
+
+@app.command()
+def sign(count: int = 200, processes: int = 4) -> None:
+    """
+    Signed orders per second: a fresh Signer per order, a reused
+    SigningContext, and SigningContext.sign_many over a process pool
+    """
+    from eth_account import Account
+    from py_order_utils.builders import OrderBuilder
+    from py_order_utils.signer import Signer
+
+    from agents.polymarket.signing import SigningContext
+
+    # A throwaway key, nothing is sent anywhere
+    private_key = Account.create().key.hex()
+    exchange_address = "0x4bfb41d5b3570defd03c39a9a4d8de6bd8b8982e"
+    context = SigningContext(private_key, exchange_address, 137)
+    orders = [
+        context.order_data(str(10**20 + i), 100, nonce=str(i)) for i in range(count)
+    ]
+
+    def report(label: str, seconds: float) -> None:
+        print(f"{label:<28} {count / seconds:9.1f} orders/s")
+
+    start = time.perf_counter()
+    for order in copy.deepcopy(orders):
+        signer = Signer(private_key)
+        OrderBuilder(exchange_address, 137, signer).build_signed_order(order)
+        Account.from_key(private_key)  # build_order re-derived the maker address
+    report("new signer per order", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    context.sign_many(copy.deepcopy(orders))
+    report("signing context", time.perf_counter() - start)
+
+    with context:
+        start = time.perf_counter()
+        context.sign_many(copy.deepcopy(orders), processes=processes)
+        report(f"sign_many({processes} processes)", time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    app()
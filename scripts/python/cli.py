@@ -1,17 +1,35 @@
+import itertools
+from functools import lru_cache
+from typing import Optional
+
 import typer
-from devtools import pprint
 
-from agents.polymarket.polymarket import Polymarket
-from agents.connectors.chroma import PolymarketRAG
-from agents.connectors.news import News
-from agents.application.trade import Trader
-from agents.application.executor import Executor
-from agents.application.creator import Creator
+# Each command imports what it needs, so --help and the read-only commands never
+# load langchain, chromadb, web3 or the clob client.
+# tests/test_import_time.py keeps an import budget per command.
 
 app = typer.Typer()
-polymarket = Polymarket()
-newsapi_client = News()
-polymarket_rag = PolymarketRAG()
+
+
+@lru_cache(maxsize=None)
+def polymarket():
+    from agents.polymarket.polymarket import Polymarket
+
+    return Polymarket()
+
+
+@lru_cache(maxsize=None)
+def newsapi_client():
+    from agents.connectors.news import News
+
+    return News()
+
+
+@lru_cache(maxsize=None)
+def polymarket_rag():
+    from agents.connectors.chroma import PolymarketRAG
+
+    return PolymarketRAG()
 
 
 @app.command()
@@ -19,18 +37,25 @@ def get_all_markets(limit: int = 5, sort_by: str = "spread") -> None:
     """
     Query Polymarket's current active markets
     """
+    from devtools import pprint
+
+    from agents.polymarket.market_table import SORT_COLUMNS, MarketTable
+
+    if sort_by != "created" and sort_by not in SORT_COLUMNS:
+        raise typer.BadParameter(
+            f"expected created or one of {', '.join(SORT_COLUMNS)}",
+            param_hint="--sort-by",
+        )
     print(f"limit: int = {limit}, sort_by: str = {sort_by}")
-    markets = polymarket.get_all_markets()  # Now returns current markets by default
-    markets = polymarket.filter_markets_for_trading(markets)
-    if sort_by == "spread":
-        markets = sorted(markets, key=lambda x: x.spread, reverse=True)
-    elif sort_by == "volume":
-        markets = sorted(markets, key=lambda x: x.volume, reverse=True)
-    elif sort_by == "created":
+    markets = polymarket().get_all_markets()  # Now returns current markets by default
+    table = MarketTable.from_markets(markets)
+    table = table.filter(table.tradeable_mask())
+    if sort_by == "created":
         # Markets are already sorted by creation date from the API
-        pass
-    markets = markets[:limit]
-    pprint(markets)
+        table = table.head(limit)
+    else:
+        table = table.top_k(sort_by, limit)
+    pprint(table.rows())
 
 
 @app.command()
@@ -38,7 +63,9 @@ def get_relevant_news(keywords: str) -> None:
     """
     Use NewsAPI to query the internet
     """
-    articles = newsapi_client.get_articles_for_cli_keywords(keywords)
+    from devtools import pprint
+
+    articles = newsapi_client().get_articles_for_cli_keywords(keywords)
     pprint(articles)
 
 
@@ -48,29 +75,54 @@ def get_current_markets(limit: int = 5) -> None:
     Get the most recently created active markets
     """
     from agents.polymarket.gamma import GammaMarketClient
+
     gamma = GammaMarketClient()
-    
+
     print(f"Fetching {limit} most recent active markets...")
-    markets = gamma.get_current_markets(limit=limit)
-    
+    markets = gamma.iter_current_markets(
+        fields=["question", "createdAt", "active", "volume"], limit=limit
+    )
+    markets = list(itertools.islice(markets, limit))
+
     print(f"\n🔥 {len(markets)} Current Active Markets:")
     for i, market in enumerate(markets):
         print(f"\n{i+1}. {market.get('question', 'No question')}")
         print(f"   Created: {market.get('createdAt', 'Unknown')[:10]}")
         print(f"   Active: {market.get('active', 'N/A')}")
-        volume = market.get('volume', 0)
+        volume = market.get("volume", 0)
         if volume:
             print(f"   Volume: ${float(volume):,.2f}")
 
 
+@app.command()
+def get_all_current_markets(limit: int = 100, concurrency: int = 8) -> None:
+    """
+    Page through every active market concurrently
+    """
+    from agents.polymarket.gamma import GammaMarketClient
+
+    gamma = GammaMarketClient()
+
+    markets = gamma.get_all_current_markets(limit=limit, concurrency=concurrency)
+    stats = gamma.last_pagination_stats
+    print(
+        f"Fetched {stats.markets} active markets in {stats.pages} pages "
+        f"({stats.seconds:.2f}s)"
+    )
+    for market in markets[:5]:
+        print(f"   {market.get('createdAt', 'Unknown')[:10]} {market.get('question')}")
+
+
 @app.command()
 def get_all_events(limit: int = 5, sort_by: str = "number_of_markets") -> None:
     """
     Query Polymarket's events
     """
+    from devtools import pprint
+
     print(f"limit: int = {limit}, sort_by: str = {sort_by}")
-    events = polymarket.get_all_events()
-    events = polymarket.filter_events_for_trading(events)
+    events = polymarket().get_all_events()
+    events = polymarket().filter_events_for_trading(events)
     if sort_by == "number_of_markets":
         events = sorted(events, key=lambda x: len(x.markets), reverse=True)
     events = events[:limit]
@@ -78,11 +130,24 @@ def get_all_events(limit: int = 5, sort_by: str = "number_of_markets") -> None:
 
 
 @app.command()
-def create_local_markets_rag(local_directory: str) -> None:
+def create_local_markets_rag(
+    local_directory: str, concurrency: int = 8, stream: bool = False
+) -> None:
     """
     Create a local markets database for RAG
     """
-    polymarket_rag.create_local_markets_rag(local_directory=local_directory)
+    polymarket_rag().create_local_markets_rag(
+        local_directory=local_directory, concurrency=concurrency, stream=stream
+    )
+
+
+@app.command()
+def create_market_index(concurrency: int = 8) -> None:
+    """
+    Embed every active market into the index ask-polymarket-llm retrieves from;
+    re-running only embeds new and changed markets
+    """
+    print(polymarket_rag().build_market_index(concurrency=concurrency))
 
 
 @app.command()
@@ -90,7 +155,9 @@ def query_local_markets_rag(vector_db_directory: str, query: str) -> None:
     """
     RAG over a local database of Polymarket's events
     """
-    response = polymarket_rag.query_local_markets_rag(
+    from devtools import pprint
+
+    response = polymarket_rag().query_local_markets_rag(
         local_directory=vector_db_directory, query=query
     )
     pprint(response)
@@ -101,6 +168,8 @@ def ask_superforecaster(event_title: str, market_question: str, outcome: str) ->
     """
     Ask a superforecaster about a trade
     """
+    from agents.application.executor import Executor
+
     print(
         f"event: str = {event_title}, question: str = {market_question}, outcome (usually yes or no): str = {outcome}"
     )
@@ -116,6 +185,8 @@ def create_market() -> None:
     """
     Format a request to create a market on Polymarket
     """
+    from agents.application.creator import Creator
+
     c = Creator()
     market_description = c.one_best_market()
     print(f"market_description: str = {market_description}")
@@ -126,18 +197,22 @@ def ask_llm(user_input: str) -> None:
     """
     Ask a question to the LLM and get a response.
     """
+    from agents.application.executor import Executor
+
     executor = Executor()
     response = executor.get_llm_response(user_input)
     print(f"LLM Response: {response}")
 
 
 @app.command()
-def ask_polymarket_llm(user_input: str) -> None:
+def ask_polymarket_llm(user_input: str, top_k: Optional[int] = None) -> None:
     """
-    What types of markets do you want trade?
+    What types of markets do you want trade? top_k defaults to RETRIEVAL_TOP_K
     """
+    from agents.application.executor import Executor
+
     executor = Executor()
-    response = executor.get_polymarket_llm(user_input=user_input)
+    response = executor.get_polymarket_llm(user_input=user_input, top_k=top_k)
     print(f"LLM + current markets&events response: {response}")
 
 
@@ -146,6 +221,8 @@ def run_autonomous_trader() -> None:
     """
     Let an autonomous system trade for you.
     """
+    from agents.application.trade import Trader
+
     trader = Trader()
     trader.one_best_trade()
 
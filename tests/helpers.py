@@ -0,0 +1,94 @@
+# Fakes and fixtures shared by several test modules
+import threading
+import time
+
+from py_clob_client.clob_types import OrderArgs
+
+from agents.application.executor import Executor
+from agents.application.prompts import Prompter
+from agents.utils.llm_cache import LLMCache
+from agents.utils.objects import PaginationStats
+from agents.utils.tokens import TokenCounter
+
+# Loading the shipped encoding takes a few hundred ms, do it once
+TOKEN_COUNTER = TokenCounter(download=False)
+
+
+def make_executor(llm=None, **attributes) -> Executor:
+    """
+    An Executor without __init__, which builds the OpenAI, Gamma and
+    Polymarket clients; `attributes` override the test defaults
+    """
+    executor = Executor.__new__(Executor)
+    executor.llm = llm
+    executor.llm_cache = LLMCache()
+    executor.prompter = Prompter()
+    executor.token_counter = TOKEN_COUNTER
+    executor.token_limit = 15000
+    executor.chunk_concurrency = 3
+    executor.retrieval_top_k = 20
+    executor.trade_concurrency = 3
+    executor.trade_timeout = 5.0
+    for name, value in attributes.items():
+        setattr(executor, name, value)
+    return executor
+
+
+class FakeGamma:
+    def __init__(self, markets):
+        self.markets = markets
+        self.delta = []
+        self.last_pagination_stats = None
+
+    def get_all_current_markets(self, limit=100, concurrency=8):
+        self.last_pagination_stats = PaginationStats(
+            pages=1, markets=len(self.markets), seconds=0.0, bytes=1000
+        )
+        return self.markets
+
+    def get_markets_updated_since(self, watermark, limit=100):
+        self.watermark_seen = watermark
+        self.last_pagination_stats = PaginationStats(
+            pages=1, markets=len(self.delta), seconds=0.0, bytes=10
+        )
+        return self.delta
+
+
+class FakeClob:
+    """
+    Signs instantly and acks each post after `latency`, recording how many
+    posts were outstanding at once
+    """
+
+    def __init__(self, latency: float = 0.05, reject: "set[str]" = ()):
+        self.latency = latency
+        self.reject = set(reject)
+        self.signed = []
+        self.posted = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def create_order(self, order_args):
+        if order_args.token_id in self.reject:
+            raise ValueError(f"cannot sign {order_args.token_id}")
+        self.signed.append(order_args.token_id)
+        return {"token_id": order_args.token_id, "kind": "limit"}
+
+    def create_market_order(self, order_args):
+        self.signed.append(order_args.token_id)
+        return {"token_id": order_args.token_id, "kind": "market"}
+
+    def post_order(self, order, orderType="GTC"):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+            self.posted.append((order["token_id"], orderType))
+        return {"success": True, "orderID": "0x" + order["token_id"], "errorMsg": ""}
+
+
+def limit_order(token_id: str, price: float = 0.5) -> OrderArgs:
+    return OrderArgs(token_id=token_id, price=price, size=10, side="BUY")
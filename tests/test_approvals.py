@@ -0,0 +1,181 @@
+import json
+import unittest
+
+import httpx
+import rlp
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_utils import keccak
+
+from agents.polymarket.account_state import CTF_ADDRESS, SPENDERS, USDC_ADDRESS
+from agents.polymarket.approvals import ApprovalSubmitter
+from agents.utils.http_clients import configure_clients
+
+
+class DevChain:
+    """
+    Just enough of a dev node for the approval flow: tracks allowances and
+    operator approvals, applies sent transactions and mines them on the next
+    receipt poll. Transactions behind a nonce gap wait in the pool, and sends
+    listed in `fail_sends` (by position over the whole run) are rejected.
+    """
+
+    def __init__(self, owner: str, fail_sends=()):
+        self.owner = owner
+        self.fail_sends = set(fail_sends)
+        self.send_count = 0
+        self.block = 10
+        self.nonce = 4
+        self.allowances = {SPENDERS[0].lower(): 2**256 - 1}
+        self.operators = {SPENDERS[0].lower()}
+        self.mempool = {}
+        self.receipts = {}
+        self.sent_nonces = []
+        self.batches = []
+
+    def eth_call(self, to: str, data: bytes) -> bytes:
+        selector, args = data[:4].hex(), data[4:]
+        if selector == "70a08231":
+            return encode(["uint256"], [0])
+        if selector == "dd62ed3e":
+            _, spender = decode(["address", "address"], args)
+            return encode(["uint256"], [self.allowances.get(spender.lower(), 0)])
+        if selector == "e985e9c5":
+            _, operator = decode(["address", "address"], args)
+            return encode(["bool"], [operator.lower() in self.operators])
+        raise ValueError(selector)
+
+    def send(self, raw: bytes) -> str:
+        nonce, _, _, to, _, data, *_ = rlp.decode(raw)
+        nonce = int.from_bytes(nonce, "big")
+        self.send_count += 1
+        if self.send_count in self.fail_sends:
+            raise ValueError("transaction underpriced")
+        self.sent_nonces.append(nonce)
+        tx_hash = "0x" + keccak(raw).hex()
+        # A transaction at a nonce already in the pool replaces it
+        self.mempool[nonce] = (tx_hash, to, data)
+        return tx_hash
+
+    def pending_nonce(self) -> int:
+        nonce = self.nonce
+        while nonce in self.mempool:
+            nonce += 1
+        return nonce
+
+    def mine(self):
+        self.block += 1
+        while self.nonce in self.mempool:
+            tx_hash, to, data = self.mempool.pop(self.nonce)
+            selector, args = data[:4].hex(), data[4:]
+            if selector == "095ea7b3":
+                spender, amount = decode(["address", "uint256"], args)
+                self.allowances[spender.lower()] = amount
+            else:
+                operator, approved = decode(["address", "bool"], args)
+                self.operators.add(operator.lower())
+            self.receipts[tx_hash] = {"status": "0x1", "blockNumber": hex(self.block)}
+            self.nonce += 1
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        batch = json.loads(request.content)
+        methods = [entry["method"] for entry in batch]
+        self.batches.append(methods)
+        if methods[0] == "eth_getTransactionReceipt" and self.nonce in self.mempool:
+            # Receipts show up from the poll after broadcast
+            replies = [{"result": None} for _ in batch]
+            self.mine()
+        else:
+            replies = []
+            for entry in batch:
+                try:
+                    replies.append({"result": self.reply(entry)})
+                except ValueError as e:
+                    replies.append({"error": {"code": -32000, "message": str(e)}})
+        return httpx.Response(
+            200,
+            json=[
+                dict(reply, jsonrpc="2.0", id=entry["id"])
+                for entry, reply in zip(batch, replies)
+            ],
+        )
+
+    def reply(self, entry: dict):
+        method, params = entry["method"], entry["params"]
+        if method == "eth_blockNumber":
+            return hex(self.block)
+        if method == "eth_call":
+            data = bytes.fromhex(params[0]["data"][2:])
+            return "0x" + self.eth_call(params[0]["to"], data).hex()
+        if method == "eth_getTransactionCount":
+            return hex(self.pending_nonce())
+        if method == "eth_gasPrice":
+            return hex(30 * 10**9)
+        if method == "eth_estimateGas":
+            return hex(50_000)
+        if method == "eth_sendRawTransaction":
+            return self.send(bytes.fromhex(params[0][2:]))
+        if method == "eth_getTransactionReceipt":
+            return self.receipts.get(params[0])
+        raise ValueError(method)
+
+
+class TestApprovalSubmitter(unittest.TestCase):
+    def setUp(self):
+        self.account = Account.create()
+        self.chain = DevChain(self.account.address)
+        configure_clients(transport=httpx.MockTransport(self.chain.handler))
+        self.submitter = ApprovalSubmitter(
+            self.account.key.hex(), rpc_url="http://node.test", poll_interval=0
+        )
+
+    def tearDown(self):
+        configure_clients()
+
+    def test_pipelines_missing_approvals(self):
+        results = self.submitter.submit()
+
+        # The first exchange is already approved on both contracts
+        self.assertEqual(
+            [(r.contract, r.spender) for r in results],
+            [
+                (USDC_ADDRESS, SPENDERS[1]),
+                (CTF_ADDRESS, SPENDERS[1]),
+                (USDC_ADDRESS, SPENDERS[2]),
+                (CTF_ADDRESS, SPENDERS[2]),
+            ],
+        )
+        self.assertEqual(self.chain.sent_nonces, [4, 5, 6, 7])
+        self.assertTrue(all(r.status == 1 and r.latency is not None for r in results))
+        self.assertEqual(len({r.block_number for r in results}), 1)
+        # state with its block number, nonce and gas, one broadcast, two
+        # receipt polls
+        self.assertEqual(len(self.chain.batches), 5)
+        self.assertEqual(self.chain.batches[2], ["eth_sendRawTransaction"] * 4)
+
+        self.assertEqual(self.submitter.submit(), [])
+
+    def test_failed_send_resyncs_the_nonce(self):
+        # The second of four sends is rejected once; the two after it are
+        # stuck behind the gap until they are re-signed from nonce 5
+        self.chain.fail_sends = {2}
+        results = self.submitter.submit()
+
+        self.assertEqual(self.chain.sent_nonces, [4, 6, 7, 5, 6, 7])
+        self.assertEqual([r.nonce for r in results], [4, 5, 6, 7])
+        self.assertTrue(all(r.status == 1 and r.error is None for r in results))
+        self.assertEqual(self.chain.nonce, 8)
+
+    def test_send_failing_twice_is_given_up(self):
+        self.chain.fail_sends = {2, 5}
+        results = self.submitter.submit()
+
+        self.assertIsNotNone(results[1].error)
+        self.assertIsNone(results[1].tx_hash)
+        self.assertEqual([r.nonce for r in results if r.status == 1], [4, 5, 6])
+        # The earlier copy of the last approval, left at nonce 7, is mined too
+        self.assertEqual(self.chain.nonce, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+
+from agents.polymarket.book_analytics import BookDepth, estimate_fills
+
+ASKS = [
+    {"price": "0.52", "size": "100"},
+    {"price": "0.50", "size": "100"},
+    {"price": "0.60", "size": "1000"},
+]
+
+
+class TestBookDepth(unittest.TestCase):
+    def test_vwap_and_slippage(self):
+        depth = BookDepth.from_levels(ASKS)
+
+        self.assertEqual(depth.best, 0.50)
+        self.assertAlmostEqual(depth.vwap(50), 0.50)
+        # 100 shares at 0.50, then 50 USDC buys 96.15 shares at 0.52
+        self.assertAlmostEqual(depth.vwap(102), 102 / (100 + 52 / 0.52))
+        self.assertAlmostEqual(depth.slippage(102), depth.vwap(102) / 0.50 - 1)
+        self.assertEqual(depth.fill(10_000), (1200.0, 702.0))
+
+    def test_max_notional_within_cap(self):
+        depth = BookDepth.from_levels(ASKS)
+
+        self.assertAlmostEqual(depth.max_notional(0.0), 50.0)
+        capacity = depth.max_notional(0.03)
+        self.assertAlmostEqual(depth.slippage(capacity), 0.03)
+        self.assertEqual(depth.max_notional(1.0), 702.0)
+
+    def test_sell_side_walks_bids(self):
+        bids = [(0.45, 100), (0.48, 100)]
+        depth = BookDepth.from_levels(bids, side="SELL")
+
+        self.assertEqual(depth.best, 0.48)
+        self.assertAlmostEqual(depth.vwap(93), 93 / (100 + 45 / 0.45))
+        self.assertAlmostEqual(depth.slippage(depth.max_notional(0.02)), 0.02)
+
+    def test_estimate_fills_matches_single_books(self):
+        depths = [
+            BookDepth.from_levels(ASKS),
+            BookDepth.from_levels([(0.30, 10)]),
+            BookDepth.from_levels([]),
+            BookDepth.from_levels([(0.70, 500), (0.71, 500)]),
+        ]
+        vwap, slippage = estimate_fills(depths, 102)
+
+        self.assertAlmostEqual(vwap[0], depths[0].vwap(102))
+        self.assertTrue(np.isnan(vwap[1]) and np.isnan(vwap[2]))
+        self.assertAlmostEqual(vwap[3], 0.70)
+        self.assertAlmostEqual(slippage[0], depths[0].slippage(102))
+
+
+if __name__ == "__main__":
+    unittest.main()
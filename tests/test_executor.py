@@ -0,0 +1,193 @@
+import re
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+
+from tests.helpers import make_executor
+
+
+class SlowLLM:
+    model_name = "fake-model"
+    temperature = 0
+
+    def __init__(self, latency: float = 0.05, fail_on: str = None):
+        self.latency = latency
+        self.fail_on = fail_on
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, messages):
+        system = messages[0].content
+        with self._lock:
+            self.calls.append(system)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if self.fail_on and self.fail_on in system:
+                raise RuntimeError("rate limited")
+            marker = re.search(r"market-(\d+)", system).group(1)
+            return SimpleNamespace(content=f"answer {marker}")
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def make_chunks(count: int) -> "list[tuple]":
+    return [([{"id": f"event-{i}"}], [{"id": f"market-{i}"}]) for i in range(count)]
+
+
+class TestProcessDataChunks(unittest.TestCase):
+    def test_runs_chunks_concurrently_in_order(self):
+        llm = SlowLLM(latency=0.05)
+        executor = make_executor(llm)
+
+        started = time.perf_counter()
+        results = executor.process_data_chunks(make_chunks(6), "which market?")
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(
+            [r.content for r in results], [f"answer {i}" for i in range(6)]
+        )
+        self.assertEqual([r.index for r in results], list(range(6)))
+        self.assertEqual(llm.max_in_flight, 3)
+        self.assertLess(elapsed, 6 * 0.05)
+        self.assertTrue(all(r.tokens > 0 and r.seconds >= 0.05 for r in results))
+
+    def test_failure_cancels_queued_chunks(self):
+        llm = SlowLLM(latency=0.05, fail_on="market-0")
+        executor = make_executor(llm)
+
+        with self.assertRaises(RuntimeError):
+            executor.process_data_chunks(
+                make_chunks(10), "which market?", max_workers=2
+            )
+        time.sleep(0.2)
+        # The first pair ran, maybe one more started; the rest never did
+        self.assertLess(len(llm.calls), 10)
+
+
+class TradeLLM:
+    # Superforecasts "prediction <question>", then trades at TRADES[question]
+    model_name = "fake-model"
+    temperature = 0
+
+    def __init__(self, trades: dict, latency: float = 0.05, hang_on: str = None):
+        self.trades = trades
+        self.latency = latency
+        self.hang_on = hang_on
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            question = re.search(r"(?:question=`|prediction )(market-\d+)", prompt)
+            question = question.group(1)
+            self.calls.append((question, "genius trade" in prompt))
+            time.sleep(1.0 if question == self.hang_on else self.latency)
+            if "genius trade" not in prompt:
+                return SimpleNamespace(content=f"prediction {question}")
+            return SimpleNamespace(content=self.trades[question])
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def make_market(i: int, yes_price: float) -> tuple:
+    metadata = {
+        "question": f"market-{i}",
+        "outcomes": "['Yes', 'No']",
+        "outcome_prices": f"[{yes_price}, {1 - yes_price:.2f}]",
+    }
+    return (Document(page_content=f"market-{i}", metadata=metadata), 0.1)
+
+
+class TestEvaluateMarkets(unittest.TestCase):
+    def setUp(self):
+        # market-1's No token, the one market orders buy, trades at 0.7
+        self.markets = [make_market(i, 0.3 if i == 1 else 0.5) for i in range(5)]
+        self.trades = {
+            "market-0": "price:0.55,\nsize:0.1,\nside:BUY,",
+            "market-1": "```outcome:'No', price:0.8, size:0.2, side:BUY```",
+            "market-2": "price:'0.3', size:'0.1', side: SELL",
+            "market-3": "I would not trade this market",
+            "market-4": "price:0.65,\nsize:0.1,\nside:buy,",
+        }
+
+    def test_ranks_parsed_trades_by_edge(self):
+        llm = TradeLLM(self.trades)
+        executor = make_executor(llm)
+
+        started = time.perf_counter()
+        candidates = executor.evaluate_markets(self.markets, max_workers=5)
+        elapsed = time.perf_counter() - started
+
+        # Edges against the bought token's price; the SELL is not executable
+        self.assertEqual([c.index for c in candidates], [4, 1, 0])
+        self.assertEqual([round(c.edge, 6) for c in candidates], [0.15, 0.1, 0.05])
+        self.assertEqual(candidates[1].market_price, 0.7)
+        self.assertEqual(
+            (candidates[1].price, candidates[1].size, candidates[1].side),
+            (0.8, 0.2, "BUY"),
+        )
+        # Two chained calls per market, all markets at once
+        self.assertEqual(llm.max_in_flight, 5)
+        self.assertLess(elapsed, 5 * 2 * 0.05)
+
+    def test_caps_concurrency_and_skips_slow_markets(self):
+        llm = TradeLLM(self.trades, hang_on="market-4")
+        executor = make_executor(llm)
+
+        candidates = executor.evaluate_markets(self.markets, max_workers=2, timeout=0.4)
+
+        self.assertEqual([c.index for c in candidates], [1, 0])
+        self.assertEqual(llm.max_in_flight, 2)
+
+    def test_timed_out_markets_stop_before_the_trade_prompt(self):
+        llm = TradeLLM(self.trades, hang_on="market-4")
+        executor = make_executor(llm)
+
+        started = time.perf_counter()
+        executor.evaluate_markets(self.markets[3:], max_workers=2, timeout=0.3)
+        # Returns on the timeout, not on a polling tick or the hung call
+        self.assertLess(time.perf_counter() - started, 0.6)
+
+        time.sleep(1.0)
+        self.assertIn(("market-4", False), llm.calls)
+        self.assertNotIn(("market-4", True), llm.calls)
+
+    def test_skips_trades_priced_on_another_outcome(self):
+        self.trades["market-4"] = "outcome: Yes,\nprice:0.65,\nsize:0.1,\nside:BUY,"
+        llm = TradeLLM(self.trades)
+        prompts = []
+        invoke = llm.invoke
+        llm.invoke = lambda prompt: prompts.append(prompt) or invoke(prompt)
+        executor = make_executor(llm)
+
+        candidates = executor.evaluate_markets(self.markets, max_workers=5)
+
+        self.assertEqual([c.index for c in candidates], [1, 0])
+        trade_prompts = [p for p in prompts if "genius trade" in p]
+        self.assertTrue(all("only trade the `No` outcome" in p for p in trade_prompts))
+
+    def test_parse_trade(self):
+        executor = make_executor(None)
+        self.assertEqual(
+            executor.parse_trade("price:0.5,\n size:0.1,\n side:BUY,"),
+            (0.5, 0.1, "BUY"),
+        )
+        self.assertIsNone(executor.parse_trade("no trade"))
+
+
+if __name__ == "__main__":
+    unittest.main()
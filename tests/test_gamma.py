@@ -0,0 +1,161 @@
+"""
+% python -m unittest tests/test_gamma.py
+"""
+
+import unittest
+
+import httpx
+
+from agents.polymarket.gamma import GammaMarketClient
+from agents.utils.http_clients import (
+    close_clients,
+    configure_clients,
+    get_async_client,
+    run_sync,
+)
+
+
+def fake_markets(total: int):
+    return [{"id": str(i), "createdAt": f"2024-07-{i:05d}"} for i in range(total)]
+
+
+def gamma_handler(markets: "list[dict]"):
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", 100))
+        return httpx.Response(200, json=markets[offset : offset + limit])
+
+    return handler
+
+
+class TestGammaPagination(unittest.TestCase):
+    def tearDown(self):
+        configure_clients()
+
+    def use_markets(self, markets):
+        handler = gamma_handler(markets)
+        configure_clients(
+            transport=httpx.MockTransport(handler),
+            async_transport=httpx.MockTransport(handler),
+        )
+
+    def test_all_current_markets_keeps_order(self):
+        markets = fake_markets(537)
+        self.use_markets(markets)
+        gamma = GammaMarketClient()
+
+        result = gamma.get_all_current_markets(limit=50, concurrency=4)
+
+        self.assertEqual([m["id"] for m in result], [m["id"] for m in markets])
+        self.assertEqual(gamma.last_pagination_stats.markets, 537)
+        self.assertGreaterEqual(gamma.last_pagination_stats.pages, 11)
+
+    def test_exact_multiple_of_page_size(self):
+        self.use_markets(fake_markets(200))
+        gamma = GammaMarketClient()
+
+        result = gamma.get_all_current_markets(limit=50, concurrency=3)
+
+        self.assertEqual(len(result), 200)
+
+    def test_sync_calls_share_one_async_client_until_closed(self):
+        self.use_markets(fake_markets(10))
+        gamma = GammaMarketClient()
+
+        async def current_client():
+            return get_async_client()
+
+        gamma.get_all_current_markets()
+        first = run_sync(current_client())
+        gamma.get_all_current_markets()
+        self.assertIs(run_sync(current_client()), first)
+
+        close_clients()
+        self.assertTrue(first.is_closed)
+
+    def test_iter_markets_projects_fields(self):
+        markets = fake_markets(120)
+        for market in markets:
+            market["events"] = [{"id": "1", "description": "x" * 100}]
+        self.use_markets(markets)
+        gamma = GammaMarketClient()
+
+        result = list(gamma.iter_current_markets(fields=["id"], limit=50))
+
+        self.assertEqual(result, [{"id": m["id"]} for m in markets])
+
+
+class TestGammaBulkLookup(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+        markets = {
+            str(i): {"id": str(i), "clobTokenIds": f'["{i}1", "{i}2"]'}
+            for i in range(120)
+        }
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            params = request.url.params
+            if "id" in params:
+                found = [markets[i] for i in params.get_list("id") if i in markets]
+            else:
+                token_ids = params.get_list("clob_token_ids")
+                found = [m for i, m in markets.items() if f"{i}2" in token_ids]
+            return httpx.Response(200, json=found)
+
+        configure_clients(async_transport=httpx.MockTransport(handler))
+
+    def tearDown(self):
+        configure_clients()
+
+    def test_market_ids_in_input_order_with_misses(self):
+        gamma = GammaMarketClient()
+        ids = ["7", "999", "3"] + [str(i) for i in range(100, 120)]
+
+        result = gamma.get_markets_by_ids(ids, batch_size=10)
+
+        self.assertEqual(result[0]["id"], "7")
+        self.assertIsNone(result[1])
+        self.assertEqual([m["id"] for m in result[2:]], ids[2:])
+        self.assertEqual(len(self.requests), 3)
+
+    def test_token_ids(self):
+        gamma = GammaMarketClient()
+
+        result = gamma.get_markets_by_token_ids(["52", "12", "13"])
+
+        self.assertEqual([m and m["id"] for m in result], ["5", "1", None])
+        self.assertEqual(len(self.requests), 1)
+
+
+class TestGammaDecode(unittest.TestCase):
+    def market(self):
+        return {
+            "id": "1",
+            "outcomePrices": '["0.4", "0.6"]',
+            "clobTokenIds": '["11", "12"]',
+            "events": [{"id": "5", "tags": [{"id": "3", "label": "Politics"}]}],
+        }
+
+    def test_validated_page_drops_bad_markets(self):
+        gamma = GammaMarketClient()
+
+        markets = gamma.decode_markets([self.market(), {"id": "not-a-number"}])
+
+        self.assertEqual(len(markets), 1)
+        self.assertEqual(markets[0].id, 1)
+        self.assertEqual(markets[0].outcomePrices, ["0.4", "0.6"])
+
+    def test_trusted_decode_builds_nested_models(self):
+        gamma = GammaMarketClient()
+
+        market = gamma.decode_markets([self.market()], trusted=True)[0]
+
+        self.assertEqual(market.clobTokenIds, ["11", "12"])
+        self.assertEqual(market.events[0].tags[0].label, "Politics")
+        self.assertIsNone(market.question)
+
+
+if __name__ == "__main__":
+    unittest.main()
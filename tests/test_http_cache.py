@@ -0,0 +1,82 @@
+import atexit
+import os
+import tempfile
+import unittest
+
+import httpx
+
+from agents.utils.http_cache import HttpCache
+
+
+class TestHttpCache(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(
+                200, json={"path": request.url.path}, headers={"ETag": '"v1"'}
+            )
+
+        self.client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    def test_hit_then_revalidate(self):
+        cache = HttpCache(ttls={"/markets": 60.0})
+        url = "https://gamma.test/markets/1"
+
+        cache.get(url, client=self.client)
+        self.assertEqual(
+            cache.get(url, client=self.client).json()["path"], "/markets/1"
+        )
+        self.assertEqual(len(self.requests), 1)
+
+        cache.entries[cache.key(url)].stored_at -= 120
+        response = cache.get(url, client=self.client)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.requests[-1].headers["if-none-match"], '"v1"')
+        stats = cache.stats()
+        self.assertEqual((stats.hits, stats.misses, stats.revalidated), (1, 1, 1))
+
+    def test_fresh_bypasses_cache(self):
+        cache = HttpCache()
+        url = "https://gamma.test/markets"
+
+        cache.get(url, params={"limit": 2}, client=self.client)
+        cache.get(url, params={"limit": 2}, fresh=True, client=self.client)
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertNotIn("if-none-match", self.requests[-1].headers)
+
+    def test_evicts_least_recently_used_by_bytes(self):
+        cache = HttpCache(max_bytes=60)
+        for market_id in range(3):
+            cache.get(f"https://gamma.test/markets/{market_id}", client=self.client)
+
+        self.assertLessEqual(cache.total_bytes, 60)
+        self.assertNotIn("https://gamma.test/markets/0", cache.entries)
+        self.assertGreater(cache.stats().evictions, 0)
+
+    def test_load_evicts_down_to_max_bytes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.json")
+            written = HttpCache(persist_path=path)
+            atexit.unregister(written.save)
+            for market_id in range(3):
+                url = f"https://gamma.test/markets/{market_id}"
+                written.get(url, client=self.client)
+            written.save()
+
+            # Written under the default 64 MB, read back under 60 bytes
+            loaded = HttpCache(max_bytes=60, persist_path=path)
+            atexit.unregister(loaded.save)
+
+        self.assertLessEqual(loaded.total_bytes, 60)
+        self.assertNotIn("https://gamma.test/markets/0", loaded.entries)
+        self.assertIn("https://gamma.test/markets/2", loaded.entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
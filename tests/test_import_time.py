@@ -0,0 +1,128 @@
+import ast
+import os
+import subprocess
+import sys
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI_PATH = os.path.join(REPO, "scripts", "python", "cli.py")
+
+HEAVY = ["langchain", "chromadb", "openai", "web3", "eth_account", "py_clob_client"]
+
+# Prefixes of top level packages each command must not load, and its import
+# time as a multiple of `--help`'s. A ratio rather than seconds, so a slow or
+# busy runner scales both sides; the package lists are the main check.
+BUDGETS = {
+    "--help": (None, HEAVY + ["newsapi", "agents"]),
+    "get-current-markets": (8.0, HEAVY + ["newsapi"]),
+    "get-all-current-markets": (8.0, HEAVY + ["newsapi"]),
+    "get-all-markets": (10.0, HEAVY + ["newsapi"]),
+    "get-all-events": (10.0, HEAVY + ["newsapi"]),
+    "get-relevant-news": (8.0, HEAVY),
+    "create-local-markets-rag": (15.0, ["web3", "py_clob_client"]),
+    "create-market-index": (15.0, ["web3", "py_clob_client"]),
+    "query-local-markets-rag": (15.0, ["web3", "py_clob_client"]),
+    "ask-superforecaster": (15.0, ["chromadb", "web3", "py_clob_client"]),
+    "ask-llm": (15.0, ["chromadb", "web3", "py_clob_client"]),
+    "ask-polymarket-llm": (15.0, ["chromadb", "web3", "py_clob_client"]),
+    "create-market": (15.0, ["chromadb", "web3", "py_clob_client"]),
+    "run-autonomous-trader": (15.0, ["chromadb", "web3", "py_clob_client"]),
+}
+
+
+def command_imports(command: str) -> "list[str]":
+    """
+    The import statements a command runs: those in its body plus those in the
+    cli helpers it calls.
+    """
+    with open(CLI_PATH, "r") as open_file:
+        tree = ast.parse(open_file.read())
+    functions = {
+        node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)
+    }
+    if command == "--help":
+        return []
+
+    statements = []
+    pending = [command.replace("-", "_")]
+    seen = set()
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        for node in ast.walk(functions[name]):
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                statements.append(ast.unparse(node))
+            elif (
+                isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Name)
+                and node.func.id in functions
+            ):
+                pending.append(node.func.id)
+    return statements
+
+
+def import_profile(statements: "list[str]") -> "tuple[float, set]":
+    code = "\n".join(
+        [
+            "import sys",
+            f"sys.path.insert(0, {os.path.dirname(CLI_PATH)!r})",
+            "import cli",
+        ]
+        + statements
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO,
+        env=dict(os.environ, PYTHONPATH=REPO),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise AssertionError(result.stderr[-2000:])
+
+    seconds = 0.0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        if not name.startswith("  "):
+            seconds += int(cumulative) / 1e6
+        modules.add(name.strip().split(".")[0])
+    return seconds, modules
+
+
+class TestImportTime(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.profiles = {}
+        by_statements = {}
+        for command in BUDGETS:
+            statements = tuple(command_imports(command))
+            if statements not in by_statements:
+                by_statements[statements] = import_profile(list(statements))
+            cls.profiles[command] = by_statements[statements]
+
+    def test_commands_do_not_load_heavy_packages(self):
+        for command, (_, forbidden) in BUDGETS.items():
+            with self.subTest(command=command):
+                _, modules = self.profiles[command]
+                loaded = [m for m in modules if m.startswith(tuple(forbidden))]
+                self.assertEqual(sorted(loaded), [])
+
+    def test_import_time_relative_to_help(self):
+        help_seconds, _ = self.profiles["--help"]
+        for command, (ratio, _) in BUDGETS.items():
+            if ratio is None:
+                continue
+            with self.subTest(command=command):
+                seconds, _ = self.profiles[command]
+                self.assertLess(seconds, ratio * help_seconds)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from agents.utils.llm_cache import LLMCache
+
+from tests.helpers import make_executor
+
+
+class FakeLLM:
+    model_name = "fake-model"
+    temperature = 0
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return SimpleNamespace(content=f"answer {self.calls}")
+
+
+class TestLLMCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "llm_cache.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_normalizes_whitespace_and_message_types(self):
+        cache = LLMCache()
+        messages = [SystemMessage(content="You are\n  an analyst"), HumanMessage("hi")]
+        same = [("system", "You are \n  an analyst\n\n"), ("human", "hi")]
+        self.assertEqual(cache.key("m", 0, messages), cache.key("m", 0, same))
+        self.assertNotEqual(cache.key("m", 0, messages), cache.key("m", 0.7, same))
+        self.assertNotEqual(cache.key("m", 0, messages), cache.key("n", 0, same))
+        self.assertEqual(
+            cache.key("m", 0, "prompt"), cache.key("m", 0, [("human", "prompt")])
+        )
+
+    def test_key_keeps_line_structure(self):
+        cache = LLMCache()
+        rows = "id | question\n1 | a\n2 | b"
+        self.assertNotEqual(
+            cache.key("m", 0, rows), cache.key("m", 0, "id | question 1 | a\n2 | b")
+        )
+        self.assertNotEqual(cache.key("m", 0, "a\nb"), cache.key("m", 0, "a\n  b"))
+        self.assertEqual(
+            cache.key("m", 0, "a\n\n\n\nb  \n"), cache.key("m", 0, "a\n\nb")
+        )
+
+    def test_persists_across_restarts(self):
+        cache = LLMCache(self.path)
+        cache.set("k", "m", "response")
+        cache.close()
+
+        reopened = LLMCache(self.path)
+        self.assertEqual(reopened.get("k"), "response")
+        self.assertEqual(reopened.stats().hits, 1)
+
+    def test_expired_entries_miss(self):
+        cache = LLMCache(ttl=0.0)
+        cache.set("k", "m", "response")
+        self.assertIsNone(cache.get("k"))
+        stats = cache.stats()
+        self.assertEqual((stats.expired, stats.misses, stats.entries), (1, 1, 0))
+
+    def test_evicts_least_recently_used(self):
+        cache = LLMCache(max_bytes=2)
+        cache.set("a", "m", "1")
+        cache.set("b", "m", "2")
+        cache.get("a")
+        cache.set("c", "m", "3")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+        self.assertEqual(cache.get("c"), "3")
+        stats = cache.stats()
+        self.assertEqual((stats.evictions, stats.entries, stats.bytes), (1, 2, 2))
+        self.assertAlmostEqual(stats.hit_rate, 3 / 4)
+
+    def test_bound_is_on_response_bytes(self):
+        cache = LLMCache(max_bytes=100)
+        for key in "abcde":
+            cache.set(key, "m", "x" * 10)
+        # One large response pushes out as many small ones as it needs
+        cache.set("big", "m", "y" * 80)
+        self.assertEqual(cache.stats().bytes, 100)
+        self.assertEqual(cache.stats().evictions, 3)
+        self.assertEqual(cache.get("d"), "x" * 10)
+        self.assertIsNone(cache.get("c"))
+        # Larger than the whole cache, never stored
+        cache.set("huge", "m", "z" * 101)
+        self.assertIsNone(cache.get("huge"))
+
+    def test_sizes_entries_of_caches_written_before_the_byte_bound(self):
+        db = sqlite3.connect(self.path)
+        db.execute(
+            "CREATE TABLE responses (key TEXT PRIMARY KEY, model TEXT, "
+            "response TEXT, created_at REAL, accessed_at REAL)"
+        )
+        db.execute("INSERT INTO responses VALUES ('k', 'm', 'résumé', 0, 0)")
+        db.commit()
+        db.close()
+
+        cache = LLMCache(self.path, ttl=float("inf"))
+        self.assertEqual(cache.get("k"), "résumé")
+        self.assertEqual(cache.stats().bytes, 8)
+
+
+class TestExecutorInvoke(unittest.TestCase):
+    def setUp(self):
+        self.executor = make_executor(FakeLLM())
+
+    def test_repeated_prompts_are_served_from_cache(self):
+        self.assertEqual(self.executor._invoke("forecast this"), "answer 1")
+        self.assertEqual(self.executor._invoke("forecast this  \n"), "answer 1")
+        self.assertEqual(self.executor.llm.calls, 1)
+
+    def test_use_cache_false_always_calls_the_llm(self):
+        self.executor._invoke("forecast this")
+        self.assertEqual(
+            self.executor._invoke("forecast this", use_cache=False), "answer 2"
+        )
+        self.assertEqual(self.executor.llm.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import json
+import unittest
+
+import httpx
+
+from agents.polymarket.market_data import ClobMarketData
+from agents.utils.http_clients import configure_clients
+
+
+def clob_handler(requests: list):
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        token_ids = [entry["token_id"] for entry in body]
+        requests.append((request.url.path, token_ids))
+        if "bad" in token_ids:
+            return httpx.Response(400, json={"error": "Invalid token id"})
+        if request.url.path == "/books":
+            return httpx.Response(
+                200,
+                json=[
+                    {
+                        "market": "0xabc",
+                        "asset_id": token_id,
+                        "bids": [
+                            {"price": "0.40", "size": "5"},
+                            {"price": "0.45", "size": "10"},
+                        ],
+                        "asks": [
+                            {"price": "0.60", "size": "5"},
+                            {"price": "0.55", "size": "10"},
+                        ],
+                        "hash": "h",
+                    }
+                    for token_id in token_ids
+                ],
+            )
+        if request.url.path == "/prices":
+            return httpx.Response(
+                200,
+                json={
+                    token_id: {"BUY": "0.45", "SELL": "0.55"} for token_id in token_ids
+                },
+            )
+        if request.url.path == "/midpoints":
+            return httpx.Response(200, json={token_id: "0.5" for token_id in token_ids})
+        return httpx.Response(
+            200,
+            json=[
+                {"token_id": token_id, "price": "0.52", "side": "BUY"}
+                for token_id in token_ids
+            ],
+        )
+
+    return handler
+
+
+class TestClobMarketData(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+        handler = clob_handler(self.requests)
+        configure_clients(
+            transport=httpx.MockTransport(handler),
+            async_transport=httpx.MockTransport(handler),
+        )
+        self.market_data = ClobMarketData("https://clob.test", batch_size=4)
+
+    def tearDown(self):
+        configure_clients()
+
+    def test_order_books_isolate_bad_token(self):
+        token_ids = [str(i) for i in range(6)] + ["bad", "7"]
+        books = self.market_data.get_order_books(token_ids)
+
+        self.assertEqual(list(books), token_ids)
+        self.assertEqual(books["0"].bids, [(0.45, 10.0), (0.40, 5.0)])
+        self.assertEqual(books["7"].asks[0], (0.55, 10.0))
+        self.assertIsNone(books["7"].error)
+        self.assertIn("400", books["bad"].error)
+        self.assertEqual(books["bad"].bids, [])
+
+    def test_outage_is_retried_not_bisected(self):
+        failures = {"left": 2}
+        handler = clob_handler(self.requests)
+
+        def flaky(request: httpx.Request) -> httpx.Response:
+            if failures["left"]:
+                failures["left"] -= 1
+                self.requests.append((request.url.path, None))
+                return httpx.Response(503)
+            return handler(request)
+
+        configure_clients(async_transport=httpx.MockTransport(flaky))
+        market_data = ClobMarketData(
+            "https://clob.test", batch_size=8, retries=2, retry_delay=0
+        )
+
+        books = market_data.get_order_books([str(i) for i in range(8)])
+        self.assertTrue(all(book.error is None for book in books.values()))
+        self.assertEqual(len(self.requests), 3)
+
+        self.requests.clear()
+        failures["left"] = 100
+        books = market_data.get_order_books([str(i) for i in range(8)])
+        self.assertTrue(all("503" in book.error for book in books.values()))
+        self.assertEqual(len(self.requests), 3)
+
+    def test_quotes_in_one_round(self):
+        quotes = self.market_data.get_quotes(["1", "2", "3"])
+
+        self.assertEqual(
+            sorted(path for path, _ in self.requests),
+            ["/last-trades-prices", "/midpoints", "/prices"],
+        )
+        quote = quotes["2"]
+        self.assertEqual(
+            (quote.bid, quote.ask, quote.midpoint, quote.last_trade_price),
+            (0.45, 0.55, 0.5, 0.52),
+        )
+        self.assertIsNone(quote.error)
+
+
+if __name__ == "__main__":
+    unittest.main()
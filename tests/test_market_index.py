@@ -0,0 +1,185 @@
+import os
+import re
+import tempfile
+import unittest
+import zlib
+
+from langchain_core.embeddings import Embeddings
+
+from agents.connectors.chroma import PolymarketRAG
+from agents.polymarket.snapshot import MarketSnapshot
+from agents.utils.tokens import TokenCounter
+
+from tests.helpers import FakeGamma, make_executor
+
+
+class BagOfWords(Embeddings):
+    # Deterministic and offline; texts sharing words end up close together
+    def __init__(self, size=64):
+        self.size = size
+        self.calls = 0
+
+    def embed(self, text):
+        vector = [0.0] * self.size
+        for word in re.findall(r"[a-z]+", text.lower()):
+            vector[zlib.crc32(word.encode()) % self.size] += 1.0
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return [self.embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed(text)
+
+
+def market(market_id, question, updated_at="2024-07-10T00:00:00Z", **fields):
+    data = {
+        "id": market_id,
+        "question": question,
+        "description": f"Resolves Yes if {question.lower()}",
+        "outcomes": '["Yes", "No"]',
+        "outcomePrices": '["0.4", "0.6"]',
+        "createdAt": "2024-07-01T00:00:00Z",
+        "updatedAt": updated_at,
+        "active": True,
+        "closed": False,
+        "archived": False,
+    }
+    data.update(fields)
+    return data
+
+
+MARKETS = [
+    market("1", "Will the Fed cut interest rates in September?"),
+    market("2", "Will Bitcoin trade above 100k this year?"),
+    market("3", "Will the Lakers win the NBA championship?"),
+    market("4", "Will it snow in London on Christmas day?"),
+]
+
+
+class TestMarketIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, "index")
+        self.gamma = FakeGamma(list(MARKETS))
+        self.embeddings = BagOfWords()
+        self.rag = PolymarketRAG(embedding_function=self.embeddings)
+        self.rag.snapshot = MarketSnapshot(
+            snapshot_path=os.path.join(self.tmp.name, "snapshot.json"),
+            gamma_client=self.gamma,
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_search_returns_full_records(self):
+        self.assertEqual(self.rag.search_markets("fed", directory=self.directory), [])
+        stats = self.rag.build_market_index(self.directory)
+        self.assertEqual(stats, {"embedded": 4, "removed": 0, "total": 4})
+
+        found = self.rag.search_markets(
+            "bitcoin price this year", k=2, directory=self.directory
+        )
+        self.assertEqual(len(found), 2)
+        self.assertEqual(found[0]["id"], "2")
+        self.assertEqual(found[0]["outcomePrices"], '["0.4", "0.6"]')
+
+    def test_search_syncs_and_drops_markets_closed_since_the_build(self):
+        self.rag.build_market_index(self.directory)
+        self.gamma.delta = [
+            market("1", "Will the Fed cut interest rates in September?", closed=True),
+            market(
+                "2",
+                "Will Bitcoin trade above 100k this year?",
+                "2024-07-11T00:00:00Z",
+                outcomePrices='["0.7", "0.3"]',
+            ),
+        ]
+
+        found = self.rag.search_markets(
+            "fed interest rates bitcoin", k=4, directory=self.directory
+        )
+        ids = [m["id"] for m in found]
+        self.assertNotIn("1", ids)
+        self.assertEqual(len(ids), 3)
+        bitcoin = next(m for m in found if m["id"] == "2")
+        self.assertEqual(bitcoin["outcomePrices"], '["0.7", "0.3"]')
+
+    def test_rebuild_only_embeds_changed_markets(self):
+        self.rag.build_market_index(self.directory)
+        self.assertEqual(self.embeddings.calls, 4)
+
+        self.gamma.delta = [
+            market("3", "Will the Lakers win the NBA championship?", closed=True),
+            market(
+                "4",
+                "Will it snow in Paris on Christmas day?",
+                "2024-07-11T00:00:00Z",
+            ),
+            market("5", "Will the Fed raise interest rates in December?"),
+        ]
+        stats = self.rag.build_market_index(self.directory)
+        self.assertEqual(stats, {"embedded": 2, "removed": 1, "total": 4})
+        self.assertEqual(self.embeddings.calls, 6)
+
+        index = self.rag.market_index(self.directory)
+        self.assertEqual(sorted(index.get()["ids"]), ["1", "2", "4", "5"])
+        found = self.rag.search_markets("snow in paris", k=1, directory=self.directory)
+        self.assertEqual(
+            found[0]["question"], "Will it snow in Paris on Christmas day?"
+        )
+
+
+class FakeChroma:
+    def __init__(self, markets):
+        self.markets = markets
+        self.queries = []
+
+    def search_markets(self, query, k=20):
+        self.queries.append((query, k))
+        return self.markets[:k]
+
+
+class TestRetrievalFirstLLM(unittest.TestCase):
+    def setUp(self):
+        # No rank file in the directory and no download, so counts are the
+        # len // 4 estimate
+        self.tmp = tempfile.TemporaryDirectory()
+        self.executor = make_executor(
+            token_counter=TokenCounter(encodings_dir=self.tmp.name, download=False),
+            token_limit=1000,
+        )
+        self.prompts = []
+        self.executor.process_data_chunk = lambda data1, data2, user_input: (
+            self.prompts.append((data1, data2)) or "answer"
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_one_call_with_the_retrieved_markets(self):
+        markets = [market(str(i), f"Question {i}?") for i in range(50)]
+        self.executor.chroma = FakeChroma(markets)
+
+        self.assertEqual(self.executor.get_polymarket_llm("fed", top_k=10), "answer")
+        self.assertEqual(self.executor.chroma.queries, [("fed", 10)])
+        self.assertEqual(len(self.prompts), 1)
+        self.assertEqual(self.prompts[0], ([], markets[:10]))
+
+    def test_retrieved_markets_are_cut_to_the_token_limit(self):
+        markets = [
+            market(str(i), f"Question {i}?", description="word " * 300)
+            for i in range(20)
+        ]
+        self.executor.chroma = FakeChroma(markets)
+        self.executor.get_polymarket_llm("fed")
+
+        _, sent = self.prompts[0]
+        self.assertTrue(0 < len(sent) < 20)
+        self.assertEqual(sent, markets[: len(sent)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+
+from agents.polymarket.market_table import MarketTable
+from agents.utils.objects import SimpleMarket
+
+
+def simple_market(market_id: int, spread: float, volume: float, active=True):
+    return SimpleMarket(
+        id=market_id,
+        question=f"Question {market_id}",
+        end="2025-01-01T00:00:00Z",
+        description="",
+        active=active,
+        funded=True,
+        rewardsMinSize=0,
+        rewardsMaxSpread=0,
+        volume=volume,
+        spread=spread,
+        outcomes="['Yes', 'No']",
+        outcome_prices="['0.25', '0.75']",
+        clob_token_ids=None,
+    )
+
+
+class TestMarketTable(unittest.TestCase):
+    def setUp(self):
+        self.markets = [
+            simple_market(1, 0.02, 500.0),
+            simple_market(2, 0.05, 100.0, active=False),
+            simple_market(3, 0.02, 900.0),
+            simple_market(4, 0.01, 700.0),
+        ]
+        self.table = MarketTable.from_markets(self.markets)
+
+    def test_columns(self):
+        self.assertEqual(self.table["id"].tolist(), [1, 2, 3, 4])
+        np.testing.assert_allclose(self.table["outcome_prices"][0], [0.25, 0.75])
+        self.assertEqual(self.table["end"][0], 1735689600.0)
+
+    def test_filter_and_top_k(self):
+        table = self.table.filter(self.table.tradeable_mask())
+        top = table.top_k("volume", 2)
+        self.assertEqual([m.id for m in top.rows()], [3, 4])
+
+    def test_multi_key_sort(self):
+        table = self.table.sort(["spread", "volume"], descending=[True, False])
+        self.assertEqual(table["id"].tolist(), [2, 1, 3, 4])
+
+    def test_rejects_columns_without_a_ranking(self):
+        for column in ["id", "active", "outcome_prices", "question"]:
+            with self.assertRaises(ValueError):
+                self.table.top_k(column, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
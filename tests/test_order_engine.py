@@ -0,0 +1,117 @@
+import asyncio
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from py_clob_client.clob_types import MarketOrderArgs
+
+from agents.polymarket.order_engine import OrderEngine
+
+from tests.helpers import FakeClob, limit_order
+
+
+class TestOrderEngine(unittest.TestCase):
+    def run_orders(self, client, orders, **kwargs):
+        async def run():
+            async with OrderEngine(client, **kwargs) as engine:
+                return await asyncio.gather(*[engine.submit(o) for o in orders])
+
+        return asyncio.run(run())
+
+    def test_posts_with_bounded_in_flight(self):
+        client = FakeClob(latency=0.05)
+        orders = [limit_order(str(i)) for i in range(12)]
+
+        started = time.monotonic()
+        results = self.run_orders(client, orders, max_in_flight=3)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual([r.order_id for r in results], [f"0x{i}" for i in range(12)])
+        self.assertTrue(all(r.error is None for r in results))
+        self.assertEqual(client.max_in_flight, 3)
+        # Four rounds of three concurrent posts, not twelve serial ones
+        self.assertLess(elapsed, 12 * 0.05)
+
+    def test_records_stage_timings(self):
+        results = self.run_orders(FakeClob(latency=0.02), [limit_order("1")])
+        timings = results[0].timings
+        self.assertGreaterEqual(timings.ack, 0.02)
+        self.assertAlmostEqual(
+            timings.total,
+            timings.queue_wait + timings.sign + timings.post + timings.ack,
+            places=6,
+        )
+
+    def test_dedupes_retries_with_the_same_key(self):
+        client = FakeClob(latency=0.01)
+
+        async def run():
+            async with OrderEngine(client) as engine:
+                first = engine.submit(limit_order("7"), idempotency_key="first")
+                retry = engine.submit(limit_order("7"), idempotency_key="first")
+                other = engine.submit(limit_order("7"), idempotency_key="second")
+                self.assertIs(first, retry)
+                await asyncio.gather(first, other)
+                # A retry after success still returns the original ack
+                self.assertIs(
+                    engine.submit(limit_order("7"), idempotency_key="first"), first
+                )
+
+        asyncio.run(run())
+        self.assertEqual(len(client.posted), 2)
+
+    def test_repeated_orders_without_a_key_are_all_placed(self):
+        client = FakeClob(latency=0.0)
+        results = self.run_orders(client, [limit_order("7"), limit_order("7")])
+        self.assertEqual(len(client.posted), 2)
+        self.assertNotEqual(results[0].key, results[1].key)
+
+    def test_failed_orders_are_reported_and_can_be_retried(self):
+        client = FakeClob(latency=0.0, reject={"bad"})
+        callbacks = []
+
+        async def run():
+            async with OrderEngine(client) as engine:
+                failed = await engine.submit(
+                    limit_order("bad"), callback=callbacks.append
+                )
+                client.reject.clear()
+                retried = await engine.submit(limit_order("bad"))
+                return failed, retried
+
+        failed, retried = asyncio.run(run())
+        self.assertIn("cannot sign bad", failed.error)
+        self.assertEqual(callbacks, [failed])
+        self.assertIsNone(retried.error)
+        self.assertEqual(retried.order_id, "0xbad")
+
+    def test_market_orders_are_signed_as_market_orders(self):
+        client = FakeClob(latency=0.0)
+
+        async def run():
+            async with OrderEngine(client) as engine:
+                return await engine.submit(
+                    MarketOrderArgs(token_id="5", amount=25.0), order_type="FOK"
+                )
+
+        result = asyncio.run(run())
+        self.assertEqual(result.order_id, "0x5")
+        self.assertEqual(client.posted, [("5", "FOK")])
+
+    def test_stop_shuts_down_only_its_own_executor(self):
+        shared = ThreadPoolExecutor(max_workers=2)
+
+        async def run(executor=None):
+            async with OrderEngine(FakeClob(latency=0.0), executor=executor) as engine:
+                await engine.submit(limit_order("1"))
+            return engine
+
+        owned = asyncio.run(run())
+        self.assertTrue(owned.executor._shutdown)
+        asyncio.run(run(shared))
+        self.assertFalse(shared._shutdown)
+        shared.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import threading
+import unittest
+
+from agents.polymarket.orderbook import LocalFeed, OrderBookReplica
+from agents.polymarket.polymarket import Polymarket
+
+
+def book(token_id, seq=None, bids=(), asks=()):
+    return {
+        "event_type": "book",
+        "asset_id": token_id,
+        "seq": seq,
+        "bids": [{"price": p, "size": s} for p, s in bids],
+        "asks": [{"price": p, "size": s} for p, s in asks],
+        "hash": "h",
+    }
+
+
+def price_change(token_id, seq, *changes):
+    return {
+        "event_type": "price_change",
+        "asset_id": token_id,
+        "seq": seq,
+        "changes": [{"price": p, "side": side, "size": s} for side, p, s in changes],
+    }
+
+
+class TestOrderBookReplica(unittest.TestCase):
+    def setUp(self):
+        self.snapshots = []
+
+        def snapshot_source(token_id):
+            self.snapshots.append(token_id)
+            return book(token_id, bids=[("0.40", "10")], asks=[("0.60", "10")])
+
+        self.replica = OrderBookReplica(LocalFeed(), snapshot_source=snapshot_source)
+        self.replica.subscribe(["t1"])
+
+    def test_snapshot_then_deltas(self):
+        self.assertIsNone(self.replica.get("t1"))
+        self.replica.apply(
+            book(
+                "t1",
+                seq=1,
+                bids=[("0.45", "100"), ("0.47", "50"), ("0.44", "5")],
+                asks=[("0.52", "30"), ("0.50", "20")],
+            )
+        )
+        self.replica.apply(
+            price_change("t1", 2, ("BUY", "0.48", "7"), ("SELL", "0.50", "0"))
+        )
+        orderbook = self.replica.get("t1")
+
+        self.assertEqual((orderbook.best_bid(), orderbook.best_ask()), (0.48, 0.52))
+        self.assertEqual(
+            orderbook.depth("BUY", 3), [(0.48, 7.0), (0.47, 50.0), (0.45, 100.0)]
+        )
+        self.assertEqual(orderbook.depth("SELL"), [(0.52, 30.0)])
+        self.assertEqual(self.snapshots, [])
+
+    def test_sequence_gap_resyncs(self):
+        self.replica.apply(book("t1", seq=1, bids=[("0.45", "100")]))
+        self.replica.apply(price_change("t1", 3, ("BUY", "0.46", "1")))
+
+        orderbook = self.replica.get("t1")
+        self.assertEqual(self.snapshots, ["t1"])
+        self.assertEqual((orderbook.best_bid(), orderbook.best_ask()), (0.40, 0.60))
+
+    def test_disconnect_resyncs_every_book(self):
+        self.replica.apply(book("t1", seq=1, bids=[("0.45", "100")]))
+        self.replica.apply({"event_type": "disconnected"})
+
+        self.assertEqual(self.snapshots, ["t1"])
+        self.assertEqual(self.replica.get("t1").best_bid(), 0.40)
+
+    def test_feed_thread(self):
+        feed = LocalFeed()
+        replica = OrderBookReplica(feed)
+        replica.subscribe(["t1"])
+        replica.start()
+        feed.push(book("t1", seq=1, bids=[("0.45", "100")], asks=[("0.55", "1")]))
+        replica.stop(timeout=5)
+
+        self.assertEqual(replica.best_bid_ask("t1"), (0.45, 0.55))
+
+    def test_reads_are_copies_taken_under_the_lock(self):
+        self.replica.apply(book("t1", seq=1, bids=[("0.45", "100")]))
+        depth = self.replica.depth("t1", levels=5)
+        self.assertEqual(depth["bids"], [(0.45, 100.0)])
+
+        stop = threading.Event()
+
+        def writer():
+            seq = 2
+            while not stop.is_set():
+                price = f"0.{seq % 40 + 10}"
+                self.replica.apply(price_change("t1", seq, ("BUY", price, "1")))
+                seq += 1
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for _ in range(2000):
+                bids = self.replica.depth("t1")["bids"]
+                self.assertEqual(bids, sorted(bids, reverse=True))
+                self.replica.best_bid_ask("t1")
+        finally:
+            stop.set()
+            thread.join()
+        # The copy taken first never saw the writer's levels
+        self.assertEqual(depth["bids"], [(0.45, 100.0)])
+
+    def test_polymarket_reads_warm_replica(self):
+        feed = LocalFeed([book("t1", bids=[("0.45", "100")], asks=[("0.55", "1")])])
+        polymarket = Polymarket()
+        polymarket.watch_orderbooks(["t1"], feed=feed)
+        polymarket.orderbooks.stop(timeout=5)
+
+        self.assertEqual(polymarket.get_orderbook_price("t1"), 0.45)
+        self.assertEqual(polymarket.get_orderbook_price("t1", side="SELL"), 0.55)
+        self.assertEqual(polymarket.get_orderbook("t1").asks[0].price, "0.55")
+        self.assertNotIn("client", polymarket.__dict__)
+
+
+if __name__ == "__main__":
+    unittest.main()
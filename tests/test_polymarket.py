@@ -0,0 +1,34 @@
+import unittest
+
+from py_clob_client.clob_types import MarketOrderArgs
+
+from agents.polymarket.polymarket import Polymarket
+
+from tests.helpers import FakeClob, limit_order
+
+
+class TestPolymarketInit(unittest.TestCase):
+    def test_clients_are_built_on_first_use(self):
+        polymarket = Polymarket()
+        for name in ("web3", "usdc", "ctf", "account", "client"):
+            self.assertNotIn(name, polymarket.__dict__)
+
+        self.assertIs(polymarket.usdc.w3, polymarket.web3)
+        self.assertIs(polymarket.w3, polymarket.web3)
+        self.assertIs(polymarket.usdc, polymarket.usdc)
+        self.assertNotIn("client", polymarket.__dict__)
+
+
+class TestExecuteOrders(unittest.TestCase):
+    def test_market_orders_default_to_fok(self):
+        polymarket = Polymarket()
+        polymarket.client = FakeClob(latency=0.0)
+        results = polymarket.execute_orders(
+            [limit_order("1"), MarketOrderArgs(token_id="2", amount=10.0)]
+        )
+        self.assertEqual([r.order_id for r in results], ["0x1", "0x2"])
+        self.assertEqual(sorted(polymarket.client.posted), [("1", "GTC"), ("2", "FOK")])
+
+
+if __name__ == "__main__":
+    unittest.main()
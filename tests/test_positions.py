@@ -0,0 +1,192 @@
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from agents.polymarket.positions import FILL_DTYPE, PositionBook
+from agents.utils.objects import MakerOrder, Trade
+
+
+def make_trade(
+    trade_id,
+    side,
+    price,
+    size,
+    asset_id="111",
+    fee_rate_bps="0",
+    trader_side="TAKER",
+    maker_orders=(),
+):
+    return Trade(
+        id=trade_id,
+        taker_order_id="0xorder",
+        market="0xmarket",
+        asset_id=asset_id,
+        side=side,
+        size=str(size),
+        fee_rate_bps=fee_rate_bps,
+        price=str(price),
+        status="MATCHED",
+        match_time="1700000000",
+        last_update="1700000000",
+        outcome="Yes",
+        maker_address="0xmaker",
+        owner="owner",
+        transaction_hash="0xhash",
+        bucket_index=0,
+        maker_orders=list(maker_orders),
+        type="TAKER",
+        trader_side=trader_side,
+    )
+
+
+def make_maker_order(order_id, maker_address, side, price, matched, asset_id):
+    return MakerOrder(
+        order_id=order_id,
+        owner="owner" if maker_address.lower() == "0xwallet" else "other",
+        maker_address=maker_address,
+        matched_amount=str(matched),
+        price=str(price),
+        fee_rate_bps="0",
+        asset_id=asset_id,
+        outcome="No",
+        side=side,
+    )
+
+
+class TestPositionBook(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.tmp.name, "fills.bin")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_average_cost_and_realized_pnl(self):
+        book = PositionBook()
+        book.apply_trade(make_trade("a", "BUY", 0.40, 100))
+        book.apply_trade(make_trade("b", "BUY", 0.60, 100))
+        (position,) = book.positions()
+        self.assertAlmostEqual(position.size, 200)
+        self.assertAlmostEqual(position.avg_price, 0.50)
+
+        book.apply_trade(make_trade("c", "SELL", 0.70, 50))
+        (position,) = book.positions()
+        self.assertAlmostEqual(position.size, 150)
+        self.assertAlmostEqual(position.avg_price, 0.50)
+        self.assertAlmostEqual(position.realized_pnl, 10.0)
+
+        # Selling through flat opens a short at the fill price
+        book.apply_trade(make_trade("d", "SELL", 0.30, 200))
+        (position,) = book.positions()
+        self.assertAlmostEqual(position.size, -50)
+        self.assertAlmostEqual(position.avg_price, 0.30)
+        self.assertAlmostEqual(position.realized_pnl, 10.0 - 30.0)
+
+    def test_duplicate_trades_are_ignored(self):
+        book = PositionBook()
+        trade = make_trade("a", "BUY", 0.5, 10)
+        self.assertEqual(book.apply_trades([trade, trade]), 1)
+        self.assertAlmostEqual(book.positions()[0].size, 10)
+
+    def test_maker_fills_book_the_wallets_own_orders(self):
+        # The taker bought 30 of token 111 from our resting SELL of 20 on
+        # token 111 and someone else's order
+        trade = make_trade(
+            "m",
+            "BUY",
+            0.55,
+            30,
+            trader_side="MAKER",
+            maker_orders=[
+                make_maker_order("o1", "0xWallet", "SELL", 0.55, 20, "111"),
+                make_maker_order("o2", "0xother", "SELL", 0.55, 10, "111"),
+            ],
+        )
+        book = PositionBook()
+        self.assertEqual(book.apply_trades([trade, trade], "0xwallet"), 1)
+        (position,) = book.positions()
+        self.assertEqual(position.token_id, "111")
+        self.assertAlmostEqual(position.size, -20)
+        self.assertAlmostEqual(position.avg_price, 0.55)
+
+        # Without an address the wallet's orders are the ones with its api key
+        book = PositionBook()
+        self.assertEqual(book.apply_trade(trade), 1)
+        self.assertAlmostEqual(book.positions()[0].size, -20)
+
+    def test_fees_reduce_realized_pnl(self):
+        book = PositionBook()
+        book.apply_trade(make_trade("a", "BUY", 0.5, 100, fee_rate_bps="100"))
+        self.assertAlmostEqual(book.positions()[0].realized_pnl, -0.5)
+
+    def test_mark_to_market(self):
+        book = PositionBook()
+        book.apply_trade(make_trade("a", "BUY", 0.40, 100, asset_id="1"))
+        book.apply_trade(make_trade("b", "SELL", 0.70, 10, asset_id="2"))
+        book.apply_trade(make_trade("c", "BUY", 0.20, 5, asset_id="3"))
+        book.update_marks({"1": 0.50, "2": 0.60})
+
+        np.testing.assert_allclose(book.unrealized()[:2], [10.0, 1.0])
+        totals = book.totals()
+        self.assertAlmostEqual(totals["unrealized_pnl"], 11.0)
+        self.assertEqual(totals["unmarked_positions"], 1)
+        self.assertIsNone(book.positions()[2].unrealized_pnl)
+
+    def test_replay_matches_live_book(self):
+        rng = np.random.default_rng(7)
+        live = PositionBook(self.log_path)
+        for i in range(2000):
+            live.apply_fill(
+                f"trade-{i}",
+                str(10**70 + int(rng.integers(0, 40))),
+                "BUY" if rng.random() < 0.55 else "SELL",
+                float(rng.uniform(0.01, 0.99)),
+                float(rng.integers(1, 500)),
+                match_time=1700000000 + i,
+            )
+
+        replayed = PositionBook(self.log_path)
+        self.assertEqual(replayed.load(), 2000)
+        self.assertEqual(replayed.tokens, live.tokens)
+        n = len(live.tokens)
+        np.testing.assert_allclose(replayed.size[:n], live.size[:n])
+        np.testing.assert_allclose(replayed.avg_price[:n], live.avg_price[:n])
+        np.testing.assert_allclose(replayed.realized[:n], live.realized[:n])
+        self.assertEqual(replayed.last_match_time, 1700000000 + 1999)
+        # Fills already in the log are not applied twice
+        self.assertFalse(replayed.apply_fill("trade-5", live.tokens[0], "BUY", 0.5, 1))
+
+    def test_replay_ignores_a_torn_last_record(self):
+        book = PositionBook(self.log_path)
+        book.apply_fill("a", "1", "BUY", 0.5, 10)
+        book.apply_fill("b", "1", "BUY", 0.5, 10)
+        with open(self.log_path, "r+b") as log_file:
+            log_file.truncate(FILL_DTYPE.itemsize + 5)
+        replayed = PositionBook(self.log_path)
+        self.assertEqual(replayed.load(), 1)
+        self.assertAlmostEqual(replayed.positions()[0].size, 10)
+
+    def test_replays_a_large_log_quickly(self):
+        count = 200_000
+        records = np.zeros(count, dtype=FILL_DTYPE)
+        records["trade_key"] = np.arange(count)
+        records["token"] = np.arange(count) % 500
+        records["side"] = np.arange(count) % 3 != 0
+        records["price"] = 0.5
+        records["size"] = 10
+        records.tofile(self.log_path)
+        with open(self.log_path + ".tokens", "w") as tokens_file:
+            tokens_file.write("".join(f"{10**70 + i}\n" for i in range(500)))
+
+        book = PositionBook(self.log_path)
+        started = time.perf_counter()
+        self.assertEqual(book.load(), count)
+        self.assertLess(time.perf_counter() - started, 5.0)
+        self.assertEqual(len(book.tokens), 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+import httpx
+
+from agents.utils.rate_limit import RateLimitedTransport, RateLimiter
+
+
+class TestRateLimitedTransport(unittest.TestCase):
+    def setUp(self):
+        self.responses = []
+        self.requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            return self.responses.pop(0)
+
+        self.limiter = RateLimiter(
+            rate=1000, burst=10, max_concurrency=8, max_retries=3, backoff_base=0
+        )
+        self.client = httpx.Client(
+            transport=RateLimitedTransport(httpx.MockTransport(handler), self.limiter)
+        )
+
+    def test_retries_after_429(self):
+        self.responses = [
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            httpx.Response(200, json=[]),
+        ]
+        response = self.client.get("https://gamma.test/markets")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.requests), 2)
+        (stats,) = self.limiter.stats()
+        self.assertEqual(
+            (stats.host, stats.throttled, stats.retried), ("gamma.test", 1, 1)
+        )
+        self.assertEqual(stats.concurrency, 4)
+
+    def test_post_is_not_retried_on_server_error(self):
+        self.responses = [httpx.Response(503), httpx.Response(200)]
+        response = self.client.post("https://clob.test/order", json={})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.requests), 1)
+
+    def test_gives_up_after_max_retries(self):
+        self.responses = [httpx.Response(429) for _ in range(4)]
+        response = self.client.get("https://gamma.test/markets")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(len(self.requests), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
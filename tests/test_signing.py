@@ -0,0 +1,67 @@
+import time
+import unittest
+
+from eth_account import Account
+
+from agents.polymarket.polymarket import Polymarket
+from agents.polymarket.signing import SigningContext
+
+EXCHANGE = "0x4bfb41d5b3570defd03c39a9a4d8de6bd8b8982e"
+
+
+class TestSigningContext(unittest.TestCase):
+    def setUp(self):
+        self.account = Account.create()
+        self.context = SigningContext(self.account.key.hex(), EXCHANGE, 137)
+
+    def recover(self, signed_order) -> str:
+        struct_hash = self.context.builder._create_struct_hash(signed_order.order)
+        return Account._recover_hash(struct_hash, signature=signed_order.signature)
+
+    def test_sign_many_keeps_order(self):
+        orders = [
+            self.context.order_data(str(1000 + i), 10, side=side)
+            for i, side in enumerate(["BUY", "SELL", "BUY"])
+        ]
+        signed = self.context.sign_many(orders)
+
+        self.assertEqual([s.order["tokenId"] for s in signed], [1000, 1001, 1002])
+        self.assertEqual([s.order["side"] for s in signed], [0, 1, 0])
+        for signed_order in signed:
+            self.assertEqual(self.recover(signed_order), self.account.address)
+
+    def test_process_pool_is_reused_until_closed(self):
+        orders = [self.context.order_data(str(1000 + i), 10) for i in range(8)]
+        with self.context:
+            first = self.context.sign_many(orders, processes=2)
+            pool = self.context._pool
+            second = self.context.sign_many(orders, processes=2)
+            self.assertIs(self.context._pool, pool)
+        self.assertIsNone(self.context._pool)
+        for signed in (first, second):
+            self.assertEqual(
+                [s.order["tokenId"] for s in signed], list(range(1000, 1008))
+            )
+            self.assertEqual(self.recover(signed[-1]), self.account.address)
+
+    def test_nonce_defaults_to_call_time(self):
+        before = round(time.time())
+        order = self.context.order_data("1000", 10)
+        self.assertGreaterEqual(int(order.nonce), before)
+        self.assertEqual(self.context.order_data("1000", 10, nonce="7").nonce, "7")
+
+    def test_polymarket_reuses_context(self):
+        polymarket = Polymarket()
+        polymarket.private_key = self.account.key.hex()
+
+        first = polymarket.build_order("1000", 10)
+        second = polymarket.build_order("1001", 10, side="SELL")
+
+        self.assertIs(polymarket.signing, polymarket.signing)
+        self.assertEqual(first.order["maker"], self.account.address)
+        self.assertEqual(second.order["side"], 1)
+        polymarket.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
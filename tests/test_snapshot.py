@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from agents.polymarket.snapshot import MarketSnapshot
+
+from tests.helpers import FakeGamma
+
+
+def market(market_id, updated_at, **fields):
+    data = {
+        "id": market_id,
+        "createdAt": f"2024-07-0{market_id}T00:00:00Z",
+        "updatedAt": updated_at,
+        "active": True,
+        "closed": False,
+        "archived": False,
+    }
+    data.update(fields)
+    return data
+
+
+class TestMarketSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "snapshot.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_delta_sync_merges_and_drops_closed(self):
+        gamma = FakeGamma(
+            [
+                market("1", "2024-07-10T00:00:00Z"),
+                market("2", "2024-07-11T00:00:00Z"),
+                market("3", "2024-07-12T00:00:00Z"),
+            ]
+        )
+        snapshot = MarketSnapshot(snapshot_path=self.path, gamma_client=gamma)
+        stats = snapshot.sync()
+        self.assertTrue(stats.full_sync)
+        self.assertEqual(stats.new, 3)
+
+        gamma.delta = [
+            market("4", "2024-07-13T00:00:00Z"),
+            market("2", "2024-07-13T00:00:00Z", spread=0.1),
+            market("1", "2024-07-13T00:00:00Z", closed=True),
+        ]
+        # A fresh instance has to pick the watermark up from disk
+        snapshot = MarketSnapshot(snapshot_path=self.path, gamma_client=gamma)
+        stats = snapshot.sync()
+
+        self.assertEqual(gamma.watermark_seen, "2024-07-12T00:00:00Z")
+        self.assertFalse(stats.full_sync)
+        self.assertEqual((stats.new, stats.updated, stats.removed), (1, 1, 1))
+        self.assertEqual(stats.bytes, 10)
+        self.assertEqual([m["id"] for m in snapshot.get_all_markets()], ["4", "3", "2"])
+
+    def test_watermark_falls_back_to_the_sync_start(self):
+        gamma = FakeGamma([market("1", None), market("2", None)])
+        snapshot = MarketSnapshot(snapshot_path=self.path, gamma_client=gamma)
+        with self.assertLogs("agents.polymarket.snapshot", "WARNING"):
+            stats = snapshot.sync()
+        self.assertIsNotNone(stats.watermark)
+
+        # The next sync is a delta from the sync start, not another full download
+        stats = MarketSnapshot(snapshot_path=self.path, gamma_client=gamma).sync()
+        self.assertFalse(stats.full_sync)
+        self.assertEqual(gamma.watermark_seen, snapshot.watermark)
+
+    def test_path_comes_from_the_environment(self):
+        with mock.patch.dict(os.environ, {"MARKET_SNAPSHOT_PATH": self.path}):
+            snapshot = MarketSnapshot(gamma_client=FakeGamma([]))
+        self.assertEqual(snapshot.snapshot_path, self.path)
+        with mock.patch.dict(os.environ, clear=True):
+            snapshot = MarketSnapshot(gamma_client=FakeGamma([]))
+        # Not under ./local_db, which is chroma's persist directory
+        self.assertEqual(
+            snapshot.snapshot_path, "./local_db_snapshot/markets_snapshot.json"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+from agents.application.prompts import Prompter
+from agents.utils.tabular import (
+    Column,
+    format_number,
+    render_events,
+    render_markets,
+    render_table,
+)
+
+MARKET = {
+    "id": "253591",
+    "question": "Will the Fed cut rates in September?",
+    "outcomes": '["Yes", "No"]',
+    "outcomePrices": '["0.3450000001", "0.6549999999"]',
+    "volume": "1523044.123",
+    "liquidity": 20500.5,
+    "endDate": "2024-09-18T12:00:00Z",
+    "description": "Resolves Yes if | the FOMC\n announces a cut. " * 20,
+    "image": "https://example.com/fed.png",
+    "clobTokenIds": '["1", "2"]',
+}
+
+EVENT = {
+    "id": "903",
+    "title": "Fed decision in September",
+    "markets": [MARKET, MARKET],
+    "volume": 3000000,
+    "endDate": "2024-09-18T12:00:00Z",
+    "description": "Short description",
+}
+
+
+class TestTabular(unittest.TestCase):
+    def test_markets_render_as_header_and_rows(self):
+        header, row = render_markets([MARKET]).split("\n")
+        self.assertEqual(
+            header, "id|question|outcomes|prices|volume|liquidity|end|description"
+        )
+        cells = row.split("|")
+        self.assertEqual(len(cells), 8)
+        self.assertEqual(
+            cells[:7],
+            [
+                "253591",
+                "Will the Fed cut rates in September?",
+                "Yes/No",
+                "0.345/0.655",
+                "1523044",
+                "20500",
+                "2024-09-18",
+            ],
+        )
+        # Truncated to 200 characters, whitespace collapsed, "|" escaped
+        self.assertEqual(len(cells[7]), 200)
+        self.assertTrue(cells[7].endswith("…"))
+        self.assertNotIn("\n", cells[7])
+
+    def test_events_count_their_markets_and_leave_missing_fields_empty(self):
+        _, row = render_events([EVENT]).split("\n")
+        self.assertEqual(
+            row, "903|Fed decision in September|2|3000000||2024-09-18|Short description"
+        )
+
+    def test_format_number(self):
+        self.assertEqual(format_number("0.350", 3), "0.35")
+        self.assertEqual(format_number(12.0, 2), "12")
+        self.assertEqual(format_number("n/a", 2), "n/a")
+
+    def test_non_record_data_falls_back_to_str(self):
+        self.assertEqual(render_table("no data", [Column("id", "id")]), "no data")
+
+    def test_prompt_is_much_smaller_than_dict_reprs(self):
+        prompt = Prompter().prompts_polymarket(data1=[EVENT] * 5, data2=[MARKET] * 10)
+        self.assertIn("Will the Fed cut rates in September?", prompt)
+        self.assertNotIn("example.com", prompt)
+        self.assertLess(len(prompt), len(str([EVENT] * 5) + str([MARKET] * 10)) / 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import base64
+import os
+import random
+import tempfile
+import unittest
+
+from agents.utils.tokens import TokenCounter, pack
+
+from tests.helpers import make_executor
+
+
+def write_ranks(directory: str) -> None:
+    # A toy cl100k_base: every single byte, plus merges for "hell"
+    tokens = [bytes([i]) for i in range(256)] + [b"he", b"ll", b"hell"]
+    with open(os.path.join(directory, "cl100k_base.tiktoken"), "wb") as ranks_file:
+        for rank, token in enumerate(tokens):
+            ranks_file.write(base64.b64encode(token) + b" %d\n" % rank)
+
+
+class TestTokenCounter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        write_ranks(self.tmp.name)
+        self.counter = TokenCounter(
+            "gpt-3.5-turbo-16k", encodings_dir=self.tmp.name, download=False
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_counts_with_the_bundled_encoding(self):
+        self.assertTrue(self.counter.exact)
+        self.assertEqual(self.counter.count("hello"), 2)
+        self.assertEqual(self.counter.count("xyz"), 3)
+        self.assertEqual(self.counter.count("<|endoftext|>"), 13)
+
+    def test_the_shipped_encoding_is_cl100k_base(self):
+        counter = TokenCounter(download=False)
+        self.assertTrue(counter.exact)
+        self.assertEqual(counter.budget_fraction, 0.98)
+        self.assertEqual(counter.encoding.encode("hello world"), [15339, 1917])
+        # Parsed once per process, not once per counter
+        self.assertIs(TokenCounter(download=False).encoding, counter.encoding)
+
+    def test_estimates_leave_a_wide_margin(self):
+        with tempfile.TemporaryDirectory() as empty:
+            counter = TokenCounter(encodings_dir=empty, download=False)
+        self.assertFalse(counter.exact)
+        self.assertEqual(counter.count("x" * 40), 10)
+        self.assertEqual(counter.budget_fraction, 0.5)
+
+    def test_counts_are_memoized(self):
+        record = {"id": 1, "question": "hello"}
+        self.counter.count_record(record)
+        self.counter.count_record(dict(record))
+        info = self.counter.count.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+
+class TestPack(unittest.TestCase):
+    def test_groups_fit_the_budget(self):
+        rng = random.Random(3)
+        sizes = [rng.randint(1, 400) for _ in range(300)]
+        groups = pack(sizes, 1000)
+
+        self.assertEqual(sorted(i for g in groups for i in g), list(range(300)))
+        self.assertTrue(all(sum(sizes[i] for i in g) <= 1000 for g in groups))
+        self.assertTrue(all(g == sorted(g) for g in groups))
+        # First-fit decreasing stays within 11/9 of the lower bound
+        lower_bound = -(-sum(sizes) // 1000)
+        self.assertLessEqual(len(groups), lower_bound * 11 // 9 + 1)
+
+    def test_oversized_items_get_their_own_group(self):
+        self.assertEqual(pack([5, 50, 5], 10), [[1], [0, 2]])
+
+
+class TestPackDataChunks(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        write_ranks(self.tmp.name)
+        self.executor = make_executor(
+            token_counter=TokenCounter(encodings_dir=self.tmp.name, download=False),
+            token_limit=3000,
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_chunks_fill_the_token_limit(self):
+        events = [
+            {"id": i, "description": "x" * (20 + 37 * i % 400)} for i in range(40)
+        ]
+        markets = [{"id": i, "question": "y" * (10 + 53 * i % 300)} for i in range(60)]
+        chunks = self.executor.pack_data_chunks(events, markets, "which market?")
+
+        self.assertEqual(sum(len(c[0]) for c in chunks), 40)
+        self.assertEqual(sum(len(c[1]) for c in chunks), 60)
+        tokens = [
+            self.executor.estimate_tokens(
+                self.executor.prompter.prompts_polymarket(data1=data1, data2=data2)
+                + "which market?"
+            )
+            for data1, data2 in chunks
+        ]
+        self.assertTrue(all(count <= 3000 for count in tokens))
+        # Every request but the last is nearly full
+        self.assertTrue(all(count > 2900 for count in sorted(tokens)[1:]))
+
+
+if __name__ == "__main__":
+    unittest.main()